@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the parsing of amounts.
+
+Compares the Decimal path the parsers used to take against integer cents,
+from the amount string to the statement line: parse, store the amount in
+the (compact) statement line and check whether it is zero or negative.
+This is done for the CSV amounts (ofxstatement's parse_decimal() on a
+signed Dutch amount) and for the ICS amounts (regular expression, string
+replacement and Decimal).
+
+Usage:
+
+    $ python benchmarks/bench_amounts.py [--amounts 1000000]
+"""
+import argparse
+import random
+import re
+import time
+from decimal import Decimal
+from typing import Callable, List
+
+from ofxstatement.plugins.nl.amounts import parse_cents, parse_dutch_cents
+from ofxstatement.plugins.nl.statement import StatementLine
+
+from generators import dutch_amount, random_cents
+
+
+def csv_decimal(value: str) -> bool:
+    stmt_line = StatementLine()
+    stmt_line.amount = Decimal(value.replace(",", ".").replace(" ", ""))
+    return stmt_line.amount != 0 and stmt_line.amount < 0
+
+
+def csv_cents(value: str) -> bool:
+    stmt_line = StatementLine()
+    stmt_line.cents = parse_cents(value)  # type: ignore
+    return stmt_line.amount_sign != 0 and stmt_line.amount_sign < 0  # type: ignore
+
+
+def ics_decimal(value: str) -> bool:
+    m = re.search(r'^(\S+\s|\D)?([0-9,.]+)$', value)
+    assert m is not None
+    amount = m.group(2)
+    if amount[-3] == ',':
+        amount = amount.replace('.', '').replace(',', '.')
+    stmt_line = StatementLine()
+    stmt_line.amount = -1 * Decimal(str(amount))
+    return stmt_line.amount != 0
+
+
+def ics_cents(value: str) -> bool:
+    stmt_line = StatementLine()
+    stmt_line.cents = -parse_dutch_cents(value)  # type: ignore
+    return stmt_line.amount_sign != 0
+
+
+def bench(parse: Callable[[str], bool], values: List[str]) -> float:
+    started = time.perf_counter()
+    for value in values:
+        parse(value)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--amounts', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    cents = [random_cents(rnd) for _ in range(args.amounts)]
+    csv = [('-' if c < 0 else '') + dutch_amount(c) for c in cents]
+    ics = ['€ ' + dutch_amount(c, thousands=True) for c in cents]
+
+    for name, parse, values in [('csv Decimal', csv_decimal, csv),
+                                ('csv cents', csv_cents, csv),
+                                ('ics Decimal', ics_decimal, ics),
+                                ('ics cents', ics_cents, ics)]:
+        elapsed = bench(parse, values)
+        print('{:12} {:10.3f} s {:12.0f} amounts/s'.format(
+            name, elapsed, len(values) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
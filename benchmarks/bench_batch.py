@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the batch conversion of many files.
+
+Converts a directory of generated ING, Knab and ASN files once by a new
+process per file (like running ofxstatement convert per file, minus its
+entry point scan), then by the batch command with every number of
+workers and finally with a cold and a warm conversion cache, and prints
+the files/s.
+
+Usage:
+
+    $ python benchmarks/bench_batch.py [--files 60] [--rows 1000] [--workers 1 2 4]
+"""
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from ofxstatement.plugins.nl import batch
+
+from generators import generate
+
+# a process per file
+CONVERT = [sys.executable, '-m', 'ofxstatement.plugins.nl.batch', '-w', '1']
+
+DIALECTS = ['ing-comma', 'knab', 'asn']
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=60)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[w for w in [1, 2, 4, 8, 16] if w <= cpus])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_dir = os.path.join(directory, 'in')
+        os.makedirs(input_dir)
+        for i in range(args.files):
+            # every file different (a seed of its own)
+            dialect = DIALECTS[i % len(DIALECTS)]
+            generated = os.path.join(directory, 'generated', str(i))
+            os.makedirs(generated)
+            source = generate(dialect, args.rows, generated, args.seed + i)
+            name, ext = os.path.splitext(os.path.basename(source))
+            shutil.move(source, os.path.join(input_dir, '{}_{:04d}{}'.format(name, i, ext)))
+        files = sorted(glob.glob(os.path.join(input_dir, '*')))
+
+        def report(label: str, elapsed: float) -> None:
+            print('{:24} {:8.3f} s {:8.1f} files/s'.format(label, elapsed,
+                                                           len(files) / elapsed))
+
+        started = time.perf_counter()
+        for filename in files:
+            subprocess.run([*CONVERT, '-c', os.path.join(directory, 'none.ini'),
+                            '-o', os.path.join(directory, 'single'), filename],
+                           stderr=subprocess.DEVNULL, check=True)
+        report('a process per file', time.perf_counter() - started)
+
+        for workers in args.workers:
+            started = time.perf_counter()
+            status = batch.main(['-c', os.path.join(directory, 'none.ini'),
+                                 '-w', str(workers),
+                                 '-o', os.path.join(directory, str(workers)),
+                                 input_dir])
+            assert status == 0
+            report('batch, {} workers'.format(workers), time.perf_counter() - started)
+
+        # unchanged files are copied from the cache the second time
+        for run in ['cold', 'warm']:
+            started = time.perf_counter()
+            status = batch.main(['-c', os.path.join(directory, 'none.ini'),
+                                 '-w', str(args.workers[-1]),
+                                 '-o', os.path.join(directory, run),
+                                 '--cache', os.path.join(directory, 'cache'),
+                                 input_dir])
+            assert status == 0
+            report('batch, {} cache'.format(run), time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the parsing of big CSV files in chunks by parallel processes.
+
+Parses a generated ING or DEGIRO file serially and with the setting workers
+(1, 2, 4, ... up to the number of CPUs by default), checks that the
+transaction ids are the same and prints the rows/s and the speedup.
+
+Usage:
+
+    $ python benchmarks/bench_chunks.py [--rows 1000000] [--workers 1 2 4 8 16]
+                                        [--dialects ing-comma degiro]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from ofxstatement.plugins.nl.plugins import DegiroPlugin, IngPlugin
+
+from generators import generate
+
+DIALECTS = ['ing-comma', 'ing-semicolon', 'degiro']
+
+
+def parse(dialect: str, path: str, workers: int) -> List[Any]:
+    settings: Dict[str, Any] = {'workers': str(workers)}
+    if dialect == 'degiro':
+        plugin: Any = DegiroPlugin(None, dict(settings, account_id='ABC'))
+    else:
+        plugin = IngPlugin(None, settings)
+    return [stmt_line.id for stmt_line in plugin.get_parser(path).iter_lines()]
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[w for w in [1, 2, 4, 8, 16, 32] if w <= cpus])
+    parser.add_argument('--dialects', nargs='+', choices=DIALECTS, default=['ing-comma', 'degiro'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    for dialect in args.dialects:
+        path = generate(dialect, args.rows, args.data_dir, args.seed)
+        expected = None
+        serial = None
+        for workers in args.workers:
+            started = time.perf_counter()
+            ids = parse(dialect, path, workers)
+            elapsed = time.perf_counter() - started
+            if expected is None:
+                expected, serial = ids, elapsed
+            assert ids == expected, 'the ids differ with {} workers'.format(workers)
+            print('{:14} {:3} workers {:10.3f} s {:12.0f} rows/s {:6.2f}x'.format(
+                dialect, workers, elapsed, args.rows / elapsed, serial / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the conversion of a date range of a large export.
+
+Converts a month (--since to --until) of a generated file: the whole file,
+the records of the range only (checked on the raw date), with a date index
+that is built first and with that index, and prints the seconds, the
+records read and the lines.
+
+Usage:
+
+    $ python benchmarks/bench_daterange.py [--rows 200000] [--dialect ing-comma]
+                                           [--since 2015-03-01] [--until 2015-03-31]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+from generators import generate
+
+
+def convert(dialect: str, path: str, settings: Dict[str, str]) -> Dict[str, Any]:
+    """Convert a file (to /dev/null) with the settings."""
+    if dialect.startswith('ing'):
+        from ofxstatement.plugins.nl.ing import Plugin
+    else:
+        from ofxstatement.plugins.nl.degiro import Plugin
+        settings = dict(settings, account_id='ABC')
+
+    started = time.perf_counter()
+    parser = Plugin(None, settings).get_parser(path)
+    with open(os.devnull, 'w') as out:
+        statement = StreamingOfxWriter(parser).write(out)
+    parser.fin.close()
+    return {'seconds': time.perf_counter() - started,
+            'records': parser.cur_record,
+            'lines': statement.line_count}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--dialect', choices=['ing-comma', 'ing-semicolon', 'degiro'],
+                        default='ing-comma')
+    parser.add_argument('--since', default='2015-03-01')
+    parser.add_argument('--until', default='2015-03-31')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    path = generate(args.dialect, args.rows, args.data_dir, args.seed)
+    date_range = {'since': args.since, 'until': args.until}
+
+    with tempfile.TemporaryDirectory() as directory:
+        # a copy: the date index is written next to the file
+        copy = os.path.join(directory, os.path.basename(path))
+        shutil.copy(path, copy)
+        for label, settings in [('whole file', {}),
+                                ('date range', date_range),
+                                ('date range, build index', dict(date_range, date_index='on')),
+                                ('date range, by index', dict(date_range, date_index='on'))]:
+            result = convert(args.dialect, copy, settings)
+            print('{:28} {:8.3f} s {:8} records {:8} lines'.format(
+                label, result['seconds'], result['records'], result['lines']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the parsing of dates.
+
+Compares datetime.strptime() against dates.parse_datetime() for the date
+formats of the banks on a synthetic file: many rows (25 per day by default)
+for a few hundred distinct dates, newest first like the bank exports.
+
+Usage:
+
+    $ python benchmarks/bench_dates.py [--rows 1000000] [--rows-per-day 25]
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+from ofxstatement.plugins.nl.dates import PARSERS, parse_datetime
+
+
+def values(rows: int, rows_per_day: int, date_format: str) -> List[str]:
+    end = date(2020, 5, 30)
+    return [(end - timedelta(days=i // rows_per_day)).strftime(date_format)
+            for i in range(rows)]
+
+
+def bench(parse: Callable[[str, str], datetime],
+          rows: List[str],
+          date_format: str) -> float:
+    started = time.perf_counter()
+    for value in rows:
+        parse(value, date_format)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--rows-per-day', type=int, default=25)
+    args = parser.parse_args()
+
+    for date_format in PARSERS:
+        rows = values(args.rows, args.rows_per_day, date_format)
+        for name, parse in [('strptime', datetime.strptime),
+                            ('parse_datetime', parse_datetime)]:
+            elapsed = bench(parse, rows, date_format)
+            print('{:10} {:16} {:10.3f} s {:8.3f} us/date'.format(
+                date_format, name, elapsed, 1e6 * elapsed / len(rows)))
+
+
+if __name__ == '__main__':
+    main()
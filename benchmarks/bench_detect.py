@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the detection of the bank of files by their first bytes.
+
+Detects the plugin of generated files of every dialect over and over and
+prints the files/s (the head of a file is read from disk every time).
+
+Usage:
+
+    $ python benchmarks/bench_detect.py [--files 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from ofxstatement.plugins.nl.detect import detect
+
+from generators import GENERATORS, generate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    paths = [generate(dialect, args.rows, args.data_dir, args.seed)
+             for dialect in sorted(GENERATORS)]
+    for path in paths:
+        detection = detect(path)
+        assert detection is not None, path
+        print('{:50} {}'.format(os.path.basename(path), detection))
+
+    started = time.perf_counter()
+    for i in range(args.files):
+        detect(paths[i % len(paths)])
+    elapsed = time.perf_counter() - started
+    print('{} files in {:.3f} s: {:.0f} files/s'.format(
+        args.files, elapsed, args.files / elapsed))
+
+
+if __name__ == '__main__':
+    main()
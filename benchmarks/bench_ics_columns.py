@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the splitting of ICS lines into columns.
+
+Compares splitting every line of a generated ICS statement by spaces (the
+regular expression and the heuristics for the payee, place and country)
+against slicing the transaction lines by the columns learned per page.
+Only the rows are created (ICSCards Parser.split_records()).
+
+Usage:
+
+    $ python benchmarks/bench_ics_columns.py [--rows 100000]
+"""
+import argparse
+import io
+import random
+import time
+from unittest import mock
+
+from ofxstatement.plugins.nl.icscards import Columns, Parser
+
+from generators import ics
+
+
+def bench(text: str) -> float:
+    started = time.perf_counter()
+    for _ in Parser(io.StringIO(text)).split_records():
+        pass
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    out = io.StringIO()
+    ics(out, args.rows, random.Random(args.seed))
+    text = out.getvalue()
+
+    with mock.patch.object(Columns, 'learn', return_value=None):
+        spaces = bench(text)
+    columns = bench(text)
+    for name, elapsed in [('spaces', spaces), ('columns', columns)]:
+        print('{:8} {:10.3f} s {:8.3f} us/row'.format(
+            name, elapsed, 1e6 * elapsed / args.rows))
+
+
+if __name__ == '__main__':
+    main()
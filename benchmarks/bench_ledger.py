@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for loading a statement into an SQLite ledger.
+
+Converts a generated file to OFX (to /dev/null) and loads it into a new
+ledger and again into the same ledger (every row an update), and loads the
+lines of the file already parsed (the ledger alone). Prints the rows/s.
+
+Usage:
+
+    $ python benchmarks/bench_ledger.py [--rows 200000] [--dialect ing-comma]
+                                        [--batch-size 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Iterator, List
+
+from ofxstatement.plugins.nl.ledger import Ledger
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+from bench_plugins import get_parser
+from generators import generate
+
+
+class ParsedLines:
+    """A parser of lines parsed before."""
+
+    def __init__(self, parser: Any, lines: List[Any]) -> None:
+        self.statement = parser.statement
+        self.lines = lines
+
+    def iter_lines(self) -> Iterator[Any]:
+        return iter(self.lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--dialect', choices=['ing-comma', 'ing-semicolon', 'knab',
+                                              'asn', 'degiro'],
+                        default='ing-comma')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    path = generate(args.dialect, args.rows, args.data_dir, args.seed)
+
+    def report(label: str, rows: int, seconds: float) -> None:
+        print('{:28} {:10.0f} rows/s {:8} rows {:8.2f} s'.format(
+            label, rows / seconds, rows, seconds))
+
+    started = time.perf_counter()
+    ofx_parser = get_parser(args.dialect, path)
+    with open(os.devnull, 'w') as out:
+        statement = StreamingOfxWriter(ofx_parser).write(out)
+    ofx_parser.fin.close()
+    report('OFX', statement.line_count, time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'ledger.sqlite')
+        for label in ['ledger, new rows', 'ledger, updated rows']:
+            with Ledger(database, args.batch_size) as ledger:
+                ledger_parser = get_parser(args.dialect, path)
+                ledger.load(ledger_parser)
+                ledger_parser.fin.close()
+            report(label, ledger.rows, ledger.seconds)
+
+        # the ledger alone
+        lines_parser = get_parser(args.dialect, path)
+        lines = list(lines_parser.iter_lines())
+        lines_parser.fin.close()
+        database = os.path.join(directory, 'parsed.sqlite')
+        with Ledger(database, args.batch_size) as ledger:
+            ledger.load(ParsedLines(lines_parser, lines), path)
+        report('ledger of parsed lines', ledger.rows, ledger.seconds)
+
+
+if __name__ == '__main__':
+    main()
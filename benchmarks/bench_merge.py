@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the merge of overlapping exports of one account.
+
+Generates an ING file and cuts it into overlapping exports (every export
+has --overlap of the days of the previous one), then merges them with all
+lines in memory and with runs of --run-size lines spilled to disk. Every
+merge runs in a separate process and the rows/s, the lines left, the
+duplicates and the peak RSS are printed.
+
+Usage:
+
+    $ python benchmarks/bench_merge.py [--rows 200000] [--exports 4]
+                                       [--overlap 0.5] [--run-size 20000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from bench_plugins import peak_rss_kb
+from generators import generate
+
+
+def cut(path: str, exports: int, overlap: float, directory: str) -> List[str]:
+    """Overlapping exports of whole days of an ING file."""
+    with open(path, 'rb') as f:
+        header, *lines = f.readlines()
+    # the index of the first record of every day (the date is first)
+    days = [i for i, line in enumerate(lines)
+            if i == 0 or line[:10] != lines[i - 1][:10]] + [len(lines)]
+    size = (len(days) - 1) / (exports - (exports - 1) * overlap)
+    filenames = []
+    for n in range(exports):
+        start = int(n * size * (1 - overlap))
+        end = min(len(days) - 1, int(start + size + 0.5))
+        filename = os.path.join(directory, 'NL99INGB9999999999_{}.csv'.format(n))
+        with open(filename, 'wb') as out:
+            out.write(header)
+            out.writelines(lines[days[start]:days[end]])
+        filenames.append(filename)
+    return filenames
+
+
+def run(run_size: int, filenames: List[str]) -> Dict[str, Any]:
+    """Merge the files in this process and return the measurements."""
+    from ofxstatement.plugins.nl.ing import Plugin
+    from ofxstatement.plugins.nl.merge import MergeParser
+    from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+    started = time.perf_counter()
+    parser = MergeParser(Plugin(None, {}).get_parser, filenames, run_size)
+    with open(os.devnull, 'w') as out:
+        statement = StreamingOfxWriter(parser).write(out)
+    elapsed = time.perf_counter() - started
+    return {'rows_per_s': parser.cur_record / elapsed,
+            'lines': statement.line_count,
+            'duplicates': parser.duplicates,
+            'peak_rss_mb': peak_rss_kb() / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--exports', type=int, default=4)
+    parser.add_argument('--overlap', type=float, default=0.5)
+    parser.add_argument('--run-size', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    parser.add_argument('--run', nargs='+', metavar='ARG', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run(int(args.run[0]), args.run[1:])))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    path = generate('ing-comma', args.rows, args.data_dir, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = cut(path, args.exports, args.overlap, directory)
+        for label, run_size in [('in memory', args.rows * args.exports),
+                                ('runs of {}'.format(args.run_size), args.run_size)]:
+            output = subprocess.run([sys.executable, __file__, '--run', str(run_size),
+                                     *filenames],
+                                    stdout=subprocess.PIPE, check=True).stdout
+            result = json.loads(output)
+            print('{:20} {:10.0f} rows/s {:8} lines {:8} duplicates {:8.1f} MB'.format(
+                label, result['rows_per_s'], result['lines'], result['duplicates'],
+                result['peak_rss_mb']))
+
+
+if __name__ == '__main__':
+    main()
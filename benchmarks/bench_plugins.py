@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""End-to-end benchmark of the plugins on generated bank files.
+
+For every dialect of benchmarks/generators.py and every row count a file is
+generated (once, in the data directory) and converted to OFX by the plugin
+(iter_lines() and the StreamingOfxWriter) in a separate process, so the peak
+RSS is that of a single conversion. The results (rows/s, wall and CPU time,
+peak memory) are printed and, with --output, stored as JSON so releases can
+be compared.
+
+Usage:
+
+    $ python benchmarks/bench_plugins.py [--rows 10000 100000 1000000]
+                                         [--dialects ing-comma knab ...]
+                                         [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from generators import GENERATORS, generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def peak_rss_kb() -> int:
+    # Linux reports kilobytes, macOS bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def get_parser(dialect: str, path: str) -> Any:
+    if dialect.startswith('ing'):
+        from ofxstatement.plugins.nl.ing import Plugin
+        return Plugin(None, {}).get_parser(path)
+    if dialect == 'knab':
+        from ofxstatement.plugins.nl.knab import Plugin
+        return Plugin(None, {}).get_parser(path)
+    if dialect == 'asn':
+        from ofxstatement.plugins.nl.asn import Plugin
+        return Plugin(None, {}).get_parser(path)
+    if dialect == 'degiro':
+        from ofxstatement.plugins.nl.degiro import Plugin
+        return Plugin(None, {'account_id': 'ABC'}).get_parser(path)
+    assert dialect == 'ics'
+    from ofxstatement.plugins.nl.icscards import Plugin
+    # already converted by pdftotext -layout
+    return Plugin(None, {}).get_file_object_parser(open(path, 'r'))
+
+
+def run(dialect: str, path: str) -> Dict[str, Any]:
+    """Convert the file in this process and return the measurements."""
+    from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+    baseline = peak_rss_kb()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    parser = get_parser(dialect, path)
+    with open(os.devnull, 'w') as out:
+        statement = StreamingOfxWriter(parser).write(out)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {'records': parser.cur_record,
+            'lines': statement.line_count,
+            'wall_s': round(wall, 3),
+            'cpu_s': round(cpu, 3),
+            'rows_per_s': round(parser.cur_record / wall) if wall else None,
+            'peak_rss_mb': round(peak_rss_kb() / 1024, 1),
+            'peak_rss_delta_mb': round((peak_rss_kb() - baseline) / 1024, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dialects', nargs='+', choices=sorted(GENERATORS),
+                        default=list(GENERATORS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    parser.add_argument('--output', help='JSON file to store the results in')
+    parser.add_argument('--run', nargs=2, metavar=('DIALECT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        try:
+            result = run(*args.run)
+        except Exception as e:
+            result = {'error': '{}: {}'.format(type(e).__name__, e)}
+        print(json.dumps(result))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    about = runpy.run_path(os.path.join(HERE, '..', '__about__.py'))
+    results: Dict[str, Any] = {
+        'version': about['__version__'],
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': [],
+    }
+    for dialect in args.dialects:
+        for rows in args.rows:
+            path = generate(dialect, rows, args.data_dir, args.seed)
+            output = subprocess.run([sys.executable, __file__, '--run', dialect, path],
+                                    stdout=subprocess.PIPE,
+                                    check=True).stdout
+            result = dict(dialect=dialect, rows=rows, **json.loads(output))
+            results['results'].append(result)
+            if 'error' in result:
+                print('{:14} {:>8} {}'.format(dialect, rows, result['error']))
+            else:
+                print('{:14} {:>8} {:10.0f} rows/s {:8.2f} s {:8.1f} MB peak RSS'.format(
+                    dialect, rows, result['rows_per_s'], result['wall_s'], result['peak_rss_mb']))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the conversion of a CSV row into a statement line.
+
+Compares the mapping loop of ofxstatement's CsvStatementParser.parse_record()
+(look up the type of every field with parse_value() for every row, on a copy
+of the row as the parsers used to change it) against the row mapper compiled
+by CsvStatementParser.compile_mappings(), for the rows of the generated bank
+files of benchmarks/generators.py.
+
+The parsers used to change some columns before calling parse_record() so the
+interpreted figures are a lower bound.
+
+Usage:
+
+    $ python benchmarks/bench_row_mapper.py [--rows 100000]
+                                            [--dialects ing-comma knab ...]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, List
+
+from generators import generate
+
+from ofxstatement.plugins.nl.statement import StatementLine
+
+from bench_plugins import get_parser
+
+DIALECTS = ['ing-comma', 'ing-semicolon', 'knab', 'asn', 'degiro']
+
+
+def transaction_rows(parser: Any) -> List[List[str]]:
+    """Return the rows of the file the parser turns into a statement line
+    (this also compiles the row mapper)."""
+    rows = []
+    for row in parser.split_records():
+        parser.cur_record += 1
+        if parser.parse_record(row) is not None:
+            rows.append(row)
+    return rows
+
+
+def bench_interpreted(parser: Any, rows: List[List[str]]) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        line = list(row)
+        stmt_line = StatementLine()
+        for field, col in parser.mappings.items():
+            if col >= len(line):
+                raise ValueError("Cannot find column %s in line of %s items "
+                                 % (col, len(line)))
+            setattr(stmt_line, field, parser.parse_value(line[col], field))
+    return time.perf_counter() - started
+
+
+def bench_compiled(parser: Any, rows: List[List[str]]) -> float:
+    row_to_line = parser.row_to_line
+    started = time.perf_counter()
+    for row in rows:
+        row_to_line(row)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dialects', nargs='+', choices=DIALECTS, default=DIALECTS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    for dialect in args.dialects:
+        stmt_parser = get_parser(dialect, generate(dialect, args.rows, args.data_dir, args.seed))
+        rows = transaction_rows(stmt_parser)
+        for name, bench in [('interpreted', bench_interpreted),
+                            ('compiled', bench_compiled)]:
+            elapsed = bench(stmt_parser, rows)
+            print('{:14} {:12} {:10.3f} s {:8.2f} us/row'.format(
+                dialect, name, elapsed, 1e6 * elapsed / len(rows)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the memory use of statement lines.
+
+Compares the peak RSS of a statement with ofxstatement's StatementLine
+(switched to the adjust class like the parsers used to do) against the
+compact StatementLine of this package. Each layout runs in its own process.
+
+Usage:
+
+    $ python benchmarks/bench_statement_line.py [--lines 500000]
+"""
+import argparse
+import resource
+import subprocess
+import sys
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Any, List
+
+from ofxstatement.statement import StatementLine as BaseStatementLine
+
+from ofxstatement.plugins.nl.statement import StatementLine
+
+
+class AdjustStatementLine(BaseStatementLine):
+    """The old ofxstatement.plugins.nl.statement.StatementLine"""
+
+
+LAYOUTS = ['ofxstatement', 'compact']
+
+
+def peak_rss_kb() -> int:
+    # Linux reports kilobytes, macOS bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def build(layout: str, count: int) -> List[Any]:
+    """Lines like the ING parser creates them: a parsed date, a Decimal
+    amount and the strings of the CSV row.
+    """
+    start = datetime(2018, 1, 1)
+    lines: List[Any] = []
+    for i in range(count):
+        date = datetime.strptime((start + timedelta(days=i // 500))
+                                 .strftime('%Y%m%d'), '%Y%m%d')
+        amount = Decimal('-{},{:02d}'.format(i % 100, i % 97).replace(',', '.'))
+        payee = 'Albert Heijn {} (NL99ASNB9999999999)'.format(i % 20)
+        memo = 'Pasvolgnr: 001 {} Transactie: {:08X}'.format(i % 1000, i)
+        if layout == 'compact':
+            stmt_line = StatementLine(date=date, memo=memo, amount=amount)
+        else:
+            stmt_line = BaseStatementLine(date=date, memo=memo, amount=amount)
+            stmt_line.__class__ = AdjustStatementLine
+        stmt_line.payee = payee
+        stmt_line.date_user = date
+        stmt_line.id = '{:040x}'.format(i)
+        stmt_line.trntype = 'DEBIT'
+        lines.append(stmt_line)
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=500000)
+    parser.add_argument('--layout', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        baseline = peak_rss_kb()
+        lines = build(args.layout, args.lines)
+        print(peak_rss_kb() - baseline, len(lines))
+        return
+
+    for layout in LAYOUTS:
+        output = subprocess.check_output([sys.executable,
+                                          __file__,
+                                          '--lines', str(args.lines),
+                                          '--layout', layout])
+        rss_kb = int(output.split()[0])
+        print('{:14} {:10.1f} MB peak RSS {:8.0f} bytes/line'.format(
+            layout, rss_kb / 1024, rss_kb * 1024 / args.lines))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the generation of unique transaction ids.
+
+Compares ofxstatement's generate_unique_transaction_id() (with the regular
+expression the adjust method used to need) against TransactionIdRegistry on
+a synthetic statement with many identical small card payments.
+
+Usage:
+
+    $ python benchmarks/bench_unique_id.py [--lines 1000000]
+"""
+import argparse
+import re
+import time
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Iterator, Set
+
+from ofxstatement.statement import StatementLine, \
+    generate_unique_transaction_id
+
+from ofxstatement.plugins.nl.statement import TransactionIdRegistry
+
+
+def statement_lines(count: int) -> Iterator[StatementLine]:
+    """Roughly three years of card payments at 50 merchants for 20 different
+    amounts so the same (date, memo, amount) comes back a lot.
+    """
+    start = datetime(2018, 1, 1)
+    amounts = [Decimal(-125 - 5 * i).scaleb(-2) for i in range(20)]
+    for i in range(count):
+        yield StatementLine(date=start + timedelta(days=i % 1000),
+                            memo='Betaalautomaat {}'.format(i % 50),
+                            amount=amounts[i % 19])
+
+
+def bench_set(count: int) -> float:
+    unique_id_set: Set[str] = set()
+    started = time.perf_counter()
+    for stmt_line in statement_lines(count):
+        id = generate_unique_transaction_id(stmt_line, unique_id_set)
+        m = re.match(r'([0-9a-f]+)(-\d+)?$', id)
+        assert m
+    return time.perf_counter() - started
+
+
+def bench_registry(count: int) -> float:
+    unique_ids = TransactionIdRegistry()
+    started = time.perf_counter()
+    for stmt_line in statement_lines(count):
+        unique_ids.register(stmt_line)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    args = parser.parse_args()
+
+    for name, bench in [('generate_unique_transaction_id', bench_set),
+                        ('TransactionIdRegistry', bench_registry)]:
+        elapsed = bench(args.lines)
+        print('{:32} {:10.3f} s {:12.0f} lines/s'.format(
+            name, elapsed, args.lines / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for incremental conversions with a watermark.
+
+Converts a generated file without a watermark, with an empty watermark
+(every line new), with a watermark of the same file (every line known) and
+with a watermark of an earlier export holding the first 90% of its records
+(a cumulative export), and prints the rows/s.
+
+Usage:
+
+    $ python benchmarks/bench_watermark.py [--rows 100000] [--dialect ing-comma]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+from bench_plugins import get_parser
+from generators import generate
+
+# the lines before the first record of the CSV dialects
+HEADER_LINES = {'ing-comma': 1, 'ing-semicolon': 1, 'knab': 2, 'asn': 0, 'degiro': 1}
+
+
+def convert(dialect: str, path: str, database: Optional[str]) -> Dict[str, Any]:
+    """Convert a file (to /dev/null) with the watermark database."""
+    from ofxstatement.plugins.nl.watermark import apply_watermark, commit_watermark
+
+    started = time.perf_counter()
+    parser = get_parser(dialect, path)
+    if database is not None:
+        apply_watermark(parser, {'watermark': database})
+    with open(os.devnull, 'w') as out:
+        statement = StreamingOfxWriter(parser).write(out)
+    parser.fin.close()
+    commit_watermark(parser)
+    elapsed = time.perf_counter() - started
+    watermark = parser.watermark
+    return {'rows_per_s': parser.cur_record / elapsed,
+            'new': statement.line_count if watermark is None else watermark.new,
+            'known': 0 if watermark is None else watermark.known}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dialect', choices=sorted(HEADER_LINES), default='ing-comma')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'ofxstatement-dutch-bench'),
+                        help='directory for the generated files (default: %(default)s)')
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    path = generate(args.dialect, args.rows, args.data_dir, args.seed)
+
+    def report(label: str, result: Dict[str, Any]) -> None:
+        print('{:32} {:10.0f} rows/s {:8} new {:8} known'.format(
+            label, result['rows_per_s'], result['new'], result['known']))
+
+    with tempfile.TemporaryDirectory() as directory:
+        report('no watermark', convert(args.dialect, path, None))
+        database = os.path.join(directory, 'watermark.sqlite')
+        report('watermark, every line new', convert(args.dialect, path, database))
+        report('watermark, every line known', convert(args.dialect, path, database))
+
+        # an earlier export: the first 90% of the records
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+        header = HEADER_LINES[args.dialect]
+        earlier = os.path.join(directory, os.path.basename(path))
+        with open(earlier, 'wb') as out:
+            out.writelines(lines[:header + 9 * (len(lines) - header) // 10])
+        database = os.path.join(directory, 'cumulative.sqlite')
+        convert(args.dialect, earlier, database)
+        report('watermark, 10% new', convert(args.dialect, path, database))
+
+
+if __name__ == '__main__':
+    main()
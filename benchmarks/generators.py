@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""Deterministic generators of big bank files for the benchmarks.
+
+Every generator writes rows in the exact dialect of a bank export:
+
+- ing-comma: ING CSV, comma separated and quoted, header with MutatieSoort;
+- ing-semicolon: ING CSV, semicolon separated, header with Mutatiesoort and
+  the extra columns of the newer exports;
+- knab: Knab CSV with the KNAB EXPORT preamble;
+- asn: ASN CSV without header, quotechar ';
+- degiro: DEGIRO Account.csv;
+- ics: ICS Cards statement as converted by pdftotext -layout.
+
+The same seed and row count give the same file. Usage:
+
+    $ python benchmarks/generators.py ing-comma 10000 /tmp/bench
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from typing import Callable, Dict, TextIO, Tuple
+
+SHOPS = ['Albert Heijn 1306', 'Jumbo Utrecht', 'HEMA Amsterdam', 'Kruidvat 7012',
+         'NS Groep', 'Shell Zeist', 'Bol.com', 'Coolblue BV', 'Etos 3561',
+         'Gemeente Utrecht', 'Eneco', 'Ziggo Services BV', 'Belastingdienst']
+NAMES = ['G. Janssen', 'J. de Vries', 'M. Bakker', 'P. Visser', 'A. Smit',
+         'Stichting Wakker Dier', 'Vereniging Eigen Huis']
+ACCOUNTS = ['NL91ABNA0417164300', 'NL20INGB0001234567', 'NL39RABO0300065264',
+            'NL02ASNB0123456789', 'NL86INGB0002445588']
+
+ENCODING = 'ISO-8859-1'
+
+MONTHS = ['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli',
+          'augustus', 'september', 'oktober', 'november', 'december']
+MONTH_ABBREVIATIONS = ['jan.', 'feb.', 'mrt.', 'apr.', 'mei', 'jun.', 'jul.',
+                       'aug.', 'sep.', 'okt.', 'nov.', 'dec.']
+
+
+def dutch_amount(cents: int, thousands: bool = False) -> str:
+    """Return an absolute amount like 1234,56 (or 1.234,56).
+
+    >>> dutch_amount(-123456, thousands=True)
+    '1.234,56'
+    """
+    euros, cents = divmod(abs(cents), 100)
+    return '{},{:02d}'.format(
+        '{:,}'.format(euros).replace(',', '.') if thousands else euros,
+        cents)
+
+
+def decimal_amount(cents: int) -> str:
+    """Return a signed amount like -1234.56.
+
+    >>> decimal_amount(-123456)
+    '-1234.56'
+    """
+    return '{}{}.{:02d}'.format('-' if cents < 0 else '', *divmod(abs(cents), 100))
+
+
+def random_cents(rnd: random.Random) -> int:
+    # mostly small debits, some credits, a few zero-value notifications
+    kind = rnd.random()
+    if kind < 0.02:
+        return 0
+    if kind < 0.85:
+        return -rnd.randint(50, 15000)
+    return rnd.randint(1000, 350000)
+
+
+def row_dates(rows: int, end: date, rows_per_day: int = 25) -> Callable[[int], date]:
+    """The date of row i (0 is the oldest) for a file ending at end."""
+    start = end - timedelta(days=rows // rows_per_day)
+
+    def row_date(i: int) -> date:
+        return start + timedelta(days=i // rows_per_day)
+
+    return row_date
+
+
+def ing(out: TextIO, rows: int, rnd: random.Random, delimiter: str) -> None:
+    account = 'NL99INGB9999999999'
+    if delimiter == ',':
+        header = ['Datum', 'Naam / Omschrijving', 'Rekening', 'Tegenrekening',
+                  'Code', 'Af Bij', 'Bedrag (EUR)', 'MutatieSoort',
+                  'Mededelingen']
+    else:
+        header = ['Datum', 'Naam / Omschrijving', 'Rekening', 'Tegenrekening',
+                  'Code', 'Af Bij', 'Bedrag (EUR)', 'Mutatiesoort',
+                  'Mededelingen', 'Saldo na mutatie', 'Tag']
+    fmt = delimiter.join(['"{}"'] * len(header)) + '\n'
+
+    out.write(fmt.format(*header))
+    row_date = row_dates(rows, date(2020, 5, 30))
+    balance = 0
+    # newest first
+    for i in reversed(range(rows)):
+        cents = random_cents(rnd)
+        balance += cents
+        if rnd.random() < 0.6:
+            name = rnd.choice(SHOPS)
+            counter_account = ''
+            code, kind = 'BA', 'Betaalautomaat'
+            memo = 'Pasvolgnr: 005 {} Transactie: {:08X} Term: CT{:06d}'.format(
+                row_date(i).strftime('%d-%m-%Y'), i, rnd.randint(0, 999999))
+        else:
+            name = rnd.choice(NAMES)
+            counter_account = rnd.choice(ACCOUNTS)
+            code, kind = 'GT', 'Online bankieren'
+            memo = 'Naam: {} Omschrijving: factuur {} IBAN: {}'.format(
+                name, rnd.randint(1000, 99999), counter_account)
+        fields = [row_date(i).strftime('%Y%m%d'),
+                  name,
+                  account,
+                  counter_account,
+                  code,
+                  'Af' if cents < 0 else 'Bij',
+                  dutch_amount(cents),
+                  kind,
+                  memo]
+        if delimiter != ',':
+            fields += ['{}{}'.format('-' if balance < 0 else '', dutch_amount(balance)), '']
+        out.write(fmt.format(*fields))
+
+
+def ing_comma(out: TextIO, rows: int, rnd: random.Random) -> None:
+    ing(out, rows, rnd, ',')
+
+
+def ing_semicolon(out: TextIO, rows: int, rnd: random.Random) -> None:
+    ing(out, rows, rnd, ';')
+
+
+def knab(out: TextIO, rows: int, rnd: random.Random) -> None:
+    account = 'NL99KNAB9999999999'
+    out.write('KNAB EXPORT;;;;;;;;;;;;;;;;\n')
+    out.write('Rekeningnummer;Transactiedatum;Valutacode;CreditDebet;Bedrag;'
+              'Tegenrekeningnummer;Tegenrekeninghouder;Valutadatum;Betaalwijze;'
+              'Omschrijving;Type betaling;Machtigingsnummer;Incassant ID;Adres;'
+              'Referentie;Boekdatum;\n')
+    fmt = ';'.join(['"{}"'] * 16) + ';\n'
+    row_date = row_dates(rows, date(2020, 3, 28))
+    for i in range(rows):
+        cents = random_cents(rnd)
+        booked = row_date(i)
+        if rnd.random() < 0.5:
+            counter_account, name, kind = rnd.choice(ACCOUNTS), rnd.choice(NAMES), 'Overboeking'
+        else:
+            counter_account, name, kind = '', rnd.choice(SHOPS), 'Betaalautomaat'
+        out.write(fmt.format(account,
+                             (booked - timedelta(days=2)).strftime('%d-%m-%Y'),
+                             'EUR',
+                             'D' if cents < 0 else 'C',
+                             dutch_amount(cents),
+                             counter_account,
+                             name,
+                             (booked - timedelta(days=1)).strftime('%d-%m-%Y'),
+                             kind,
+                             'Omschrijving {}'.format(rnd.randint(1, 9999)),
+                             '', '', '', '',
+                             'C0C{:013X}'.format(i),
+                             booked.strftime('%d-%m-%Y')))
+
+
+def asn(out: TextIO, rows: int, rnd: random.Random) -> None:
+    account = 'NL00ASNB9999999999'
+    row_date = row_dates(rows, date(2022, 7, 17))
+    balance = 13044
+    for i in range(rows):
+        cents = random_cents(rnd)
+        booked = row_date(i).strftime('%d-%m-%Y')
+        if rnd.random() < 0.7:
+            counter_account, name = rnd.choice(ACCOUNTS), rnd.choice(NAMES)
+            memo = "'Factuur {} klantnummer {}'".format(rnd.randint(1000, 99999),
+                                                        rnd.randint(1000, 99999))
+        else:
+            counter_account, name = '', ''
+            memo = "'Kosten gebruik betaalrekening inclusief 1 betaalpas'"
+        out.write(','.join([booked,
+                            account,
+                            counter_account,
+                            name,
+                            '', '', '',
+                            'EUR',
+                            decimal_amount(balance),
+                            'EUR',
+                            decimal_amount(cents),
+                            booked,
+                            booked,
+                            str(rnd.randint(1000, 9999)),
+                            rnd.choice(['NGM', 'IDM', 'MSC', 'OVS']),
+                            '{:08d}'.format(50000000 + i),
+                            '',
+                            memo,
+                            str(1 + i // 1000)]) + '\n')
+        balance += cents
+
+
+def degiro(out: TextIO, rows: int, rnd: random.Random) -> None:
+    out.write('Datum,Tijd,Valutadatum,Product,ISIN,Omschrijving,FX,Mutatie,,Saldo,,Order Id\n')
+    row_date = row_dates(rows, date(2020, 3, 17))
+    products = [('VANECK AEX', 'NL0009272749'),
+                ('MORGAN STANLEY EUR LIQUIDITY FUND', 'LU1959429272')]
+    # newest first
+    for i in reversed(range(rows)):
+        booked = row_date(i).strftime('%d-%m-%Y')
+        kind = rnd.random()
+        product, isin = '', ''
+        if kind < 0.3:
+            memo, cents = 'iDEAL Deposit', rnd.randint(1000, 500000)
+        elif kind < 0.45:
+            memo, cents = 'Terugstorting', -rnd.randint(1000, 500000)
+        elif kind < 0.6:
+            product, isin = rnd.choice(products)
+            memo, cents = 'Dividend', rnd.randint(1, 5000)
+        elif kind < 0.7:
+            memo, cents = 'DEGIRO transactiekosten', -rnd.randint(1, 500)
+        else:
+            product, isin = rnd.choice(products)
+            memo = 'Koop {} @ {},{:02d} EUR'.format(
+                rnd.randint(1, 50), rnd.randint(10, 99), rnd.randint(0, 99))
+            cents = -rnd.randint(1000, 500000)
+        out.write('{},{:02d}:{:02d},{},{},{},"{}",,EUR,"{}{}",EUR,"{}",\n'.format(
+            booked, rnd.randint(8, 22), rnd.randint(0, 59), booked, product, isin,
+            memo, '-' if cents < 0 else '', dutch_amount(cents),
+            dutch_amount(rnd.randint(0, 1000000))))
+
+
+def ics(out: TextIO, rows: int, rnd: random.Random) -> None:
+    end = date(2025, 4, 17)
+    rows_per_page = 40
+    pages = max(1, (rows + rows_per_page - 1) // rows_per_page)
+
+    def euro(cents: int) -> str:
+        return '€' + dutch_amount(cents, thousands=True)
+
+    def af_bij(cents: int) -> str:
+        return 'Af' if cents < 0 else 'Bij' if cents > 0 else ''
+
+    lines = []
+    total = 0
+    received = 0
+    for i in range(rows):
+        # no zero-value notifications on a card statement
+        cents = random_cents(rnd) or -99
+        total += cents
+        received += max(cents, 0)
+        booked = end - timedelta(days=300 - (300 * i) // max(rows, 1))
+        transaction = booked - timedelta(days=1)
+        d1 = '{:02d} {}'.format(transaction.day, MONTH_ABBREVIATIONS[transaction.month - 1])
+        d2 = '{:02d} {}'.format(booked.day, MONTH_ABBREVIATIONS[booked.month - 1])
+        amount = '{:>7}   {}'.format(dutch_amount(cents, thousands=True),
+                                     af_bij(cents))
+        if cents > 0:
+            lines.append('{:15}{:18}{:96}{:>20}'.format(
+                d1, d2, 'IDEAL BETALING, DANK U', amount))
+        else:
+            lines.append('{:15}{:18}{:48}{:33}{:2}{:>52}'.format(
+                d1, d2, rnd.choice(SHOPS).upper(),
+                rnd.choice(['AMSTERDAM', 'UTRECHT', 'PARIS', 'ITUNES.COM']),
+                rnd.choice(['NL', 'FR', 'IE']), amount))
+
+    start_balance = -rnd.randint(0, 100000)
+    end_balance = start_balance + total
+    out.write('International Card Services BV                                 www.icscards.nl\n'
+              'Postbus 23225                                                  Bankrek. NL99ABNA9999999999\n'
+              '1100 DS Diemen                                                 BIC: ABNANL2A\n'
+              'Telefoon 020 - 6 600 600                                       ICS identificatienummer bij incasso:\n'
+              'Kvk Amsterdam nr. 33.200.596                                   NL99ZZZ999999999999\n\n\n\n')
+    for page in range(pages):
+        out.write('Datum                                       ICS-klantnummer                             '
+                  'Volgnummer                                   Bladnummer\n')
+        out.write('{:44}{:44}{:45}{} van {}\n'.format(
+            '{} {} {}'.format(end.day, MONTHS[end.month - 1], end.year),
+            '99999999999', '4', page + 1, pages))
+        if page == 0:
+            out.write('Vorig openstaand saldo                      Totaal ontvangen betalingen                 '
+                      'Totaal nieuwe uitgaven                       Nieuw openstaand saldo\n')
+            out.write('{:36}{:8}{:44}{:37}{:8}{:23}{}\n\n\n\n\n'.format(
+                euro(start_balance), af_bij(start_balance),
+                euro(received),
+                euro(received - total), 'Af',
+                euro(end_balance), af_bij(end_balance)))
+        out.write("Datum           Datum              Omschrijving                                                   "
+                  "                                Bedrag in                   Bedrag\n"
+                  "transactie      boeking                                                                           "
+                  "                                vreemde valuta              in euro's\n\n"
+                  "Uw Card met als laatste vier cijfers 2641\n"
+                  "G.J. JANSSEN\n")
+        for line in lines[page * rows_per_page:(page + 1) * rows_per_page]:
+            out.write(line + '\n')
+        out.write('\n\n\n\n\x0c')
+
+
+GENERATORS: Dict[str, Tuple[Callable[[TextIO, int, random.Random], None], str]] = {
+    # dialect: (generator, file name pattern)
+    'ing-comma': (ing_comma, 'NL99INGB9999999999_{rows}_comma.csv'),
+    'ing-semicolon': (ing_semicolon, 'NL99INGB9999999999_{rows}_semicolon.csv'),
+    'knab': (knab, 'Knab_transactieoverzicht_{rows}.csv'),
+    'asn': (asn, 'transactie-historie_NL00ASNB9999999999_{rows}.csv'),
+    'degiro': (degiro, 'Account_{rows}.csv'),
+    'ics': (ics, 'icscards_{rows}.txt'),
+}
+
+
+def generate(dialect: str, rows: int, directory: str, seed: int = 42) -> str:
+    """Write a file of rows records in the dialect and return its path.
+
+    An existing file is reused since the output only depends on the
+    arguments.
+    """
+    generator, pattern = GENERATORS[dialect]
+    path = os.path.join(directory, pattern.format(rows=rows))
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8' if dialect == 'ics' else ENCODING) as out:
+            generator(out, rows, random.Random('{}-{}-{}'.format(seed, dialect, rows)))
+        os.replace(tmp, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dialect', choices=sorted(GENERATORS))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('directory')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    print(generate(args.dialect, args.rows, args.directory, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -91,10 +91,12 @@ if __name__ == '__main__':
         ],
         entry_points={
             'ofxstatement':
-            ['nl-degiro = ofxstatement.plugins.nl.degiro:Plugin',
-             'nl-icscards = ofxstatement.plugins.nl.icscards:Plugin',
-             'nl-ing = ofxstatement.plugins.nl.ing:Plugin',
-             'nl-knab = ofxstatement.plugins.nl.knab:Plugin',
-             'nl-asn = ofxstatement.plugins.nl.asn:Plugin']
+            ['nl-degiro = ofxstatement.plugins.nl.plugins:DegiroPlugin',
+             'nl-icscards = ofxstatement.plugins.nl.plugins:IcsCardsPlugin',
+             'nl-ing = ofxstatement.plugins.nl.plugins:IngPlugin',
+             'nl-knab = ofxstatement.plugins.nl.plugins:KnabPlugin',
+             'nl-asn = ofxstatement.plugins.nl.plugins:AsnPlugin'],
+            'console_scripts':
+            ['ofxstatement-nl-batch = ofxstatement.plugins.nl.batch:main']
         },
     )
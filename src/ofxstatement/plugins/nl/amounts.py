@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Parsing of the amounts in the bank files into integer cents.
+
+The amounts in the files have two decimals, so the parsers handle them as
+an integer number of cents (see StatementLine.cents) and a Decimal is only
+created for the output (StatementLine.amount).
+
+Every function returns None for a value it does not recognise, so the
+caller can fall back to Decimal: the result is then exactly what it was.
+"""
+from typing import Optional
+
+from decimal import Decimal
+
+
+def _is_digits(value: str) -> bool:
+    # Decimal() accepts all Unicode digits but let it handle those
+    return value.isdigit() and value.isascii()
+
+
+def parse_cents(value: str) -> Optional[int]:
+    """Return the number of cents of a signed amount with two decimals and
+    a decimal point or comma, like ofxstatement's parse_decimal() does:
+    spaces are ignored.
+
+    Returns None for anything else, including -0.00 (no number of cents).
+
+    >>> parse_cents('-1234,56')
+    -123456
+    >>> parse_cents('0.05')
+    5
+    >>> parse_cents('1.234,56') is None
+    True
+    """
+    if ' ' in value:
+        value = value.replace(' ', '')
+    negative = value[:1] == '-'
+    digits = value[1 if negative else 0:-3] + value[-2:]
+    if len(digits) < 3 or value[-3] not in '.,' or not _is_digits(digits):
+        return None
+    result = int(digits)
+    if negative:
+        # -0.00 has no number of cents
+        return -result if result else None
+    return result
+
+
+def parse_dutch_cents(value: str) -> Optional[int]:
+    """Return the number of cents of an absolute amount with two decimals
+    and thousands separators, optionally preceded by a currency.
+
+    The amount may be Dutch (1.827,97) or English (1,827.97), the currency
+    may be followed by a space or not (€ 1.827,97 or €1.827,97).
+
+    >>> parse_dutch_cents('€ 1.827,97')
+    182797
+    >>> parse_dutch_cents('€1.827,97')
+    182797
+    >>> parse_dutch_cents('1,827.97')
+    182797
+    >>> parse_dutch_cents('0,00')
+    0
+    """
+    # the amount is the trailing run of digits and separators
+    currency = value.rstrip('0123456789,.')
+    amount = value[len(currency):]
+    # the currency is one character or has no spaces and is followed by one
+    if len(currency) > 1 and \
+       not (currency[-1].isspace() and currency[:-1].split() == [currency[:-1]]):
+        return None
+    if len(amount) < 4 or amount[-3] not in ',.':
+        return None
+    # the other separator is the thousands separator
+    thousands = '.' if amount[-3] == ',' else ','
+    digits = amount[:-3].replace(thousands, '') + amount[-2:]
+    if len(digits) < 3 or not _is_digits(digits):
+        return None
+    return int(digits)
+
+
+def to_decimal(cents: int) -> Decimal:
+    """The amount of a number of cents (with two decimals).
+
+    >>> to_decimal(-5)
+    Decimal('-0.05')
+    """
+    return Decimal(cents).scaleb(-2)
@@ -1,19 +1,18 @@
 # -*- coding: utf-8 -*-
-from typing import Optional, List, Iterator, Any, Dict, TextIO
+from typing import Optional, List, Iterator, Any, Callable, Dict, TextIO
 
-import re
 import csv
 import sys
 import datetime
 import logging
 from decimal import Decimal
 
-from ofxstatement.plugin import Plugin as BasePlugin
-from ofxstatement.parser import CsvStatementParser
 from ofxstatement.exceptions import ParseError
 from ofxstatement.statement import BankAccount
 
+from ofxstatement.plugins.nl.parser import CsvStatementParser
 from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.plugins import AsnPlugin
 
 # Need Python 3 for super() syntax
 assert sys.version_info[0] >= 3, "At least Python 3 is required."
@@ -177,29 +176,38 @@ class Parser(CsvStatementParser):
         self.statement = Statement(bank_id="ASNBNL21",
                                    account_id=account_id,
                                    currency="EUR")  # My Statement
+        self.row_to_line = self.compile_transaction()
 
-    def parse(self) -> Statement:
-        """Main entry point for parsers
-
-        super() implementation will call to split_records and parse_record to
-        process the file.
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
         """
-
-        # Python 3 needed
-        stmt: Statement = super().parse()
+        stmt: Statement = self.statement
 
         # GJP 2020-03-03
         # No need to (re)calculate the balance since there is no history.
         # But set the dates.
-        if stmt.lines:
-            stmt.start_date = min(sl.date for sl in stmt.lines)
+        if stmt.line_count:
+            stmt.start_date = stmt.min_date
             # end date is exclusive for OFX
-            stmt.end_date = max(sl.date for sl in stmt.lines)
-            stmt.end_date += datetime.timedelta(days=1)
-            stmt.start_balance = Decimal(stmt.lines[0].start_balance)
-            stmt.end_balance = Decimal(stmt.lines[-1].start_balance) + stmt.lines[-1].amount
+            stmt.end_date = stmt.max_date + datetime.timedelta(days=1)
+            stmt.start_balance = Decimal(stmt.first_line.start_balance)
+            stmt.end_balance = Decimal(stmt.last_line.start_balance) + stmt.last_line.amount
+
+    def compile_transaction(self) -> Callable[[List[str]], StatementLine]:
+        """Return the function creating the statement line of a transaction
+        row (see compile_mappings()).
+
+        With a counter account the payee becomes
+        "<name> (<counter account>)", without one the payee is empty.
+        """
+        name: int = self.mappings['payee']
+        bank_account_to: int = self.mappings['bank_account_to']
 
-        return stmt
+        def get_payee(line: List[str]) -> str:
+            return "{} ({})".format(line[name], line[bank_account_to]) \
+                if line[bank_account_to] else ''
+
+        return self.compile_mappings(self.mappings, payee=get_payee)
 
     def split_records(self) -> Iterator[Any]:
         """Return iterable object consisting of a line per transaction
@@ -239,22 +247,12 @@ this line's account: {}".format(self.statement.account_id, line[1])
         else:
             self.statement.account_id = line[1]
 
-        if line[self.mappings['bank_account_to']]:
-            line[self.mappings['payee']] =\
-                "{} ({})".format(line[self.mappings['payee']],
-                                 line[self.mappings['bank_account_to']])
-        else:
-            line[self.mappings['payee']] = ''
-
-        # Python 3 needed
-        stmt_line: StatementLine = super().parse_record(line)
+        stmt_line: StatementLine = self.row_to_line(line)
 
         # Remove zero-value notifications
-        if stmt_line.amount == 0:
+        if stmt_line.amount_sign == 0:
             return None
 
-        stmt_line.__class__ = StatementLine
-
         # The unique id is a combination of 'Journaaldatum' and 'Volgnummer transactie'
         # Let id be <Journaaldatum in yyyymmdd format>.<Volgnummer transactie>
         assert self.mappings['date'] == 11  # Journaaldatum
@@ -269,7 +267,7 @@ this line's account: {}".format(self.statement.account_id, line[1])
 
         stmt_line.start_balance = Decimal(str(line[start_balance])) if line[start_balance] is not None else Decimal(0)
 
-        if stmt_line.amount < 0:
+        if stmt_line.amount_sign < 0:
             stmt_line.trntype = "DEBIT"
         else:
             stmt_line.trntype = "CREDIT"
@@ -284,14 +282,5 @@ this line's account: {}".format(self.statement.account_id, line[1])
         return stmt_line
 
 
-class Plugin(BasePlugin):
-    """ASN Bank, The Netherlands, CSV (https://www.asnbank.nl/)
-    """
-    def get_parser(self, filename: str) -> Parser:
-        p = re.compile('transactie-historie_(NL\\d+ASNB\\d+)_\\d+\\.csv')
-        m = p.search(filename)
-        account_id: Optional[str] = None
-        if m:
-            account_id = m.group(1)
-        fin = open(filename, "r")  # , encoding="ISO-8859-1")
-        return Parser(fin, account_id)
+# backwards compatibility: the plugin used to be defined here
+Plugin = AsnPlugin
@@ -0,0 +1,644 @@
+# -*- coding: utf-8 -*-
+"""Batch conversion of statement files to OFX by a pool of processes.
+
+    $ ofxstatement-nl-batch [-c config.ini] [-t [PATTERN=]TYPE] [-o DIR]
+                            [-w WORKERS] [--cache DIR] [--merge]
+                            [--since DATE] [--until DATE] [--date-index]
+                            [--ledger FILE] INPUT...
+
+An input is a file, a directory (all its files) or a glob pattern. The type
+(a section of the ofxstatement configuration or a plugin name) of a file is
+the first -t whose pattern matches its name or else the plugin detected by
+its first bytes (see detect.py) or its name (see detect_plugin()). Files
+without a type are skipped.
+
+Every file is converted to an OFX file of the same name (extension .ofx),
+next to the input or in the output directory, in a worker process that
+imports the plugins once. A file that fails leaves no output and does not
+stop the others, not even when it kills its worker; the throughput and the
+failures are logged at the end.
+
+With --merge the files of one type and account (detected by the first
+bytes) are converted to one OFX file named after the account, every
+transaction once (see merge.py).
+
+With --since and/or --until only the transactions of those dates are
+converted; --date-index lets the ING and DEGIRO files be read through a
+date index (see dateindex.py).
+
+With --ledger the files are loaded into an SQLite database instead of
+converted to OFX files (see ledger.py).
+
+With --cache the OFX files are kept in a ConversionCache (see cache.py), so
+an unchanged file is copied from the cache instead of converted again. A
+type with the setting watermark (see watermark.py) is always converted,
+since its OFX depends on the transactions converted before.
+"""
+from typing import Any, Dict, IO, Iterator, List, MutableMapping, \
+    NamedTuple, Optional, Sequence, Tuple
+
+import argparse
+import fnmatch
+import glob
+import io
+import logging
+import os
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from ofxstatement import configuration
+from ofxstatement.exceptions import ParseError, ValidationError
+
+from ofxstatement.plugins.nl import plugins
+from ofxstatement.plugins.nl.cache import ConversionCache, cache_home
+from ofxstatement.plugins.nl.detect import detect
+from ofxstatement.plugins.nl.watermark import commit_watermark, get_database
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# the umask of the process (it can only be read by setting it)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# the plugins of this package by name (see the entry points in setup.py)
+PLUGINS: Dict[str, Any] = {'nl-asn': plugins.AsnPlugin,
+                           'nl-degiro': plugins.DegiroPlugin,
+                           'nl-icscards': plugins.IcsCardsPlugin,
+                           'nl-ing': plugins.IngPlugin,
+                           'nl-knab': plugins.KnabPlugin}
+
+# the file names of the exports (and PDF statements) of every plugin
+NAME_PATTERNS = [(re.compile(pattern, re.IGNORECASE), name) for pattern, name in [
+    (r'\.pdf$', 'nl-icscards'),
+    (r'NL\d+INGB\d+.*\.csv$', 'nl-ing'),
+    (r'^transactie-historie_NL\d+ASNB\d+_\d+\.csv$', 'nl-asn'),
+    (r'^Knab_transactieoverzicht.*\.csv$', 'nl-knab'),
+    (r'^Account.*\.csv$', 'nl-degiro'),
+]]
+
+
+class Job(NamedTuple):
+    """A file to convert with the plugin (name) and its settings"""
+    input: str
+    output: str
+    plugin: str
+    settings: Dict[str, str]
+    cache: Optional[ConversionCache] = None
+    # the other files merged with input (--merge)
+    inputs: Tuple[str, ...] = ()
+    # the database to load instead of the OFX file (--ledger)
+    ledger: Optional[str] = None
+
+
+class Result(NamedTuple):
+    """The result of a Job: the number of lines or the error"""
+    input: str
+    output: str
+    lines: int
+    seconds: float
+    error: Optional[str] = None
+    # copied from the cache
+    cached: bool = False
+    # the lines left out by the watermark
+    known: int = 0
+
+
+def detect_plugin(filename: str) -> Optional[str]:
+    """The plugin of a file by its name (None when unknown).
+
+    >>> detect_plugin('/tmp/NL99INGB9999999999_01-01-2020_31-01-2020.csv')
+    'nl-ing'
+    >>> detect_plugin('Account.csv')
+    'nl-degiro'
+    >>> detect_plugin('statement.ofx')
+    """
+    name = os.path.basename(filename)
+    for pattern, plugin in NAME_PATTERNS:
+        if pattern.search(name):
+            return plugin
+    return None
+
+
+def get_type_settings(config: Optional[MutableMapping[str, Any]],
+                      type_: str) -> Tuple[str, Dict[str, str]]:
+    """The plugin name and settings of a type: a section of the
+    configuration or else a plugin name, with the settings of the only
+    section of that plugin (if any).
+
+    >>> get_type_settings(None, 'nl-ing')
+    ('nl-ing', {})
+    """
+    if config is not None and type_ in config:
+        settings = dict(config[type_])
+        return settings.get('plugin', type_), settings
+    if config is not None:
+        sections = [dict(config[section]) for section in config
+                    if config[section].get('plugin') == type_]
+        if len(sections) == 1:
+            return type_, sections[0]
+    return type_, {}
+
+
+def parse_types(values: Sequence[str]) -> List[Tuple[str, str]]:
+    """The (pattern, type) pairs of the -t options (pattern * when absent).
+
+    >>> parse_types(['*.pdf=ics', 'nl-ing'])
+    [('*.pdf', 'ics'), ('*', 'nl-ing')]
+    """
+    types = []
+    for value in values:
+        pattern, _, type_ = value.rpartition('=')
+        types.append((pattern or '*', type_))
+    return types
+
+
+def iter_inputs(inputs: Sequence[str]) -> Iterator[str]:
+    """The files of the inputs (files, directories or glob patterns) in
+    order, without duplicates."""
+    seen = set()
+    for value in inputs:
+        if os.path.isdir(value):
+            names = sorted(os.path.join(value, name) for name in os.listdir(value))
+        elif os.path.exists(value):
+            names = [value]
+        else:
+            names = sorted(glob.glob(value))
+            if not names:
+                logger.warning("No such file or directory: %s", value)
+        for name in names:
+            path = os.path.abspath(name)
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                yield name
+
+
+def make_jobs(inputs: Sequence[str],
+              config: Optional[MutableMapping[str, Any]],
+              types: Sequence[Tuple[str, str]] = (),
+              output_dir: Optional[str] = None,
+              cache: Optional[ConversionCache] = None,
+              merge: bool = False,
+              overrides: Optional[Dict[str, str]] = None,
+              ledger: Optional[str] = None) \
+        -> Tuple[List[Job], List[str]]:
+    """The jobs for the input files and the files skipped (no type).
+
+    With merge the files of the same type and account make one job, with
+    an output named after the account (or the first file). The settings
+    of overrides replace those of every type. With a ledger the files are
+    loaded into that database instead of converted to OFX.
+
+    Raises ValueError when two jobs would write the same OFX file.
+    """
+    jobs: List[Job] = []
+    skipped: List[str] = []
+    groups: Dict[Tuple[str, Optional[str]], List[Job]] = {}
+    for filename in iter_inputs(inputs):
+        name = os.path.basename(filename)
+        type_ = next((type_ for pattern, type_ in types
+                      if fnmatch.fnmatch(name, pattern)), None)
+        detection = detect(filename) if type_ is None or merge else None
+        if type_ is None:
+            type_ = detection.plugin if detection else detect_plugin(filename)
+        if type_ is None:
+            skipped.append(filename)
+            continue
+        plugin, settings = get_type_settings(config, type_)
+        settings.update(overrides or {})
+        output = os.path.splitext(name)[0] + '.ofx'
+        output = os.path.join(output_dir or os.path.dirname(filename), output)
+        job = Job(filename, output, plugin, settings,
+                  cache if get_database(settings) is None and ledger is None
+                  else None,
+                  ledger=ledger)
+        if merge:
+            account_id = detection.account_id if detection else None
+            groups.setdefault((type_, account_id), []).append(job)
+        else:
+            jobs.append(job)
+    for (type_, account_id), group in groups.items():
+        job = group[0]
+        if len(group) > 1:
+            output = os.path.join(output_dir or os.path.dirname(job.input),
+                                  account_id + '.ofx' if account_id
+                                  else os.path.basename(job.output))
+            job = job._replace(output=output,
+                               cache=None,
+                               inputs=tuple(other.input for other in group[1:]))
+        jobs.append(job)
+    if ledger is None:
+        check_outputs(jobs)
+    return jobs, skipped
+
+
+def check_outputs(jobs: Sequence[Job]) -> None:
+    """Raise ValueError when two jobs have the same output (e.g. a.csv and
+    a.pdf, or the same name in two directories with one output
+    directory)."""
+    inputs: Dict[str, str] = {}
+    for job in jobs:
+        other = inputs.setdefault(os.path.normcase(os.path.abspath(job.output)), job.input)
+        if other != job.input:
+            raise ValueError("{} and {} would both be converted to {}".format(
+                other, job.input, job.output))
+
+
+def get_plugin(name: str, settings: Dict[str, str]) -> Any:
+    """The plugin of this package or else an installed plugin."""
+    if name in PLUGINS:
+        return PLUGINS[name](None, settings)
+    from ofxstatement.plugin import get_plugin as get_installed_plugin
+    from ofxstatement.ui import UI
+
+    return get_installed_plugin(name, UI(), settings)
+
+
+@contextmanager
+def output_file(path: str) -> Iterator[IO[bytes]]:
+    """A file that replaces path when the block finishes without
+    exception. It gets the mode of the file it replaces (or of a new file,
+    instead of the 0600 of mkstemp)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', prefix='.' + os.path.basename(path) + '.',
+                               dir=directory)
+    try:
+        with open(fd, 'wb') as out:
+            yield out
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def remove_partial(path: str) -> None:
+    """Remove the temporary files of output_file(path) left by a process
+    that died."""
+    directory = os.path.dirname(os.path.abspath(path))
+    pattern = glob.escape('.' + os.path.basename(path) + '.') + '*.tmp'
+    for tmp in glob.glob(os.path.join(glob.escape(directory), pattern)):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def make_parser(job: Job) -> Any:
+    """The parser of the input (and the inputs merged with it) of a job."""
+    if job.inputs:
+        from ofxstatement.plugins.nl.merge import MergeParser
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        # the watermark applies to the merged lines
+        plugin = get_plugin(job.plugin, dict(job.settings, watermark='off'))
+        parser = apply_watermark(MergeParser(plugin.get_parser,
+                                             (job.input,) + job.inputs),
+                                 job.settings)
+    else:
+        parser = get_plugin(job.plugin, job.settings).get_parser(job.input)
+    return parser
+
+
+def close_parser(parser: Any) -> None:
+    """Close the input file of a parser."""
+    fin: Any = getattr(parser, 'fin', None)
+    if hasattr(fin, 'close'):
+        fin.close()
+
+
+def write_ofx(job: Job, parser: Any, out: IO[bytes]) -> Tuple[int, int]:
+    """Convert the input of a job by its parser, write the OFX and return
+    the number of lines written and left out by the watermark."""
+    from ofxstatement.ofx import OfxWriter
+    from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+    encoding = job.settings.get('encoding', 'utf-8')
+    # like a file opened with this encoding
+    text = io.TextIOWrapper(out, encoding=encoding)
+    watermark = getattr(parser, 'watermark', None)
+    try:
+        if hasattr(parser, 'iter_lines'):
+            lines = StreamingOfxWriter(parser, encoding).write(text).line_count
+            if watermark is not None:
+                # the statement counts the lines left out as well
+                lines -= watermark.known
+        else:
+            statement = parser.parse()
+            statement.assert_valid()
+            text.write(OfxWriter(statement).toxml(encoding=encoding))
+            lines = len(statement.lines)
+    finally:
+        text.detach()
+    return lines, 0 if watermark is None else watermark.known
+
+
+def load_ledger(job: Job) -> Tuple[int, int]:
+    """Load the input of a job into its ledger (see ledger.py) and return
+    the number of lines loaded and left out by the watermark."""
+    from ofxstatement.plugins.nl.ledger import Ledger
+
+    assert job.ledger is not None
+    parser = make_parser(job)
+    try:
+        with Ledger(job.ledger) as ledger:
+            ledger.load(parser, os.pathsep.join((job.input,) + job.inputs))
+    finally:
+        close_parser(parser)
+    watermark = getattr(parser, 'watermark', None)
+    return ledger.rows, 0 if watermark is None else watermark.known
+
+
+def convert(job: Job) -> Result:
+    """Convert a file (in a worker process) to its OFX file, which is only
+    created when the conversion succeeds, or load it into the ledger of the
+    job.
+
+    With a cache the OFX of an unchanged file is copied from the cache
+    and a new conversion is stored in it.
+    """
+    started = time.perf_counter()
+    lines = known = 0
+    error = None
+    cached = False
+    try:
+        key = None
+        if job.cache is not None:
+            key = job.cache.key(job.input, job.plugin, job.settings)
+            f = job.cache.open(key)
+            if f is not None:
+                with f, output_file(job.output) as out:
+                    ofx = f.read()
+                    out.write(ofx)
+                lines = ofx.count(b'<STMTTRN>')
+                cached = True
+        if job.ledger is not None:
+            lines, known = load_ledger(job)
+        elif not cached:
+            parser = make_parser(job)
+            try:
+                with output_file(job.output) as out:
+                    lines, known = write_ofx(job, parser, out)
+            finally:
+                close_parser(parser)
+            # the OFX file is in place
+            commit_watermark(parser)
+            if job.cache is not None and key is not None:
+                store(job.cache, key, job.output)
+    except ParseError as e:
+        error = "Parse error on line %s: %s" % (e.lineno, e.message)
+    except ValidationError as e:
+        error = "Statement validation error: %s" % e.message
+    except Exception as e:
+        # one line per failure in the report
+        error = "%s: %s" % (type(e).__name__, " ".join(str(e).split()))
+    return Result(job.input, job.output, lines,
+                  time.perf_counter() - started, error, cached, known)
+
+
+def store(cache: ConversionCache, key: str, path: str) -> None:
+    """Store the OFX file of a conversion (a failure is only logged)."""
+    try:
+        with open(path, 'rb') as f, cache.writer(key, 'wb') as out:
+            shutil.copyfileobj(f, out)
+    except OSError as e:
+        logger.warning("Could not cache %s: %s", path, e)
+
+
+def convert_alone(job: Job) -> Result:
+    """convert() in a process of its own, which fails the job when it
+    dies."""
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(convert, job).result()
+        except BrokenProcessPool as e:
+            return Result(job.input, job.output, 0, time.perf_counter() - started,
+                          "%s: %s" % (type(e).__name__, " ".join(str(e).split())))
+
+
+def written_since(job: Job, started: float) -> Optional[Result]:
+    """The Result of a job whose OFX file was written after started (the
+    time.time() of the batch), by a worker that died before returning
+    it; None otherwise."""
+    if job.ledger is not None:
+        return None
+    try:
+        if os.stat(job.output).st_mtime < started:
+            return None
+        with open(job.output, 'rb') as f:
+            lines = f.read().count(b'<STMTTRN>')
+    except OSError:
+        return None
+    return Result(job.input, job.output, lines, 0.0)
+
+
+def run(jobs: Sequence[Job], workers: int = 1) -> Iterator[Result]:
+    """The results of the jobs (in order of completion) converted by a
+    pool of worker processes (in this process for one worker).
+
+    When a worker dies (killed, out of memory, a crash in an extension) the
+    pool fails the jobs it had not finished, without telling which job was
+    to blame. Those jobs are converted again, each in a process of its own,
+    after removing the partial output of the workers that were stopped.
+    A job whose OFX file was written by this batch is not converted again:
+    its watermark may have recorded the lines already.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield convert(job)
+        return
+    started = time.time()
+    broken: List[Job] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {executor.submit(convert, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            yield result
+    if broken:
+        logger.warning("A worker process died: checking %d files", len(broken))
+        again: List[Job] = []
+        for job in broken:
+            remove_partial(job.output)
+            written = written_since(job, started)
+            if written is None:
+                again.append(job)
+            else:
+                yield written
+        if not again:
+            return
+        logger.warning("Converting %d files again, one process per file", len(again))
+        with ThreadPoolExecutor(max_workers=min(workers, len(again))) as executor:
+            yield from executor.map(convert_alone, again)
+
+
+def report(results: Sequence[Result],
+           skipped: Sequence[str],
+           seconds: float) -> str:
+    """The summary of a batch: throughput and failures.
+
+    >>> print(report([Result('a.csv', 'a.ofx', 100, 0.5),
+    ...               Result('b.csv', 'b.ofx', 0, 0.1, 'Parse error on line 2: x')],
+    ...              ['c.txt'], 2.0))
+    Converted 1 of 2 files (100 lines) in 2.00 s: 0.5 files/s, 50 lines/s; 1 skipped
+    FAILED b.csv: Parse error on line 2: x
+    """
+    converted = [result for result in results if result.error is None]
+    lines = sum(result.lines for result in converted)
+    seconds = max(seconds, 1e-9)
+    summary = "Converted %d of %d files (%d lines) in %.2f s: " \
+        "%.1f files/s, %.0f lines/s" % (len(converted), len(results), lines,
+                                        seconds, len(converted) / seconds,
+                                        lines / seconds)
+    if skipped:
+        summary += "; %d skipped" % len(skipped)
+    cached = sum(result.cached for result in converted)
+    if cached:
+        summary += "; %d from the cache" % cached
+    known = sum(result.known for result in converted)
+    if known:
+        summary += "; %d known lines left out" % known
+    failures = ["FAILED %s: %s" % (result.input, result.error)
+                for result in sorted(results, key=lambda result: result.input)
+                if result.error is not None]
+    return "\n".join([summary] + failures)
+
+
+def get_conversion_cache(value: Optional[str],
+                         max_size: float = 500,
+                         max_age: float = 30) -> Optional[ConversionCache]:
+    """The conversion cache of the option --cache: 1 (or yes, true, on)
+    for the default directory, a directory or nothing for no cache, with
+    the maximum size in MB and age in days.
+
+    >>> get_conversion_cache('no')
+    >>> get_conversion_cache('/tmp/x', 1).max_size
+    1048576
+    """
+    value = (value or '').strip()
+    if value.lower() in ['', '0', 'no', 'false', 'off']:
+        return None
+    directory = os.path.join(cache_home(), 'ofx') \
+        if value.lower() in ['1', 'yes', 'true', 'on'] \
+        else os.path.expanduser(value)
+    return ConversionCache(directory,
+                           int(max_size * 1024 * 1024),
+                           max_age * 24 * 60 * 60)
+
+
+def make_args_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Convert statement files to OFX by a pool of processes.")
+    parser.add_argument('-c', '--config', metavar='myconfig.ini', default=None,
+                        help="custom config file to use")
+    parser.add_argument('-t', '--type', action='append', default=[],
+                        metavar='[PATTERN=]TYPE',
+                        help="section in the config file or plugin name for "
+                        "the files whose name matches PATTERN (default all "
+                        "files); the plugin is detected by the contents or "
+                        "name of the file otherwise (repeatable, first match "
+                        "wins)")
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help="directory of the OFX files (default the "
+                        "directory of every input file)")
+    parser.add_argument('-w', '--workers', default='auto',
+                        help="number of processes or auto for one per CPU "
+                        "(default %(default)s)")
+    parser.add_argument('--cache', default=None, metavar='DIR',
+                        help="cache the OFX files by the contents of the "
+                        "input, the plugin and its settings in DIR (1 for "
+                        "$XDG_CACHE_HOME/ofxstatement-dutch/ofx)")
+    parser.add_argument('--cache-size', type=float, default=500,
+                        help="maximum size of the cache in MB "
+                        "(default %(default)s)")
+    parser.add_argument('--cache-days', type=float, default=30,
+                        help="number of days an OFX file is kept without "
+                        "being used (default %(default)s)")
+    parser.add_argument('-m', '--merge', action='store_true', default=False,
+                        help="convert the files of one type and account to "
+                        "one OFX file named after the account, every "
+                        "transaction once")
+    parser.add_argument('--ledger', default=None, metavar='FILE',
+                        help="load the transactions into the SQLite database "
+                        "FILE instead of writing OFX files")
+    parser.add_argument('--since', default=None, metavar='DATE',
+                        help="only the transactions of DATE (yyyy-mm-dd) "
+                        "and later")
+    parser.add_argument('--until', default=None, metavar='DATE',
+                        help="only the transactions of DATE (yyyy-mm-dd) "
+                        "and before")
+    parser.add_argument('--date-index', action='store_true', default=False,
+                        help="read just the transactions of --since and "
+                        "--until of ING and DEGIRO files, by a date index "
+                        "next to every file (built when missing)")
+    parser.add_argument('-d', '--debug', action='store_true', default=False,
+                        help="show debugging information")
+    parser.add_argument('inputs', nargs='+', metavar='INPUT',
+                        help="file, directory or glob pattern")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from ofxstatement.plugins.nl.chunks import get_workers
+
+    from ofxstatement.plugins.nl.dateindex import get_date_range
+
+    args_parser = make_args_parser()
+    args = args_parser.parse_args(argv)
+    overrides = {name: value for name, value in [('since', args.since),
+                                                 ('until', args.until)]
+                 if value}
+    try:
+        get_date_range(overrides)
+    except ValueError as e:
+        args_parser.error(str(e))
+    if args.date_index:
+        overrides['date_index'] = 'on'
+    logging.basicConfig(format="%(levelname)s: %(message)s",
+                        level=logging.DEBUG if args.debug else logging.INFO)
+
+    config = configuration.read(args.config)
+    cache = get_conversion_cache(args.cache, args.cache_size, args.cache_days)
+    try:
+        jobs, skipped = make_jobs(args.inputs, config, parse_types(args.type),
+                                  args.output_dir, cache, args.merge, overrides,
+                                  args.ledger)
+    except ValueError as e:
+        args_parser.error(str(e))
+    for filename in skipped:
+        logger.info("Skipped (no type): %s", filename)
+
+    started = time.perf_counter()
+    results = []
+    for result in run(jobs, get_workers(args.workers)):
+        results.append(result)
+        if result.error is None:
+            logger.debug("Converted (%d lines in %.2f s): %s",
+                         result.lines, result.seconds, result.input)
+        else:
+            logger.debug("Failed: %s", result.input)
+    for line in report(results, skipped,
+                       time.perf_counter() - started).splitlines():
+        logger.info(line)
+    return 2 if any(result.error is not None for result in results) else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
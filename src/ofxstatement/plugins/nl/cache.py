@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Caches of files on disk, keyed by the SHA-256 of their input.
+
+A FileCache is a directory with a file per key. Several processes may use
+the same directory: a file is written to a temporary file that is renamed
+to its key when complete, so a reader never sees a partial file, and a
+file that another process removes is just a miss.
+
+Files not used for max_age seconds are removed and when the files take
+more than max_size bytes the least recently used are removed as well (the
+modification time is the time of last use).
+"""
+from typing import Any, Dict, IO, Iterator, List, Optional
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+# the settings that do not change the result of a conversion
+RUNTIME_SETTINGS = {'stats',
+                    'workers',
+                    'date_index',
+                    'pdftotext_cache',
+                    'pdftotext_cache_days',
+                    'pdftotext_cache_size',
+                    'pdftotext_timeout',
+                    'pdftotext_workers'}
+
+
+def cache_home() -> str:
+    """The cache directory of this package ($XDG_CACHE_HOME or ~/.cache)."""
+    home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(home, 'ofxstatement-dutch')
+
+
+def file_sha256(filename: str, *parts: str) -> str:
+    """The SHA-256 (hex) of the contents of a file followed by the parts
+    (each after a null byte)."""
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    for part in parts:
+        sha.update(b'\0' + part.encode())
+    return sha.hexdigest()
+
+
+class FileCache:
+    """Directory with a file per key.
+
+    The counters hits, misses and evictions tell how well it works.
+    """
+
+    suffix = '.dat'
+    # the file of a write in progress (removed after a day when the
+    # process was killed)
+    tmp_suffix = '.tmp'
+    tmp_max_age = 24 * 60 * 60
+
+    def __init__(self,
+                 directory: str,
+                 max_size: int = 100 * 1024 * 1024,
+                 max_age: float = 30 * 24 * 60 * 60) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> Optional[str]:
+        """The path of the file for key (None when not cached)."""
+        path = self.path(key)
+        try:
+            # the modification time is the time of last use
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def open(self, key: str, mode: str = 'rb', **kwargs: Any) -> Optional[IO[Any]]:
+        """The file for key opened for reading (None when not cached).
+
+        Unlike get() the file can not be removed by another process
+        before it is opened.
+        """
+        try:
+            f = open(self.path(key), mode, **kwargs)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(f.fileno() if os.utime in os.supports_fd else self.path(key))
+        except OSError:  # pragma: no cover
+            pass
+        self.hits += 1
+        return f
+
+    @contextmanager
+    def writer(self, key: str, mode: str = 'w', **kwargs: Any) -> Iterator[IO[Any]]:
+        """A file that is stored for key when the block finishes without
+        exception.
+        """
+        # the statements are private
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=self.tmp_suffix, dir=self.directory)
+        try:
+            with open(fd, mode, **kwargs) as out:
+                yield out
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the files that are too old or too many."""
+        now = time.time()
+        entries: List[Any] = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if entry.name.endswith(self.suffix):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    elif entry.name.endswith(self.tmp_suffix) and \
+                            now - stat.st_mtime > self.tmp_max_age:
+                        os.remove(entry.path)
+                except FileNotFoundError:  # pragma: no cover
+                    # removed by another process
+                    pass
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for mtime, file_size, path in entries:
+            if now - mtime <= self.max_age and size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: no cover
+                # removed by another process (or in use on Windows)
+                pass
+            size -= file_size
+            self.evictions += 1
+
+
+@lru_cache(maxsize=None)
+def package_version() -> str:
+    """The versions of this package and ofxstatement.
+
+    The version of this package is the SHA-256 of its modules, not the
+    version of its metadata: an editable install (or a source checkout)
+    keeps that version after a code change, so a stale cached conversion
+    would be used.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    sha = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                sha.update(name.encode() + b'\0' + f.read())
+    try:
+        ofxstatement = version('ofxstatement')
+    except PackageNotFoundError:
+        ofxstatement = ''
+    return '{} {}'.format(sha.hexdigest(), ofxstatement)
+
+
+class ConversionCache(FileCache):
+    """Directory with the OFX of statement files (see FileCache).
+
+    The file name is the SHA-256 of the contents of the statement file,
+    the plugin, its settings (but the RUNTIME_SETTINGS) and the version of
+    this package and ofxstatement.
+    """
+
+    suffix = '.ofx'
+
+    def key(self, filename: str, plugin: str, settings: Dict[str, Any]) -> str:
+        settings = {name: str(value) for name, value in settings.items()
+                    if name not in RUNTIME_SETTINGS}
+        return file_sha256(filename,
+                           plugin,
+                           json.dumps(settings, sort_keys=True),
+                           package_version())
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Parallel parsing of big CSV files in chunks.
+
+The file is split into byte ranges that start at a record: after a new
+line outside a quoted field (the number of quotes before it is even, so
+a memo with new lines stays in one chunk). Every chunk is parsed by a
+parser of its own in a process pool, after the header (the first record)
+of the file, and the statement lines of the chunks are merged in file
+order by the parser of the whole file.
+
+A worker cannot number duplicate transactions, since they may be in an
+earlier chunk, so it hands out the initial transaction ids and the merge
+adds the counter (and the #N memo suffix) in order, exactly as a serial
+parse does. When a chunk fails the file is parsed serially to raise the
+error (with its line number) of a serial parse.
+"""
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, \
+    Tuple
+
+import collections
+import gc
+import io
+import os
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from ofxstatement.statement import generate_transaction_id
+
+from ofxstatement.plugins.nl.parser import StatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+
+# the default (minimal) size of a chunk in bytes
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# the statement lines of a chunk with for each line the length of its memo
+# when its id was registered (None when the parser set the id itself), the
+# bounds of the lines, the number of records (including the header) and the
+# chunk_state() of the parser
+ChunkResult = Tuple[List[Tuple[StatementLine, Optional[int]]], Statement, int, Any]
+
+
+def record_starts(f: BinaryIO,
+                  offsets: List[int],
+                  block_size: int = 1024 * 1024) -> List[int]:
+    """Return for every offset (ascending) the offset of the first record
+    that starts at or after it (the file size when there is none).
+
+    >>> record_starts(io.BytesIO(b'a,"b\\nc"\\nd\\ne\\n'), [0, 1, 3, 9, 12])
+    [0, 8, 8, 10, 12]
+    """
+    f.seek(0)
+    starts: List[int] = []
+    pending: Deque[int] = collections.deque(offsets)
+    # a record starts at 0 or after a new line outside quotes
+    while pending and pending[0] <= 0:
+        starts.append(0)
+        pending.popleft()
+    # the number of quotes before position i of the block at position
+    quotes = 0
+    position = 0
+    while pending:
+        block = f.read(block_size)
+        if not block:
+            break
+        counted = 0
+        i = max(pending[0] - position - 1, 0)
+        while pending:
+            i = block.find(b'\n', i)
+            if i < 0:
+                break
+            quotes += block.count(b'"', counted, i)
+            counted = i
+            if quotes % 2 == 0:
+                start = position + i + 1
+                while pending and pending[0] <= start:
+                    starts.append(start)
+                    pending.popleft()
+                if pending:
+                    i = max(pending[0] - position - 1, i + 1)
+            else:
+                i += 1
+        quotes += block.count(b'"', counted)
+        position += len(block)
+    starts.extend(position for _ in pending)
+    return starts
+
+
+class ChunkIdRegistry(TransactionIdRegistry):
+    """Registry handing out the initial ids only.
+
+    It remembers the lines it registered with the length of their memo, so
+    the counter and memo suffix can be added when the chunks are merged
+    (see TransactionIdRegistry.count() and StatementLine.adjust()).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.registered: Dict[int, Tuple[StatementLine, int]] = {}
+
+    def register(self, stmt_line: Any) -> Tuple[str, int]:
+        # the line is kept, so its id() is not reused
+        self.registered[id(stmt_line)] = (stmt_line, len(stmt_line.memo or ''))
+        return generate_transaction_id(stmt_line), 0
+
+    def memo_end(self, stmt_line: StatementLine) -> Optional[int]:
+        registered = self.registered.get(id(stmt_line))
+        return None if registered is None else registered[1]
+
+
+def get_workers(value: Optional[Any] = None) -> int:
+    """The number of processes of a workers setting: a number, auto for the
+    number of CPUs or nothing for 1.
+
+    >>> get_workers('3')
+    3
+    >>> get_workers(None)
+    1
+    """
+    value = str(value or '').strip().lower()
+    if not value:
+        return 1
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def parse_chunk(plugin: type,
+                settings: Dict[str, Any],
+                filename: str,
+                header_end: int,
+                start: int,
+                end: int) -> bytes:
+    """Parse the bytes start to end of a file after its header (in a worker
+    process) and return the pickled ChunkResult (see load_chunk()).
+    """
+    # no statistics, no chunks, no watermark (the lines are filtered by
+    # the parser of the whole file) and no date index in a worker
+    settings = dict(settings, stats='off', workers='1', watermark='off',
+                    date_index='off')
+    parser = plugin(None, settings).get_parser(filename)
+    encoding = parser.fin.encoding
+    parser.fin.close()
+    with open(filename, 'rb') as f:
+        data = f.read(header_end)
+        f.seek(start)
+        data += f.read(end - start)
+    parser.fin = io.TextIOWrapper(io.BytesIO(data), encoding=encoding)
+    unique_ids = parser.unique_ids = ChunkIdRegistry()
+    bounds = Statement()
+    lines = []
+    for stmt_line in parser.iter_records():
+        bounds.update_bounds(stmt_line)
+        lines.append((stmt_line, unique_ids.memo_end(stmt_line)))
+    result: ChunkResult = (lines, bounds, parser.cur_record, parser.chunk_state())
+    return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+
+def load_chunk(data: bytes) -> ChunkResult:
+    """Unpickle the result of parse_chunk().
+
+    The garbage collector is disabled meanwhile: the many objects created
+    would trigger collections (most of the time of unpickling) that are of
+    no use, since the lines have no reference cycles.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        result: ChunkResult = pickle.loads(data)
+    finally:
+        if enabled:
+            gc.enable()
+    return result
+
+
+class Chunks:
+    """The chunks of a CSV file, parsed by a pool of workers processes.
+
+    The plugin (class) and its settings create the parser of a chunk.
+    """
+
+    def __init__(self,
+                 plugin: type,
+                 settings: Optional[Dict[str, Any]],
+                 filename: str,
+                 workers: int,
+                 chunk_size: int = CHUNK_SIZE) -> None:
+        self.plugin = plugin
+        self.settings = dict(settings or {})
+        self.filename = filename
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def ranges(self) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+        """The end of the header and the byte ranges of the chunks (None
+        when the file is parsed serially)."""
+        if self.workers <= 1:
+            return None
+        size = os.path.getsize(self.filename)
+        count = size // self.chunk_size
+        if count < 2:
+            return None
+        with open(self.filename, 'rb') as f:
+            offsets = record_starts(f, [1] + [i * size // count
+                                              for i in range(1, count)])
+        header_end = offsets[0]
+        starts = sorted(set([header_end] + offsets[1:]))
+        return header_end, [(start, end)
+                            for start, end in zip(starts, starts[1:] + [size])
+                            if start < end]
+
+    def iter_lines(self, parser: Any) -> Iterator[StatementLine]:
+        """Parse the file like parser.iter_lines() does."""
+        ranges = self.ranges()
+        if ranges is None:
+            yield from StatementParser.iter_lines(parser)
+            return
+        header_end, chunks = ranges
+
+        # the header sets the state of the parser (as in a serial parse)
+        with open(self.filename, 'rb') as f:
+            header = f.read(header_end)
+        encoding = parser.fin.encoding
+        parser.fin.close()
+        parser.fin = io.TextIOWrapper(io.BytesIO(header), encoding=encoding)
+        for stmt_line in parser.iter_records():
+            parser.statement.update_bounds(stmt_line)
+            yield stmt_line
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # a few chunks ahead, so the results need not all be kept
+            futures: Deque['Future[bytes]'] = collections.deque()
+            pending = iter(chunks)
+            try:
+                while True:
+                    for start, end in pending:
+                        futures.append(executor.submit(parse_chunk,
+                                                       self.plugin,
+                                                       self.settings,
+                                                       self.filename,
+                                                       header_end,
+                                                       start,
+                                                       end))
+                        if len(futures) >= 2 * self.workers:
+                            break
+                    if not futures:
+                        break
+                    try:
+                        lines, bounds, records, state = \
+                            load_chunk(futures.popleft().result())
+                        parser.merge_chunk_state(state)
+                    except Exception as e:
+                        raise self.serial_error(e)
+                    # the header is parsed by every worker
+                    parser.cur_record += records - 1
+                    parser.statement.merge_bounds(bounds)
+                    yield from self.merge(parser.unique_ids, lines)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        parser.finish_statement()
+
+    @staticmethod
+    def merge(unique_ids: TransactionIdRegistry,
+              lines: List[Tuple[StatementLine, Optional[int]]]) \
+            -> Iterator[StatementLine]:
+        """Give the lines of a chunk their unique id."""
+        for stmt_line, memo_end in lines:
+            if memo_end is not None:
+                assert stmt_line.id is not None
+                stmt_line.id, counter = unique_ids.count(stmt_line.id)
+                if counter:
+                    # what StatementLine.adjust() appended to the memo then
+                    memo: str = stmt_line.memo  # type: ignore
+                    stmt_line.memo = \
+                        memo[:memo_end] + ' #' + str(counter + 1) + memo[memo_end:]
+            yield stmt_line
+
+    def serial_error(self, error: Exception) -> Exception:
+        """The error of a serial parse of the file (or else error)."""
+        settings = dict(self.settings, workers='1')
+        parser = self.plugin(None, settings).get_parser(self.filename)
+        try:
+            for _ in parser.iter_lines():
+                pass
+        except Exception as e:
+            return e
+        finally:
+            parser.fin.close()
+        return error
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Parse only the records of a date range.
+
+With the plugin settings since and/or until (dates like 2020-05-30 or
+30-05-2020, both inclusive) a CSV parser leaves out every record whose
+date is outside that range. The raw value of the date column is checked
+(see dates.date_key()) before the record is parsed, so no statement line
+is created for a record that is left out. A record without a date there
+(a header) is always parsed.
+
+The records are still read, though. The exports of ING and DEGIRO are
+sorted by date (the date is the first column), so with the setting
+date_index (1, yes, true or on) their plugins read just the header and
+the bytes of the records of the range: the byte offset of the first
+record of every date is looked up by a binary search in a date index, a
+JSON file next to the export (<export>.dates.json). The index is built by
+one scan of the bytes (no CSV parsing) when it is missing or older than
+the export, and when the records are not sorted by date the index says so
+and the whole file is read instead.
+
+The statement (dates, balances) of a date range covers only its records
+and since a day is either in the range or not, the ids of its lines are
+those of a conversion of the whole file. The line numbers of errors count
+the records that are read, so with a date index they start at the header.
+"""
+from typing import Any, BinaryIO, Deque, Dict, List, NamedTuple, \
+    Optional, Tuple
+
+import bisect
+import collections
+import io
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from ofxstatement.plugins.nl import dates
+
+logger = logging.getLogger(__name__)
+
+# the version of the index format
+VERSION = 1
+
+# the date in the first column of a record (the date itself is group 1)
+FIRST_DATE = re.compile(rb'"?(\d{8}|\d{4}-\d\d-\d\d|\d\d-\d\d-\d{4})"?[,;]')
+
+
+class DateRange(NamedTuple):
+    """The dates (yyyymmdd, see dates.date_key()) of the first and the last
+    day of a range, None for no limit.
+
+    >>> '20200530' in DateRange('20200501', '20200531')
+    True
+    >>> '20200601' in DateRange('20200501')
+    True
+    """
+    since: Optional[str] = None
+    until: Optional[str] = None
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and \
+            (self.since is None or key >= self.since) and \
+            (self.until is None or key <= self.until)
+
+
+def get_date_range(settings: Optional[Any] = None) -> Optional[DateRange]:
+    """The date range of the settings since and until (None when neither
+    is set).
+
+    >>> get_date_range({'since': '2020-05-01', 'until': '31-05-2020'})
+    DateRange(since='20200501', until='20200531')
+    >>> get_date_range({})
+    """
+    keys: List[Optional[str]] = []
+    for name in ['since', 'until']:
+        value = str((settings.get(name) if settings else None) or '').strip()
+        key = dates.date_key(value) if value else None
+        try:
+            if key is not None:
+                datetime.strptime(key, '%Y%m%d')
+            elif value:
+                raise ValueError(value)
+        except ValueError:
+            raise ValueError("Invalid date for {}: {} (use yyyy-mm-dd)"
+                             .format(name, value))
+        keys.append(key)
+    return DateRange(*keys) if keys != [None, None] else None
+
+
+def use_index(settings: Optional[Any] = None) -> bool:
+    """Whether the setting date_index is on.
+
+    >>> use_index({'date_index': 'yes'}), use_index({})
+    (True, False)
+    """
+    value = str((settings.get('date_index') if settings else None) or '')
+    return value.strip().lower() in ['1', 'yes', 'true', 'on']
+
+
+def index_filename(filename: str) -> str:
+    """The file name of the date index of an export."""
+    return filename + '.dates.json'
+
+
+def build_index(f: BinaryIO) -> Dict[str, Any]:
+    """The date index of a file whose records start with a date.
+
+    The index has the file size, the offset of the end of the header (the
+    first record) and the date and offset of the first record of every
+    date in file order, or no dates (None) when the records are not sorted
+    by date (either way).
+
+    >>> build_index(io.BytesIO(b'Datum,x\\n"20200102","a\\nb"\\n20200102,c\\n'
+    ...                        b'20200101,d\\n'))
+    {'version': 1, 'size': 47, 'header_end': 8, 'dates': [['20200102', 8], ['20200101', 36]]}
+    >>> build_index(io.BytesIO(b'Datum,x\\n20200101,a\\n20200102,b\\n20200101,c\\n'))['dates']
+    """
+    f.seek(0)
+    entries: Optional[List[List[Any]]] = []
+    header_end = None
+    order = 0
+    offset = 0
+    quotes = 0
+    for line in f:
+        # a record starts after a new line outside quotes (the first one is
+        # the header, a blank line is no record)
+        if offset and quotes % 2 == 0 and entries is not None and line.strip():
+            if header_end is None:
+                header_end = offset
+            m = FIRST_DATE.match(line)
+            key = dates.date_key(m.group(1).decode()) if m else None
+            if key is None:
+                entries = None
+            elif not entries:
+                entries.append([key, offset])
+            elif key != entries[-1][0]:
+                direction = 1 if key > entries[-1][0] else -1
+                if order and direction != order:
+                    entries = None
+                else:
+                    order = direction
+                    entries.append([key, offset])
+        quotes += line.count(b'"')
+        offset += len(line)
+    return {'version': VERSION,
+            'size': offset,
+            'header_end': offset if header_end is None else header_end,
+            'dates': entries}
+
+
+def load_index(filename: str) -> Optional[Dict[str, Any]]:
+    """The date index of an export from its index file, or built (and
+    written) when that is missing or stale. None when the records are not
+    sorted by date.
+    """
+    stat = os.stat(filename)
+    path = index_filename(filename)
+    index: Optional[Dict[str, Any]] = None
+    try:
+        if os.stat(path).st_mtime_ns >= stat.st_mtime_ns:
+            with open(path) as f:
+                index = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if index is None or index.get('version') != VERSION or \
+       index.get('size') != stat.st_size:
+        with open(filename, 'rb') as fb:
+            index = build_index(fb)
+        try:
+            tmp = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug('Cannot write date index %s: %s', path, e)
+    return index if index['dates'] is not None else None
+
+
+def find_range(index: Dict[str, Any], date_range: DateRange) -> Tuple[int, int]:
+    """The offsets of the first record in the range and of the first record
+    after it (records sorted by date, the index of build_index()).
+
+    >>> index = {'size': 40, 'dates': [['20200103', 8], ['20200102', 20],
+    ...                                ['20200101', 30]]}
+    >>> find_range(index, DateRange('20200102', '20200102'))
+    (20, 30)
+    >>> index = {'size': 40, 'dates': [['20200101', 8], ['20200102', 20],
+    ...                                ['20200103', 30]]}
+    >>> find_range(index, DateRange('20200102'))
+    (20, 40)
+    >>> find_range(index, DateRange(until='20191231'))
+    (8, 8)
+    """
+    entries = index['dates']
+    keys = [key for key, _ in entries]
+    n = len(keys)
+    if n > 1 and keys[0] > keys[-1]:
+        # newest first: search the dates in ascending order
+        keys.reverse()
+        first = 0 if date_range.until is None \
+            else n - bisect.bisect_right(keys, date_range.until)
+        last = n if date_range.since is None \
+            else n - bisect.bisect_left(keys, date_range.since)
+    else:
+        first = 0 if date_range.since is None \
+            else bisect.bisect_left(keys, date_range.since)
+        last = n if date_range.until is None \
+            else bisect.bisect_right(keys, date_range.until)
+    start = entries[first][1] if first < n else index['size']
+    end = entries[last][1] if last < n else index['size']
+    return start, max(start, end)
+
+
+class ByteRanges(io.RawIOBase):
+    """The byte ranges (start, end) of a file read as one file."""
+
+    def __init__(self, filename: str, ranges: List[Tuple[int, int]]) -> None:
+        self.f = open(filename, 'rb')
+        self.ranges: Deque[Tuple[int, int]] = collections.deque(ranges)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        while self.ranges:
+            start, end = self.ranges[0]
+            if start < end:
+                self.f.seek(start)
+                n = self.f.readinto(memoryview(b)[:min(len(b), end - start)])
+                if n:
+                    self.ranges[0] = (start + n, end)
+                    return n
+            self.ranges.popleft()
+        return 0
+
+    def close(self) -> None:
+        self.f.close()
+        super().close()
+
+
+def open_range(filename: Any, encoding: str, settings: Optional[Any] = None) -> Optional[Any]:
+    """The header and the records of the date range of an export with a
+    date index (see the module) as a text file, or None when the settings
+    have no date range, no date index or the records are not sorted.
+    """
+    date_range = get_date_range(settings)
+    if date_range is None or not use_index(settings) or \
+       not isinstance(filename, str):
+        return None
+    index = load_index(filename)
+    if index is None:
+        return None
+    start, end = find_range(index, date_range)
+    logger.debug('Date range %s of %s: bytes %d to %d', date_range,
+                 filename, start, end)
+    return io.TextIOWrapper(
+        io.BufferedReader(ByteRanges(filename, [(0, index['header_end']),
+                                                (start, end)])),
+        encoding=encoding)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Parsing of the dates in the bank files.
+
+parse_datetime(value, date_format) returns the same as
+datetime.strptime(value, date_format) but:
+
+- the formats of the banks (%Y%m%d, %Y-%m-%d and %d-%m-%Y) are parsed by
+  slicing the string, falling back to strptime() for anything else
+  (so a wrong date raises exactly the same ValueError);
+- the results are memoised since a file has many rows for few dates.
+
+Formats depending on the locale (month or day names) are never memoised.
+
+The ICS Cards statements have Dutch month names, which are parsed by
+parse_dutch_date() instead of strptime() in the nl_NL locale: it does not
+depend on the (process wide) locale so it is thread safe.
+"""
+from typing import Callable, Dict, Optional
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# the number of (date, format) combinations remembered
+CACHE_SIZE = 4096
+
+# the directives of strptime() depending on the locale
+LOCALE_DIRECTIVES = re.compile('%[aAbBcpxX]')
+
+
+def _is_digits(value: str) -> bool:
+    # strptime() does not accept all Unicode digits
+    return value.isdigit() and value.isascii()
+
+
+def parse_yyyymmdd(value: str) -> Optional[datetime]:
+    """%Y%m%d
+
+    >>> parse_yyyymmdd('20200530')
+    datetime.datetime(2020, 5, 30, 0, 0)
+    """
+    if len(value) == 8 and _is_digits(value):
+        return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    return None
+
+
+def parse_yyyy_mm_dd(value: str) -> Optional[datetime]:
+    """%Y-%m-%d
+
+    >>> parse_yyyy_mm_dd('2020-05-30')
+    datetime.datetime(2020, 5, 30, 0, 0)
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-' and \
+       _is_digits(value[0:4] + value[5:7] + value[8:10]):
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+    return None
+
+
+def parse_dd_mm_yyyy(value: str) -> Optional[datetime]:
+    """%d-%m-%Y
+
+    >>> parse_dd_mm_yyyy('30-05-2020')
+    datetime.datetime(2020, 5, 30, 0, 0)
+    """
+    if len(value) == 10 and value[2] == '-' and value[5] == '-' and \
+       _is_digits(value[0:2] + value[3:5] + value[6:10]):
+        return datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+    return None
+
+
+def date_key(value: str) -> Optional[str]:
+    """The date in one of the formats of the banks as yyyymmdd, which sorts
+    like the dates (None when the value has none of these shapes).
+
+    >>> date_key('30-05-2020'), date_key('2020-05-30'), date_key('20200530')
+    ('20200530', '20200530', '20200530')
+    >>> date_key('Datum')
+    """
+    if len(value) == 8:
+        key = value
+    elif len(value) != 10:
+        return None
+    elif value[4] == '-' and value[7] == '-':
+        key = value[0:4] + value[5:7] + value[8:10]
+    elif value[2] == '-' and value[5] == '-':
+        key = value[6:10] + value[3:5] + value[0:2]
+    else:
+        return None
+    return key if _is_digits(key) else None
+
+
+# Every parser returns None when the value does not have the exact shape of
+# the format (e.g. 1-5-2020), in which case strptime() decides.
+PARSERS: Dict[str, Callable[[str], Optional[datetime]]] = {
+    '%Y%m%d': parse_yyyymmdd,
+    '%Y-%m-%d': parse_yyyy_mm_dd,
+    '%d-%m-%Y': parse_dd_mm_yyyy,
+}
+
+
+def _parse_datetime(value: str, date_format: str) -> datetime:
+    parser = PARSERS.get(date_format)
+    if parser is not None:
+        try:
+            dt = parser(value)
+        except ValueError:
+            # let strptime() raise its error
+            dt = None
+        if dt is not None:
+            return dt
+    return datetime.strptime(value, date_format)
+
+
+_parse_datetime_cached = lru_cache(maxsize=CACHE_SIZE)(_parse_datetime)
+
+
+@lru_cache(maxsize=None)
+def _depends_on_locale(date_format: str) -> bool:
+    return LOCALE_DIRECTIVES.search(date_format) is not None
+
+
+def parse_datetime(value: str, date_format: str) -> datetime:
+    """Return datetime.strptime(value, date_format), faster.
+
+    >>> parse_datetime('30-05-2020', '%d-%m-%Y')
+    datetime.datetime(2020, 5, 30, 0, 0)
+    >>> parse_datetime('1-5-2020', '%d-%m-%Y')
+    datetime.datetime(2020, 5, 1, 0, 0)
+    >>> parse_datetime('31-02-2020', '%d-%m-%Y')
+    Traceback (most recent call last):
+        ...
+    ValueError: day is out of range for month
+    """
+    if type(value) is not str or _depends_on_locale(date_format):
+        return datetime.strptime(value, date_format)
+    return _parse_datetime_cached(value, date_format)
+
+
+# %B and %b in the nl_NL locale
+DUTCH_MONTHS = ['januari', 'februari', 'maart', 'april', 'mei', 'juni',
+                'juli', 'augustus', 'september', 'oktober', 'november',
+                'december']
+DUTCH_MONTH_ABBREVIATIONS = ['jan', 'feb', 'mrt', 'apr', 'mei', 'jun', 'jul',
+                             'aug', 'sep', 'okt', 'nov', 'dec']
+
+# month number by lower case name, abbreviation and (since April 2025 in
+# the ICS statements) abbreviation with a period
+_DUTCH_MONTH_NUMBERS: Dict[str, int] = {}
+for _number, (_name, _abbreviation) in \
+        enumerate(zip(DUTCH_MONTHS, DUTCH_MONTH_ABBREVIATIONS), 1):
+    _DUTCH_MONTH_NUMBERS[_name] = _number
+    _DUTCH_MONTH_NUMBERS[_abbreviation] = _number
+    _DUTCH_MONTH_NUMBERS[_abbreviation + '.'] = _number
+
+
+def parse_dutch_date(value: str) -> datetime:
+    """Return the date of a day, Dutch month and year, i.e. what
+    datetime.strptime(value, '%d %B %Y') or '%d %b %Y' return in the nl_NL
+    locale. The month may be abbreviated with or without a period.
+
+    >>> parse_dutch_date('17 september 2019')
+    datetime.datetime(2019, 9, 17, 0, 0)
+    >>> parse_dutch_date('21 mrt. 2025')
+    datetime.datetime(2025, 3, 21, 0, 0)
+    >>> parse_dutch_date('21 march 2025')
+    Traceback (most recent call last):
+        ...
+    ValueError: time data '21 march 2025' is not a Dutch date
+    """
+    parts = value.split()
+    if len(parts) == 3:
+        day, month, year = parts
+        number = _DUTCH_MONTH_NUMBERS.get(month.lower())
+        if number is not None and len(day) <= 2 and len(year) == 4 and \
+           _is_digits(day + year):
+            return datetime(int(year), number, int(day))
+    raise ValueError("time data {!r} is not a Dutch date".format(value))
@@ -1,15 +1,17 @@
 # -*- coding: utf-8 -*-
-from typing import Iterable, Set, Optional, List, Any, TextIO
+from typing import Iterable, Optional, List, Any, TextIO
 import csv
 import sys
 import datetime
 import logging
 from decimal import Decimal
 
-from ofxstatement.plugin import Plugin as BasePlugin
-from ofxstatement.parser import CsvStatementParser
 from ofxstatement.exceptions import ParseError
-from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.detect import DEGIRO
+from ofxstatement.plugins.nl.parser import CsvStatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+from ofxstatement.plugins.nl.plugins import DegiroPlugin
 
 # Need Python 3 for super() syntax
 assert sys.version_info[0] >= 3, "At least Python 3 is required."
@@ -97,7 +99,7 @@ EUR,"13,87",
         # bank_account_to
     }
 
-    unique_id_set: Set[str]
+    unique_ids: TransactionIdRegistry
 
     def __init__(self, fin: TextIO, account_id: str) -> None:
         # Python 3 needed
@@ -109,29 +111,13 @@ EUR,"13,87",
                                    # Not yet, just a CHECKING account
                                    # self.statement.account_type = "MONEYMRKT"
                                    account_type="CHECKING")  # My Statement
-        self.unique_id_set = set()
-        self.header = [["Datum",
-                        "Tijd",
-                        "Valutadatum",
-                        "Product",
-                        "ISIN",
-                        "Omschrijving",
-                        "FX",
-                        "Mutatie",
-                        "",
-                        "Saldo",
-                        "",
-                        "Order Id"]]
-
-    def parse(self) -> Statement:
-        """Main entry point for parsers
-
-        super() implementation will call to split_records and parse_record to
-        process the file.
-        """
+        self.unique_ids = TransactionIdRegistry()
+        self.header = [DEGIRO]
 
-        # Python 3 needed
-        stmt: Statement = super().parse()
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
+        """
+        stmt: Statement = self.statement
 
         try:
             assert len(self.header) == 0, \
@@ -143,16 +129,13 @@ EUR,"13,87",
         # No need to (re)calculate the balance since there is no history.
         # But set the dates.
         stmt.start_balance = stmt.end_balance = None
-        if stmt.lines:
-            stmt.start_date = min(sl.date for sl in stmt.lines)
+        if stmt.line_count:
+            stmt.start_date = stmt.min_date
             # end date is exclusive for OFX
-            stmt.end_date = max(sl.date for sl in stmt.lines)
-            stmt.end_date += datetime.timedelta(days=1)
+            stmt.end_date = stmt.max_date + datetime.timedelta(days=1)
 
         logger.debug('stmt: %r', stmt)
 
-        return stmt
-
     def split_records(self) -> Iterable[Any]:
         """Return iterable object consisting of a line per transaction
         """
@@ -180,7 +163,7 @@ EUR,"13,87",
         stmt_line: StatementLine = super().parse_record(line)
 
         # Remove zero-value notifications
-        if stmt_line.amount is None or stmt_line.amount == 0:
+        if not stmt_line.amount_sign:
             return None
 
         # Forget conversions
@@ -199,7 +182,7 @@ EUR,"13,87",
             stmt_line.trntype = "XFER"
         elif stmt_line.memo in ['Storting', 'iDEAL storting', 'iDEAL Deposit']:
             stmt_line.trntype = "DEP"
-        elif stmt_line.amount < 0:  # pragma: no cover
+        elif stmt_line.amount_sign < 0:  # pragma: no cover
             stmt_line.trntype = "DEBIT"
         else:
             stmt_line.trntype = "CREDIT"
@@ -207,10 +190,7 @@ EUR,"13,87",
         if stmt_line.trntype not in ["XFER", "DEP"]:
             return None
 
-        # Determine some fields not in the self.mappings
-        # A hack but needed to use the adjust method
-        stmt_line.__class__ = StatementLine
-        stmt_line.adjust(self.unique_id_set)
+        stmt_line.adjust(self.unique_ids)
 
         # Product known?
         if line[self.mappings['memo'] - 2]:  # pragma: no cover
@@ -226,21 +206,5 @@ EUR,"13,87",
         return super().parse_decimal(value) if value else Decimal(0)
 
 
-class Plugin(BasePlugin):
-    """DEGIRO trader platform, The Netherlands, CSV (https://www.degiro.nl/)
-    """
-    def get_parser(self, f: str) -> Parser:
-        fin = open(f, "r", encoding="ISO-8859-1") if isinstance(f, str) else f
-        try:
-            account_id = self.settings['account_id']
-        except Exception:
-            raise RuntimeError("""
-Please define an 'account_id' in the ofxstatement configuration.
-
-Run
-
-$ ofxstatement edit-config
-
-for more information.
-""")
-        return Parser(fin, account_id)
+# backwards compatibility: the plugin used to be defined here
+Plugin = DegiroPlugin
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Detection of the bank (plugin) and dialect of a file by its contents.
+
+Only the first HEAD_SIZE bytes are read:
+
+- a PDF (magic bytes %PDF-) is an ICS statement, as is the text of one
+  converted by pdftotext (it mentions the ICS-klantnummer);
+- the first line of a Knab export is KNAB EXPORT;
+- ING and DEGIRO exports start with their header row;
+- an ASN export has no header: its records have 19 columns, starting with
+  a date and the ASN account.
+
+The header rows are compiled into a single regular expression, so routing
+many files costs one match per file and never a trial parse. The account
+is taken from the first record when the dialect has an account column.
+
+This module only depends on the standard library, so the batch command
+can detect the files before a parser module is imported.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+import csv
+import io
+import re
+
+# the number of bytes read
+HEAD_SIZE = 4096
+
+# A PDF starts with %PDF-, but readers accept it within the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+PDF_MAGIC_OFFSET = 1024
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+ICS_TEXT_EXPR = re.compile(r'^International Card Services\b|\bICS-klantnummer\b', re.MULTILINE)
+
+# the header rows (the parsers ing.Parser and degiro.Parser check them too)
+ING_TRANSACTIONS = ['Datum', 'Naam / Omschrijving', 'Rekening', 'Tegenrekening', 'Code',
+                    'Af Bij', 'Bedrag (EUR)', 'MutatieSoort', 'Mededelingen']
+# https://github.com/gpaulissen/ofxstatement-dutch/issues/2
+# MutatieSoort => Mutatiesoort
+ING_TRANSACTIONS_MUTATIESOORT = [column.replace('MutatieSoort', 'Mutatiesoort')
+                                 for column in ING_TRANSACTIONS]
+ING_BALANCES = ['Datum', 'Boeksaldo', 'Valutair saldo']
+DEGIRO = ['Datum', 'Tijd', 'Valutadatum', 'Product', 'ISIN', 'Omschrijving', 'FX',
+          'Mutatie', '', 'Saldo', '', 'Order Id']
+
+IBAN_EXPR = re.compile(r'^[A-Z]{2}\d{2}[A-Z0-9]{4,30}$')
+
+# a headerless ASN record: date, ASN account and 17 more columns (quoted
+# by single quotes)
+ASN_FIELD = r"(?:'[^']*'|[^,'\r\n]*)"
+ASN_EXPR = re.compile(r"\d{2}-\d{2}-\d{4},NL\d{2}ASNB\d{10}(?:,%s){17}\r?$" % ASN_FIELD,
+                      re.MULTILINE)
+
+
+class Detection(NamedTuple):
+    """The plugin, dialect and (when found) account of a file"""
+    plugin: str
+    dialect: str
+    account_id: Optional[str] = None
+
+
+class Signature(NamedTuple):
+    """A first line of a file: a header row or the Knab preamble"""
+    start: str
+    plugin: str
+    dialect: str
+    delimiter: str
+    # the column of the account in the first record (None when absent)
+    account_column: Optional[int]
+    # the number of lines before the first record
+    header_lines: int = 1
+
+
+def header_signatures(header: List[str],
+                      plugin: str,
+                      dialect: str,
+                      account_column: Optional[int] = None,
+                      delimiters: Tuple[str, ...] = (',', ';')) -> List[Signature]:
+    """The signatures of a header row, quoted or not, for every delimiter.
+
+    >>> [s.start for s in header_signatures(['Datum', 'Boeksaldo'], 'nl-ing', 'ing-balances')]
+    ['"Datum","Boeksaldo"', 'Datum,Boeksaldo', '"Datum";"Boeksaldo"', 'Datum;Boeksaldo']
+    """
+    return [Signature(quote + (quote + delimiter + quote).join(header) + quote,
+                      plugin,
+                      '{}-{}'.format(dialect, 'comma' if delimiter == ',' else 'semicolon')
+                      if len(delimiters) > 1 else dialect,
+                      delimiter,
+                      account_column)
+            for delimiter in delimiters
+            for quote in ['"', '']]
+
+
+SIGNATURES: List[Signature] = [
+    *header_signatures(ING_TRANSACTIONS, 'nl-ing', 'ing', 2),
+    *header_signatures(ING_TRANSACTIONS_MUTATIESOORT, 'nl-ing', 'ing', 2),
+    *header_signatures(ING_BALANCES, 'nl-ing', 'ing-balances'),
+    *header_signatures(DEGIRO, 'nl-degiro', 'degiro', delimiters=(',',)),
+    Signature('KNAB EXPORT;', 'nl-knab', 'knab', ';', 0, header_lines=2),
+]
+
+# the signatures as alternatives: group i + 1 matches SIGNATURES[i]
+SIGNATURE_EXPR = re.compile('|'.join('({})'.format(re.escape(signature.start))
+                                     for signature in SIGNATURES))
+
+
+def detect_head(head: bytes) -> Optional[Detection]:
+    """The detection of a file starting with head (None when unknown).
+
+    >>> detect_head(b'%PDF-1.4')
+    Detection(plugin='nl-icscards', dialect='ics-pdf', account_id=None)
+    >>> detect_head(b'"Datum","Boeksaldo","Valutair saldo"\\r\\n')
+    Detection(plugin='nl-ing', dialect='ing-balances-comma', account_id=None)
+    >>> detect_head(b'KNAB EXPORT;;;\\nRekeningnummer;Transactiedatum\\n"NL99KNAB9999999999";"21-06-2019"\\n')
+    Detection(plugin='nl-knab', dialect='knab', account_id='NL99KNAB9999999999')
+    >>> detect_head(b'Datum;Naam\\n')
+    """
+    if PDF_MAGIC in head[:PDF_MAGIC_OFFSET + len(PDF_MAGIC)]:
+        return Detection('nl-icscards', 'ics-pdf')
+
+    if head.startswith(UTF8_BOM):
+        head = head[len(UTF8_BOM):]
+    # ISO-8859-1 decodes anything (the header rows are ASCII)
+    text = head.decode('ISO-8859-1')
+
+    m = SIGNATURE_EXPR.match(text)
+    if m:
+        signature = SIGNATURES[m.lastindex - 1]  # type: ignore
+        account_id = None
+        if signature.account_column is not None:
+            account_id = first_record_column(text,
+                                             signature.delimiter,
+                                             signature.header_lines,
+                                             signature.account_column)
+        return Detection(signature.plugin, signature.dialect, account_id)
+
+    m = ASN_EXPR.match(text)
+    if m:
+        return Detection('nl-asn', 'asn', text[11:29])
+
+    if ICS_TEXT_EXPR.search(text):
+        return Detection('nl-icscards', 'ics')
+    return None
+
+
+def first_record_column(text: str,
+                        delimiter: str,
+                        header_lines: int,
+                        column: int) -> Optional[str]:
+    """The column of the first record after the header lines when it is
+    an account number (IBAN)."""
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    try:
+        for _ in range(header_lines):
+            next(reader)
+        record = next(reader)
+    except (StopIteration, csv.Error):
+        return None
+    if len(record) > column and IBAN_EXPR.match(record[column]):
+        return record[column]
+    return None
+
+
+def detect(filename: str) -> Optional[Detection]:
+    """The detection of a file by its first HEAD_SIZE bytes (None when
+    unknown)."""
+    with open(filename, 'rb') as f:
+        return detect_head(f.read(HEAD_SIZE))
@@ -1,19 +1,19 @@
 # -*- coding: utf-8 -*-
-from typing import Iterable, Set, Optional, List, Iterator, Any, Union
+from typing import Iterable, Optional, List, Iterator, Any, Union, Dict, \
+    NamedTuple, Tuple
 
 import sys
-import locale
 import re
-import io
 from decimal import Decimal
-from datetime import datetime
-from subprocess import check_output, CalledProcessError
+from datetime import datetime, timedelta
 import logging
 
-from ofxstatement.plugin import Plugin as BasePlugin
-from ofxstatement.parser import StatementParser as BaseStatementParser
 
-from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl import amounts, dates
+from ofxstatement.plugins.nl.parser import StatementParser as BaseStatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+from ofxstatement.plugins.nl.plugins import IcsCardsPlugin
 
 # Need Python 3 for super() syntax
 assert sys.version_info[0] >= 3, "At least Python 3 is required."
@@ -21,9 +21,87 @@ assert sys.version_info[0] >= 3, "At least Python 3 is required."
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# the columns of a line are separated by two or more spaces
+COLUMN_SEPARATOR = re.compile(r'\s\s+|\t|\n')
+# the columns of a line with their position (the inverse of the above)
+COLUMN_EXPR = re.compile(r'\S+(?: \S+)*')
+COUNTRY_EXPR = re.compile(r'^[A-Z][A-Z]$')
 
-class Parser(BaseStatementParser):  # type: ignore
-    unique_id_set: Set[str]
+
+def squeeze(value: str) -> str:
+    """Strip the value and join its columns by a single space.
+
+    >>> squeeze('L OASIS     2048286      ')
+    'L OASIS 2048286'
+    """
+    value = value.strip()
+    if '  ' in value or '\t' in value:
+        value = ' '.join(COLUMN_SEPARATOR.split(value))
+    return value
+
+
+class Columns(NamedTuple):
+    """The start of the columns of the transactions on a page.
+
+    The layout text of pdftotext has fixed width columns, however their
+    width differs per page, so they are learned from the lines of a page:
+    the booking date, payee, place and country columns (the transaction
+    date starts a line and the amounts follow the country).
+    """
+    booking: int
+    payee: int
+    place: int
+    country: int
+
+    @classmethod
+    def learn(cls, line: str) -> Optional['Columns']:
+        """The columns of a transaction line with a payee, place and
+        country that are all separated by two or more spaces (None for
+        other lines).
+        """
+        columns = list(COLUMN_EXPR.finditer(line))
+        if len(columns) not in [7, 8] or \
+                not COUNTRY_EXPR.match(columns[4].group()) or \
+                columns[-1].group() not in ['Af', 'Bij']:
+            return None
+        return cls(*(column.start() for column in columns[1:5]))
+
+    def split(self, line: str) -> Optional[List[str]]:
+        """The row of a transaction line, sliced by position (None when the
+        line does not fit these columns).
+
+        >>> line = '21 feb  22 feb  NEWREST WAGONS LITS FRANCPARIS   FR   10,96  Af'
+        >>> Columns(8, 16, 41, 49).split(line)
+        ['21 feb', '22 feb', 'NEWREST WAGONS LITS FRANC', 'PARIS', 'FR', '10,96', 'Af']
+        >>> Columns(8, 16, 41, 48).split(line)
+        """
+        booking, payee, place, country = self
+        end = country + 2
+        if line[booking - 2:booking] != '  ' or \
+                line[payee - 2:payee] != '  ' or line[payee] == ' ' or \
+                line[country - 2:country] != '  ' or \
+                line[end:end + 2] != '  ' or \
+                not COUNTRY_EXPR.match(line[country:end]):
+            return None
+        # the amount in foreign currency (optional), amount and Af/Bij
+        amounts = COLUMN_SEPARATOR.split(line[end:].lstrip())
+        if len(amounts) not in [2, 3]:
+            return None
+        return [line[:booking].rstrip(),
+                line[booking:payee].rstrip(),
+                squeeze(line[payee:place]),
+                squeeze(line[place:country]),
+                line[country:end],
+                *amounts]
+
+
+class Parser(BaseStatementParser):
+    unique_ids: TransactionIdRegistry
+    # the dates of the statement lines by day and month (and end date)
+    dates: Dict[Tuple[str, datetime], datetime]
+    # the total amount of the lines before and after the date range
+    before: Decimal
+    after: Decimal
 
     def __init__(self, fin: Iterable[str]) -> None:
         super().__init__()
@@ -31,31 +109,34 @@ class Parser(BaseStatementParser):  # type: ignore
                                    account_id=None,
                                    currency='EUR')  # My Statement
         self.fin = fin
-        self.unique_id_set = set()
-
-    def parse(self) -> Statement:
-        """Main entry point for parsers
+        self.unique_ids = TransactionIdRegistry()
+        self.dates = {}
+        self.before = self.after = Decimal(0)
 
-        super() implementation will call to split_records and parse_record to
-        process the file.
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
         """
-        stmt: Optional[Statement] = None
-        # Save locale
-        current_locale = locale.setlocale(category=locale.LC_ALL)
-        # Need to parse "05 mei" i.e. "05 may"
-        locale.setlocale(category=locale.LC_ALL, locale="nl_NL")
-        try:
-            # Python 3 needed
-            stmt = super().parse()
-
-            if stmt and stmt.lines:
-                stmt.start_date = min(sl.date for sl in stmt.lines if sl.date)
-
-            stmt.assert_valid()
-        finally:
-            locale.setlocale(category=locale.LC_ALL, locale=current_locale)
-
-        return stmt
+        stmt: Statement = self.statement
+
+        if self.date_range is not None:
+            if stmt.line_count == 0:
+                # no lines in the date range: an empty statement
+                stmt.start_date = stmt.end_date = None
+                stmt.start_balance = stmt.end_balance = None
+                return
+            # the balances of the range
+            if stmt.start_balance is not None and stmt.end_balance is not None:
+                stmt.start_balance += self.before
+                stmt.end_balance -= self.after
+            if self.date_range.until is not None and stmt.end_date is not None:
+                # end date is exclusive for OFX
+                until = datetime.strptime(self.date_range.until, '%Y%m%d')
+                stmt.end_date = min(stmt.end_date, until + timedelta(days=1))
+
+        if stmt.line_count:
+            stmt.start_date = stmt.min_date
+
+        stmt.assert_valid()
 
     @staticmethod
     def get_amount(amount_in: str, transaction_type_in: str) -> Decimal:
@@ -73,24 +154,37 @@ class Parser(BaseStatementParser):  # type: ignore
         assert isinstance(amount_in, str)
         # Amount something like 1.827,97, € 1.827,97 (both dutch) or 1,827.97?
         # Since April 2025 it may be €1.827,97 as well
-        m = re.search(r'^(\S+\s|\D)?([0-9,.]+)$', amount_in)
-        assert m is not None
-        amount_out = m.group(2)
-        if amount_out[-3] == ',':
-            amount_out = amount_out.replace('.', '').replace(',', '.')
-
-        # convert to str to keep just the last two decimals
-        amount_out = sign_out * Decimal(str(amount_out))
+        cents: Optional[int] = amounts.parse_dutch_cents(amount_in)
+        if cents is not None:
+            amount_out = sign_out * amounts.to_decimal(cents)
+        else:
+            m = re.search(r'^(\S+\s|\D)?([0-9,.]+)$', amount_in)
+            assert m is not None
+            amount_out = m.group(2)
+            if amount_out[-3] == ',':
+                amount_out = amount_out.replace('.', '').replace(',', '.')
+
+            # convert to str to keep just the last two decimals
+            amount_out = sign_out * Decimal(str(amount_out))
         logger.debug("get_amount(%s, %s) = %s", amount_in, transaction_type_in, amount_out)
         return amount_out
 
+    @staticmethod
+    def get_cents(amount_in: str, transaction_type_in: str) -> Union[int, Decimal]:
+        """Same as get_amount() but return the number of cents when possible.
+        """
+        cents: Optional[int] = amounts.parse_dutch_cents(amount_in) \
+            if isinstance(amount_in, str) else None
+        if cents is None or transaction_type_in not in ['Af', 'Bij', '  ']:
+            return Parser.get_amount(amount_in, transaction_type_in)
+        return -cents if transaction_type_in == 'Af' else cents
+
     def split_records(self) -> Iterator[Any]:
         """Return iterable object consisting of a line per transaction
         """
         def convert_str_to_list(str: str,
-                                max_items: Optional[int] = None,
-                                sep: str = r'\s\s+|\t|\n') -> List[str]:
-            return [x for x in re.split(sep, str)[0:max_items]]
+                                max_items: Optional[int] = None) -> List[str]:
+            return [x for x in COLUMN_SEPARATOR.split(str)[0:max_items]]
 
         first_line = True
         first_line_row = ['International Card Services BV', 'www.icscards.nl']
@@ -108,13 +202,27 @@ class Parser(BaseStatementParser):  # type: ignore
         # 21 mrt.        22 mrt.           APPLE.COM/BILL                                  ITUNES.COM                       IE                                                  0,99   Af
         statement_expr = \
             re.compile(r'^\d\d [a-z]{3}\.?\s+\d\d [a-z]{3}\.?.+[0-9,.]+\s+(Af|Bij|  )$')
-        country = re.compile("^[A-Z][A-Z]$")
+        country = COUNTRY_EXPR
+
+        # The columns of the current page: learned when two transaction
+        # lines agree, until then the rows are split by spaces.
+        columns: Optional[Columns] = None
+        candidates: Dict[Columns, int] = {}
 
         for line in self.fin:
             line = line.strip()
 
             logger.debug('line: %s', line)
 
+            if columns is not None and \
+                    not (first_line or new_page or balance) and \
+                    statement_expr.search(line):
+                sliced: Optional[List[str]] = columns.split(line)
+                if sliced is not None:
+                    logger.debug('yield row: %s', sliced)
+                    yield sliced
+                    continue
+
             # to ease the parsing pain
             row: List[str] = convert_str_to_list(line)
 
@@ -135,12 +243,18 @@ class Parser(BaseStatementParser):  # type: ignore
 
             elif row == new_page_row:
                 new_page = True
+                columns = None
+                candidates.clear()
             elif new_page:
                 new_page = False
                 # exclusive in ICSCards
-                self.statement.end_date = \
-                    datetime.strptime(row[0],
-                                      '%d %B %Y')
+                end_date = dates.parse_dutch_date(row[0])
+                # every page repeats the header of the first page
+                assert self.statement.end_date in [None, end_date] and \
+                    self.statement.account_id in [None, row[1]], \
+                    "Page header {0} differs from the first page ({1}, {2})".format(
+                        row, self.statement.end_date, self.statement.account_id)
+                self.statement.end_date = end_date
                 self.statement.account_id = row[1]
 
             elif row == balance_row:
@@ -167,7 +281,14 @@ class Parser(BaseStatementParser):  # type: ignore
                 self.statement.end_balance = Parser.get_amount(row[-2],
                                                                row[-1])
 
-            elif re.search(statement_expr, line):
+            elif statement_expr.search(line):
+                if columns is None:
+                    candidate = Columns.learn(line)
+                    if candidate is not None:
+                        candidates[candidate] = candidates.get(candidate, 0) + 1
+                        if candidates[candidate] > 1:
+                            columns = candidate
+
                 # payee, place and country may be something like:
                 #
                 # THY|2357312380512|Istanbul|US
@@ -197,6 +318,24 @@ class Parser(BaseStatementParser):  # type: ignore
                          new_page,
                          balance)
 
+    def in_range(self, stmt_line: StatementLine) -> bool:
+        """Whether a statement line is in the date range. The records have
+        no year, so this is checked after parsing (and the id is that of a
+        conversion of the whole file). The amounts of the lines left out
+        are added to before or after.
+        """
+        if self.date_range is None:
+            return True
+        assert stmt_line.date is not None and stmt_line.amount is not None
+        key = stmt_line.date.strftime('%Y%m%d')
+        if key in self.date_range:
+            return True
+        if self.date_range.since is not None and key < self.date_range.since:
+            self.before += stmt_line.amount
+        else:
+            self.after += stmt_line.amount
+        return False
+
     def parse_record(self, row: List[str]) -> Optional[StatementLine]:
         """Parse given transaction line and return StatementLine object
         """
@@ -215,15 +354,24 @@ class Parser(BaseStatementParser):  # type: ignore
             return result
 
         def get_date(d_m: str) -> Optional[datetime]:
+            assert self.statement.end_date and self.statement.end_date.year
+            # A statement has many lines for few dates: convert them once.
+            key = (d_m, self.statement.end_date)
+            dt: Optional[datetime] = self.dates.get(key)
+            if dt is None:
+                dt = self.dates[key] = convert_date(d_m)
+            return dt
+
+        def convert_date(d_m: str) -> datetime:
             # Without a year it will be 1900 so add the year
             assert self.statement.end_date and self.statement.end_date.year
             d_m_y = "{} {}".format(d_m, self.statement.end_date.year)
-            dt: Optional[datetime] = datetime.strptime(d_m_y, '%d %b %Y')
+            dt: datetime = dates.parse_dutch_date(d_m_y)
             # But now the resulting date may be more than the end date
             # (d_m in december and end date in january)
-            if dt and dt > self.statement.end_date:
+            if dt > self.statement.end_date:
                 dt = add_years(dt, -1)
-            assert dt is None or dt <= self.statement.end_date
+            assert dt <= self.statement.end_date
             return dt
 
         logger.debug('parse_record(%s)', str(row))
@@ -247,36 +395,21 @@ class Parser(BaseStatementParser):  # type: ignore
             memo = row[2]
 
         # Skip amount in foreign currency
-        amount = Parser.get_amount(row[-2], row[-1])
+        amount = Parser.get_cents(row[-2], row[-1])
 
         # Remove zero-value notifications
         if amount != 0:
             stmt_line = StatementLine(date=date,
-                                      memo=memo,
-                                      amount=amount)
+                                      memo=memo)
+            stmt_line.cents = amount
             stmt_line.payee = payee
-            stmt_line.adjust(self.unique_id_set)
+            stmt_line.adjust(self.unique_ids)
+            if not self.in_range(stmt_line):
+                stmt_line = None
 
         logger.debug('stmt_line: %s', stmt_line)
         return stmt_line
 
 
-class Plugin(BasePlugin):
-    """ICSCards, The Netherlands, PDF (https://icscards.nl/)
-    """
-
-    def get_file_object_parser(self, fh: Iterable[str]) -> Parser:
-        return Parser(fh)
-
-    def get_parser(self, filename: str) -> Parser:
-        pdftotext = ["pdftotext", "-layout", filename, '-']
-        fh: Iterable[str]
-
-        # Is it a PDF or an already converted file?
-        try:
-            fh = io.StringIO(check_output(pdftotext).decode())
-            # No exception: apparently it is a PDF.
-        except CalledProcessError:
-            fh = open(filename, "r")
-
-        return self.get_file_object_parser(fh)
+# backwards compatibility: the plugin used to be defined here
+Plugin = IcsCardsPlugin
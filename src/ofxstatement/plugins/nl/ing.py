@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
-from typing import Set, Optional, List, Iterator, Any, Dict, TextIO
+from typing import Optional, List, Iterator, Any, Callable, Dict, TextIO
 
-import re
 import csv
+import itertools
 import sys
 import datetime
 import logging
 
-from ofxstatement.plugin import Plugin as BasePlugin
-from ofxstatement.parser import CsvStatementParser
 from ofxstatement.exceptions import ParseError
 from ofxstatement.statement import BankAccount
 
-from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.detect import ING_BALANCES, ING_TRANSACTIONS, \
+    ING_TRANSACTIONS_MUTATIESOORT, Signature, header_signatures
+from ofxstatement.plugins.nl.parser import CsvStatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+from ofxstatement.plugins.nl.plugins import IngPlugin
 
 # Need Python 3 for super() syntax
 assert sys.version_info[0] >= 3, "At least Python 3 is required."
@@ -95,29 +98,12 @@ class Parser(CsvStatementParser):
     date_format: str
 
     # transactions / balance
-    header: List[List[str]] = [["Datum",
-                                "Naam / Omschrijving",
-                                "Rekening",
-                                "Tegenrekening",
-                                "Code",
-                                "Af Bij",
-                                "Bedrag (EUR)",
-                                "MutatieSoort",
-                                "Mededelingen"],
-                               # https://github.com/gpaulissen/ofxstatement-dutch/issues/2
-                               # MutatieSoort => Mutatiesoort
-                               ["Datum",
-                                "Naam / Omschrijving",
-                                "Rekening",
-                                "Tegenrekening",
-                                "Code",
-                                "Af Bij",
-                                "Bedrag (EUR)",
-                                "Mutatiesoort",
-                                "Mededelingen"],
-                               ["Datum",
-                                "Boeksaldo",
-                                "Valutair saldo"]]
+    header: List[List[str]] = [ING_TRANSACTIONS,
+                               ING_TRANSACTIONS_MUTATIESOORT,
+                               ING_BALANCES]
+    signatures: List[Signature] = [signature
+                                   for columns in header
+                                   for signature in header_signatures(columns, 'nl-ing', 'ing')]
     # 0-based
     mappings_by_header: List[Dict[str, int]] = [{
         # id (determined later)
@@ -136,9 +122,11 @@ class Parser(CsvStatementParser):
     }]
 
     # variables
-    unique_id_set: Set[str]
+    unique_ids: TransactionIdRegistry
     header_idx: int
     mappings: Dict[str, int]
+    # the lines of a balance file are no statement lines
+    balances: Statement
 
     def __init__(self,
                  fin: TextIO,
@@ -149,18 +137,14 @@ class Parser(CsvStatementParser):
         self.statement = Statement(bank_id="INGBNL2A",
                                    account_id=account_id,
                                    currency="EUR")  # My Statement
-        self.unique_id_set = set()
+        self.unique_ids = TransactionIdRegistry()
         self.header_idx = -1
+        self.balances = Statement()
 
-    def parse(self) -> Statement:
-        """Main entry point for parsers
-
-        super() implementation will call to split_records and parse_record to
-        process the file.
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
         """
-
-        # Python 3 needed
-        stmt: Statement = super().parse()
+        stmt: Statement = self.statement
 
         try:
             assert self.header_idx >= 0 and self.header_idx < len(self.header), \
@@ -173,37 +157,66 @@ class Parser(CsvStatementParser):
             # No need to (re)calculate the balance since there is no history.
             # But set the dates.
             stmt.start_balance = stmt.end_balance = None
-            stmt.start_date = min(sl.date for sl in stmt.lines)
-            # end date is exclusive for OFX
-            stmt.end_date = max(sl.date for sl in stmt.lines)
-            stmt.end_date += datetime.timedelta(days=1)
+            if stmt.line_count:
+                stmt.start_date = stmt.min_date
+                # end date is exclusive for OFX
+                stmt.end_date = stmt.max_date + datetime.timedelta(days=1)
         elif self.header_idx == 1:
+            balances: Statement = self.balances
             stmt.start_date = stmt.start_balance = None
-            stmt.end_date = max(sl.date for sl in stmt.lines)
-            assert stmt.lines[0].date == stmt.end_date or \
-                stmt.lines[-1].date == stmt.end_date
-            end_idx: int = 0 if stmt.lines[0].date == stmt.end_date else -1
-            stmt.end_balance = stmt.lines[end_idx].amount
+            if balances.first_line is None or balances.last_line is None:
+                # no balances (in the date range): an empty statement
+                stmt.end_date = stmt.end_balance = None
+                return
+            stmt.end_date = balances.max_date
+            assert balances.first_line.date == stmt.end_date or \
+                balances.last_line.date == stmt.end_date
+            end_line: StatementLine = balances.first_line \
+                if balances.first_line.date == stmt.end_date \
+                else balances.last_line
+            stmt.end_balance = end_line.amount
             # end date is exclusive for OFX
             stmt.end_date += datetime.timedelta(days=1)
-            # no transaction lines
-            stmt.lines = []
 
-        return stmt
+    def chunk_state(self) -> Any:
+        """The account and the balances of a chunk (see chunks.py)."""
+        return self.statement.account_id, self.balances
+
+    def merge_chunk_state(self, state: Any) -> None:
+        account_id, balances = state
+        if account_id:
+            if self.statement.account_id:
+                assert self.statement.account_id == account_id, \
+                    "Only one account is allowed; previous account: {}, \
+this line's account: {}".format(self.statement.account_id, account_id)
+            else:
+                self.statement.account_id = account_id
+        self.balances.merge_bounds(balances)
 
     def split_records(self) -> Iterator[Any]:
         """Return iterable object consisting of a line per transaction.
 
         Solution for https://github.com/gpaulissen/ofxstatement-dutch/issues/2:
 
-        Try to determine the delimiter and so on, based on the contents (using csv.Sniffer()).
+        Determine the delimiter from the header, the first line (see
+        sniff()). The file is read just once, so it need not be seekable.
         """
-        try:
-            dialect = csv.Sniffer().sniff(self.fin.read(1024), delimiters=',;')
-            self.fin.seek(0)
-            return csv.reader(self.fin, dialect=dialect)
-        except Exception:
-            return csv.reader(self.fin, delimiter=',')
+        first_line: str = self.fin.readline()
+        return csv.reader(itertools.chain([first_line], self.fin),
+                          delimiter=self.sniff(first_line))
+
+    def sniff(self, first_line: str) -> str:
+        """Return the delimiter for a file starting with first_line.
+
+        The line is matched against the signatures of the known headers
+        (comma or semicolon separated, quoted or not). If there is no match
+        (the header will be rejected later on) the delimiter is the one that
+        occurs most.
+        """
+        for signature in self.signatures:
+            if first_line.startswith(signature.start):
+                return signature.delimiter
+        return ';' if first_line.count(';') > first_line.count(',') else ','
 
     def parse_record(self,
                      line: List[str]) -> Optional[StatementLine]:
@@ -243,13 +256,15 @@ class Parser(CsvStatementParser):
                     msg.format(line, self.header[0], self.header[1], self.header[2])
 
                 self.mappings = self.mappings_by_header[self.header_idx]
+                self.row_to_line = self.compile_transaction() \
+                    if self.header_idx == 0 \
+                    else self.compile_mappings(self.mappings)
                 return None
 
+            # extra columns (after the header columns) are ignored
             if self.header_idx == 0:
-                line = line[0:len(self.header[0])]  # 0 and 1 have equal length
                 stmt_line = self.parse_transaction(line)
             elif self.header_idx == 1:
-                line = line[0:len(self.header[-1])]
                 stmt_line = self.parse_balance(line)
 
         except Exception as e:
@@ -269,34 +284,15 @@ this line's account: {}".format(self.statement.account_id, line[2])
 
         assert line[5] in ['Af', 'Bij']
 
-        if line[5] == 'Af':
-            amount: Optional[str] = line[self.mappings['amount']]
-            line[self.mappings['amount']] =\
-                '-' + (amount if isinstance(amount, str) else '')
-
-        if line[self.mappings['bank_account_to']]:
-            line[self.mappings['payee']] =\
-                "{} ({})".format(line[self.mappings['payee']],
-                                 line[self.mappings['bank_account_to']])
-        else:
-            line[self.mappings['memo']] =\
-                "{}, {}".format(line[self.mappings['payee']],
-                                line[self.mappings['memo']])
-            line[self.mappings['payee']] = ''
-
-        # Python 3 needed
-        stmt_line: StatementLine = super().parse_record(line)
+        stmt_line: StatementLine = self.row_to_line(line)
 
         # Remove zero-value notifications
-        if stmt_line.amount == 0:
+        if stmt_line.amount_sign == 0:
             return None
 
-        # Determine some fields not in the self.mappings
-        # A hack but needed to use the adjust method
-        stmt_line.__class__ = StatementLine
-        stmt_line.adjust(self.unique_id_set)
+        stmt_line.adjust(self.unique_ids)
 
-        if stmt_line.amount < 0:
+        if stmt_line.amount_sign < 0:
             stmt_line.trntype = "DEBIT"
         else:
             stmt_line.trntype = "CREDIT"
@@ -307,27 +303,46 @@ this line's account: {}".format(self.statement.account_id, line[2])
                             acct_id=stmt_line.bank_account_to)
         return stmt_line
 
+    def compile_transaction(self) -> Callable[[List[str]], StatementLine]:
+        """Return the function creating the statement line of a transaction
+        row (see compile_mappings()).
+
+        A debit ('Af') gets a negative amount. With a counter account the
+        payee becomes "<name> (<counter account>)", without one the name is
+        prepended to the memo and the payee is empty.
+        """
+        name: int = self.mappings['payee']
+        memo: int = self.mappings['memo']
+        amount: int = self.mappings['amount']
+        bank_account_to: int = self.mappings['bank_account_to']
+
+        def get_amount(line: List[str]) -> str:
+            return '-' + line[amount] if line[5] == 'Af' else line[amount]
+
+        def get_payee(line: List[str]) -> str:
+            return "{} ({})".format(line[name], line[bank_account_to]) \
+                if line[bank_account_to] else ''
+
+        def get_memo(line: List[str]) -> str:
+            return line[memo] if line[bank_account_to] \
+                else "{}, {}".format(line[name], line[memo])
+
+        return self.compile_mappings(self.mappings,
+                                     amount=get_amount,
+                                     payee=get_payee,
+                                     memo=get_memo)
+
     def parse_balance(self,
                       line: List[str]) -> Optional[StatementLine]:
-        # Python 3 needed
-        stmt_line: StatementLine = super().parse_record(line)
-        stmt_line.trntype = "DEBIT" if stmt_line.amount < 0 else "CREDIT"
+        stmt_line: StatementLine = self.row_to_line(line)
+        stmt_line.trntype = "DEBIT" if stmt_line.amount_sign < 0 else "CREDIT"
         stmt_line.id = 1
-        # Determine some fields not in the self.mappings
-        # A hack but needed to use the adjust method
-        stmt_line.__class__ = StatementLine
-        stmt_line.adjust(self.unique_id_set)
-        return stmt_line
+        stmt_line.adjust(self.unique_ids)
+        self.assert_valid(stmt_line)
+        # no transaction lines
+        self.balances.update_bounds(stmt_line)
+        return None
 
 
-class Plugin(BasePlugin):
-    """ING Bank, The Netherlands, CSV (https://www.ing.nl/)
-    """
-    def get_parser(self, filename: str) -> Parser:
-        p = re.compile('(NL\\d+INGB\\d+)')
-        m = p.search(filename)
-        account_id: Optional[str] = None
-        if m:
-            account_id = m.group(0)
-        fin = open(filename, "r", encoding="ISO-8859-1")
-        return Parser(fin, account_id)
+# backwards compatibility: the plugin used to be defined here
+Plugin = IngPlugin
@@ -1,17 +1,18 @@
 # -*- coding: utf-8 -*-
-from typing import Set, Optional, List, Iterator, Any, TextIO
+from typing import Optional, List, Iterator, Any, Callable, TextIO
 
 import csv
 import sys
 import datetime
 import logging
 
-from ofxstatement.plugin import Plugin as BasePlugin
-from ofxstatement.parser import CsvStatementParser
 from ofxstatement.exceptions import ParseError, ValidationError
 from ofxstatement.statement import BankAccount
 
-from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.parser import CsvStatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+from ofxstatement.plugins.nl.plugins import KnabPlugin
 
 # Need Python 3 for super() syntax
 assert sys.version_info[0] >= 3, "At least Python 3 is required."
@@ -102,7 +103,7 @@ Boekdatum;
         'bank_account_to': 5,  # Tegenrekeningnummer
     }
 
-    unique_id_set: Set[str]
+    unique_ids: TransactionIdRegistry
 
     # Other mappings not used by parser.CsvStatementParser
     ACCOUNT = 0  # Rekeningnummer
@@ -115,7 +116,8 @@ Boekdatum;
         self.statement = Statement(bank_id="KNABNL2H",
                                    account_id=None,
                                    currency="EUR")  # My Statement
-        self.unique_id_set = set()
+        self.unique_ids = TransactionIdRegistry()
+        self.row_to_line = self.compile_transaction()
         self.header = [['KNAB EXPORT'],
                        ['Rekeningnummer',
                         'Transactiedatum',
@@ -134,15 +136,10 @@ Boekdatum;
                         'Referentie',
                         'Boekdatum']]
 
-    def parse(self) -> StatementLine:
-        """Main entry point for parsers
-
-        super() implementation will call to split_records and parse_record to
-        process the file.
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
         """
-
-        # Python 3 needed
-        stmt: StatementLine = super().parse()
+        stmt: Statement = self.statement
 
         try:
             assert len(self.header) == 0, \
@@ -150,21 +147,45 @@ Boekdatum;
         except Exception as e:
             raise ParseError(0, str(e))
 
+        if stmt.line_count == 0 and self.date_range is not None:
+            # no records in the date range: an empty statement
+            stmt.start_balance = stmt.end_balance = None
+            return
+
         try:
-            assert len(stmt.lines) > 0, "No statement lines read"
+            assert stmt.line_count > 0, "No statement lines read"
 
             # GJP 2020-03-03
             # No need to (re)calculate the balance since there is no history.
             # But set the dates.
             stmt.start_balance = stmt.end_balance = None
-            stmt.start_date = min(sl.date for sl in stmt.lines)
+            stmt.start_date = stmt.min_date
             # end date is exclusive for OFX
-            stmt.end_date = max(sl.date for sl in stmt.lines)
-            stmt.end_date += datetime.timedelta(days=1)
+            stmt.end_date = stmt.max_date + datetime.timedelta(days=1)
         except Exception as e:
             raise ValidationError(str(e), stmt)
 
-        return stmt
+    def compile_transaction(self) -> Callable[[List[str]], StatementLine]:
+        """Return the function creating the statement line of a transaction
+        row (see compile_mappings()).
+
+        A debit ('D') gets a negative amount and with a counter account the
+        payee becomes "<name> (<counter account>)".
+        """
+        name: int = self.mappings['payee']
+        amount: int = self.mappings['amount']
+        bank_account_to: int = self.mappings['bank_account_to']
+
+        def get_amount(line: List[str]) -> str:
+            return '-' + line[amount] if line[self.CD] == 'D' else line[amount]
+
+        def get_payee(line: List[str]) -> str:
+            return "{} ({})".format(line[name], line[bank_account_to]) \
+                if line[bank_account_to] else line[name]
+
+        return self.compile_mappings(self.mappings,
+                                     amount=get_amount,
+                                     payee=get_payee)
 
     def split_records(self) -> Iterator[Any]:
         """Return iterable object consisting of a line per transaction
@@ -204,28 +225,15 @@ this line's account: {}".format(self.statement.account_id,
             assert line[self.CD] in ['D', 'C'], \
                 "Element {} is not D/C in line {}".format(self.CD, str(line))
 
-            if line[self.CD] == 'D':
-                line[self.mappings['amount']] =\
-                    '-' + line[self.mappings['amount']]
-
-            if line[self.mappings['bank_account_to']]:
-                line[self.mappings['payee']] =\
-                    "{} ({})".format(line[self.mappings['payee']],
-                                     line[self.mappings['bank_account_to']])
-
-            # Python 3 needed
-            stmt_line: StatementLine = super().parse_record(line)
+            stmt_line: StatementLine = self.row_to_line(line)
 
             # Remove zero-value notifications
-            if stmt_line.amount == 0:
+            if stmt_line.amount_sign == 0:
                 return None
 
-            # Determine some fields not in the self.mappings
-            # A hack but needed to use the adjust method
-            stmt_line.__class__ = StatementLine
-            stmt_line.adjust(self.unique_id_set)
+            stmt_line.adjust(self.unique_ids)
 
-            if stmt_line.amount < 0:
+            if stmt_line.amount_sign < 0:
                 stmt_line.trntype = "DEBIT"
             else:
                 stmt_line.trntype = "CREDIT"
@@ -240,9 +248,5 @@ this line's account: {}".format(self.statement.account_id,
         return stmt_line
 
 
-class Plugin(BasePlugin):
-    """KNAB Online Bank, The Netherlands, CSV (https://www.knab.nl/)
-    """
-    def get_parser(self, f: str) -> Parser:
-        fin = open(f, "r", encoding="ISO-8859-1") if isinstance(f, str) else f
-        return Parser(fin)
+# backwards compatibility: the plugin used to be defined here
+Plugin = KnabPlugin
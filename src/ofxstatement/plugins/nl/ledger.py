@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""Load statements into an SQLite ledger instead of converting them to OFX.
+
+A Ledger parses a file by any parser of this package (iter_lines(), so the
+lines are streamed) and writes the statement lines to the table
+transactions and the statement header to the table statements:
+
+- a transaction is identified by account and id (the OFX FITID), so
+  loading a file again (or an overlapping export) updates the rows instead
+  of adding them;
+- while the file is parsed the lines are inserted by executemany() in
+  batches of batch_size lines into a temporary table, which is only copied
+  into the table transactions (in one transaction) when the statement is
+  valid, so a file that fails leaves nothing behind and the database is
+  only locked for the copy (the watermark of the parser, see watermark.py,
+  records the ids after the commit);
+- the statement of a file is identified by account and source (the file
+  name).
+
+The amounts and balances are stored as exact decimal text (like the OFX)
+and the amounts as integer cents as well, the dates as yyyy-mm-dd. The
+counters rows and seconds of a Ledger tell how many lines it loaded and
+how long that took (parsing included).
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import itertools
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from ofxstatement.statement import generate_transaction_id
+
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.watermark import commit_watermark
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS statements (
+    account_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    bank_id TEXT,
+    currency TEXT,
+    account_type TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    start_balance TEXT,
+    end_balance TEXT,
+    lines INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL,
+    PRIMARY KEY (account_id, source)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    account_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    date TEXT,
+    amount TEXT,
+    cents INTEGER,
+    trntype TEXT,
+    payee TEXT,
+    memo TEXT,
+    check_no TEXT,
+    refnum TEXT,
+    date_user TEXT,
+    bank_account_to TEXT,
+    currency TEXT,
+    PRIMARY KEY (account_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (account_id, date);
+"""
+
+COLUMNS = ('account_id', 'id', 'date', 'amount', 'cents', 'trntype', 'payee',
+           'memo', 'check_no', 'refnum', 'date_user', 'bank_account_to',
+           'currency')
+
+# the lines of a file before they are copied into transactions
+STAGED = 'CREATE TEMP TABLE IF NOT EXISTS staged AS SELECT * FROM main.transactions WHERE 0'
+STAGE = 'INSERT INTO temp.staged ({}) VALUES ({})'.format(', '.join(COLUMNS),
+                                                          ', '.join('?' * len(COLUMNS)))
+
+# in the order of the file; a row that did not change is not written again
+UPSERT = 'INSERT INTO transactions ({0}) SELECT {0} FROM temp.staged WHERE true ' \
+    'ORDER BY rowid ' \
+    'ON CONFLICT (account_id, id) DO UPDATE SET {1} WHERE ({2}) IS NOT ({3})'.format(
+        ', '.join(COLUMNS),
+        ', '.join('{0} = excluded.{0}'.format(column) for column in COLUMNS[2:]),
+        ', '.join(COLUMNS[2:]),
+        ', '.join('excluded.' + column for column in COLUMNS[2:]))
+
+# the number of lines of an executemany()
+BATCH_SIZE = 10000
+
+# the page cache of a connection in KB: the ids are hashes, so the rows are
+# inserted all over the table
+CACHE_SIZE = 64 * 1024
+
+Row = Tuple[Any, ...]
+
+
+def format_cents(cents: int) -> str:
+    """The decimal text of an amount in cents (as str() of its Decimal).
+
+    >>> format_cents(-150), format_cents(5), format_cents(0)
+    ('-1.50', '0.05', '0.00')
+    """
+    sign = '-' if cents < 0 else ''
+    return '%s%d.%02d' % (sign, abs(cents) // 100, abs(cents) % 100)
+
+
+def format_date(value: Optional[datetime]) -> Optional[str]:
+    """The yyyy-mm-dd of a date (None stays None)."""
+    return None if value is None else value.strftime('%Y-%m-%d')
+
+
+class Ledger:
+    """SQLite database of statements and their transactions (see the
+    module).
+
+    load() parses a file and stores its lines and statement.
+    """
+
+    def __init__(self,
+                 filename: str,
+                 batch_size: int = BATCH_SIZE,
+                 timeout: float = 300.0) -> None:
+        self.filename = filename
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.connection: Optional[sqlite3.Connection] = None
+        # the yyyy-mm-dd of the dates seen (a file has few dates)
+        self.dates: Dict[datetime, str] = {}
+        self.rows = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_s(self) -> float:
+        """The lines loaded per second."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            # the transactions are private
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # transactions are started explicitly (see load())
+            self.connection = sqlite3.connect(self.filename,
+                                              timeout=self.timeout,
+                                              isolation_level=None)
+            self.connection.executescript(SCHEMA)
+            # a power loss may lose the last load, but not corrupt the ledger
+            self.connection.execute('PRAGMA synchronous = NORMAL')
+            self.connection.execute('PRAGMA cache_size = -%d' % CACHE_SIZE)
+            self.connection.execute(STAGED)
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self) -> 'Ledger':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def date_text(self, value: Optional[datetime]) -> Optional[str]:
+        """format_date() of the dates seen before."""
+        if value is None:
+            return None
+        text = self.dates.get(value)
+        if text is None:
+            text = self.dates[value] = value.strftime('%Y-%m-%d')
+        return text
+
+    def iter_rows(self, statement: Statement, lines: Iterator[StatementLine]) \
+            -> Iterator[Row]:
+        """The rows of the table transactions of the lines of a statement
+        (a line without id gets the id of its date, memo and amount)."""
+        date_text = self.date_text
+        for stmt_line in lines:
+            # a line of another package has no cents
+            cents = getattr(stmt_line, 'cents', None)
+            if cents is not None:
+                amount: Optional[str] = format_cents(cents)
+            else:
+                amount = None if stmt_line.amount is None else str(stmt_line.amount)
+            account = stmt_line.bank_account_to
+            yield (statement.account_id or '',
+                   stmt_line.id or generate_transaction_id(stmt_line),
+                   date_text(stmt_line.date),
+                   amount,
+                   cents,
+                   stmt_line.trntype,
+                   stmt_line.payee,
+                   stmt_line.memo,
+                   stmt_line.check_no,
+                   stmt_line.refnum,
+                   date_text(stmt_line.date_user),
+                   getattr(account, 'acct_id', None) if account else None,
+                   stmt_line.currency)
+
+    def statement_row(self, statement: Statement, source: str, lines: int) -> Row:
+        """The row of the table statements (with the number of lines
+        loaded)."""
+        def text(value: Any) -> Optional[str]:
+            return None if value is None else str(value)
+
+        return (statement.account_id or '',
+                source,
+                statement.bank_id,
+                statement.currency,
+                statement.account_type,
+                format_date(statement.start_date),
+                format_date(statement.end_date),
+                text(statement.start_balance),
+                text(statement.end_balance),
+                lines,
+                datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    def load(self, parser: Any, source: Optional[str] = None) -> Statement:
+        """Parse a file by its parser and store the statement and its lines
+        (in one transaction after parsing, since other processes may use
+        the database).
+
+        The source identifies the statement: by default the name of the
+        file of the parser.
+        """
+        started = time.perf_counter()
+        if source is None:
+            source = getattr(getattr(parser, 'fin', None), 'name', None) or ''
+        connection = self.connect()
+        rows = 0
+        statement: Statement
+        try:
+            if hasattr(parser, 'iter_lines'):
+                statement = parser.statement
+                lines = parser.iter_lines()
+            else:
+                # a parser of another package
+                statement = parser.parse()
+                lines = iter(statement.lines)
+            pending = self.iter_rows(statement, lines)
+            while True:
+                batch: List[Row] = list(itertools.islice(pending, self.batch_size))
+                if not batch:
+                    break
+                connection.executemany(STAGE, batch)
+                rows += len(batch)
+            statement.assert_valid()
+
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(UPSERT)
+                connection.execute('INSERT OR REPLACE INTO statements VALUES '
+                                   '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                   self.statement_row(statement, str(source), rows))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        finally:
+            connection.execute('DELETE FROM temp.staged')
+        # the lines are in the ledger
+        commit_watermark(parser)
+        self.rows += rows
+        self.seconds += time.perf_counter() - started
+        return statement
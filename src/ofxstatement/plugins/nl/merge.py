@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Merge of overlapping exports of one account into one statement.
+
+MergeParser parses every file by the parser of its plugin (iter_lines(),
+so split_records() and parse_record() as usual) and yields the lines of
+all files ordered by date and id, every transaction once. A transaction
+is identified by its id (the OFX FITID), which is the same in every
+export that contains the whole day of the transaction.
+
+The lines are collected in runs of at most run_size lines, deduplicated
+by a dictionary of ids. Only the last run stays in memory: the others are
+sorted and spilled to a temporary file, and the sorted runs are merged at
+the end, leaving out the lines with the id of the previous line. So at
+most run_size lines are kept in memory, whatever the size of the inputs
+(the parser of a file still keeps the ids of that file, see
+TransactionIdRegistry).
+
+The statement spans all files: its dates are the smallest start date and
+the largest end date of the files and, when every file has balances, its
+start balance is the one of the file that starts first and its end
+balance the one of the file that ends last (so a gap between the files
+fails the statement validation).
+"""
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, \
+    Sequence, Tuple
+
+import heapq
+import pickle
+import tempfile
+from datetime import datetime
+from operator import attrgetter, itemgetter
+
+from ofxstatement.exceptions import ValidationError
+from ofxstatement.statement import generate_transaction_id
+
+from ofxstatement.plugins.nl.parser import StatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+
+# the number of lines of a run (see MergeParser)
+RUN_SIZE = 100000
+
+# a line with its sort key: date and id
+Record = Tuple[Tuple[datetime, str], StatementLine]
+
+
+def sort_key(stmt_line: StatementLine) -> Tuple[datetime, str]:
+    """The date and id of a line (the id of date, memo and amount when the
+    line has none)."""
+    return (stmt_line.date or datetime.min,
+            stmt_line.id or generate_transaction_id(stmt_line))
+
+
+def spill(records: Iterable[Record]) -> IO[bytes]:
+    """A temporary file with the (sorted) records of a run."""
+    f = tempfile.TemporaryFile()
+    # a pickle per record: a pickler (and unpickler) would keep every
+    # line in its memo
+    for record in records:
+        pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def iter_run(f: IO[bytes]) -> Iterator[Record]:
+    """The records of a spilled run."""
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            f.close()
+            return
+
+
+class MergeParser(StatementParser):
+    """Parser of several exports of one account (see the module).
+
+    get_parser returns the parser of a file, e.g. the get_parser() of a
+    plugin. The counter duplicates tells how many lines were left out.
+    """
+
+    statements: List[Statement]
+
+    def __init__(self,
+                 get_parser: Callable[[str], Any],
+                 filenames: Sequence[str],
+                 run_size: int = RUN_SIZE) -> None:
+        super().__init__()
+        self.get_parser = get_parser
+        self.filenames = filenames
+        self.run_size = run_size
+        self.statement = Statement()
+        self.statements = []
+        self.duplicates = 0
+
+    def iter_lines(self) -> Iterator[StatementLine]:
+        """The lines of all files by date and id, without duplicates.
+
+        The statement headers are complete when the iteration is done.
+        """
+        for stmt_line in self.iter_merged():
+            self.statement.update_bounds(stmt_line)
+            yield stmt_line
+        self.finish_statement()
+
+    def iter_merged(self) -> Iterator[StatementLine]:
+        runs: List[IO[bytes]] = []
+        try:
+            run: Dict[Tuple[datetime, str], StatementLine] = {}
+            for stmt_line in self.iter_files():
+                key = sort_key(stmt_line)
+                if key in run:
+                    self.duplicates += 1
+                    continue
+                run[key] = stmt_line
+                if len(run) >= self.run_size:
+                    runs.append(spill(sorted(run.items(), key=itemgetter(0))))
+                    run = {}
+            # headers first: the watermark needs the account of the lines
+            self.merge_statements()
+
+            last = sorted(run.items(), key=itemgetter(0))
+            records: Iterable[Record] = last
+            if runs:
+                records = heapq.merge(*[iter_run(f) for f in runs], last,
+                                      key=itemgetter(0))
+            previous = None
+            for key, stmt_line in records:
+                if key == previous:
+                    self.duplicates += 1
+                    continue
+                previous = key
+                yield stmt_line
+        finally:
+            for f in runs:
+                f.close()
+
+    def iter_files(self) -> Iterator[StatementLine]:
+        """The lines of every file, in file order."""
+        for filename in self.filenames:
+            parser = self.get_parser(filename)
+            try:
+                if hasattr(parser, 'iter_lines'):
+                    yield from parser.iter_lines()
+                else:
+                    # a parser of another package
+                    yield from parser.parse().lines
+            finally:
+                fin: Any = getattr(parser, 'fin', None)
+                if hasattr(fin, 'close'):
+                    fin.close()
+            self.cur_record += parser.cur_record
+            self.statements.append(parser.statement)
+
+    def merge_statements(self) -> None:
+        """Set the account, bank and currency of the statement of the
+        files (one account only)."""
+        stmt: Statement = self.statement
+        accounts = sorted({statement.account_id for statement in self.statements
+                           if statement.account_id})
+        if len(accounts) > 1:
+            raise ValidationError("Only one account is allowed; accounts: {}"
+                                  .format(", ".join(accounts)), stmt)
+        if self.statements:
+            first = self.statements[0]
+            stmt.account_id = accounts[0] if accounts else None
+            stmt.bank_id = first.bank_id
+            stmt.currency = first.currency
+            stmt.account_type = first.account_type
+
+    def finish_statement(self) -> None:
+        """Set the dates and balances spanning all files."""
+        stmt: Statement = self.statement
+        dated = [statement for statement in self.statements
+                 if statement.start_date is not None and statement.end_date is not None]
+        if dated:
+            first = min(dated, key=attrgetter('start_date'))
+            last = max(dated, key=attrgetter('end_date'))
+            stmt.start_date = first.start_date
+            stmt.end_date = last.end_date
+            if all(None not in (statement.start_balance, statement.end_balance)
+                   for statement in self.statements):
+                stmt.start_balance = first.start_balance
+                stmt.end_balance = last.end_balance
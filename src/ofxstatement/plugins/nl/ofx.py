@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+from typing import Any, IO, Optional, Union
+
+import codecs
+import shutil
+import tempfile
+from datetime import datetime, date
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from ofxstatement.statement import BankAccount, Currency
+
+from ofxstatement.plugins.nl.parser import StatementParser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+
+
+class StreamingOfxWriter:
+    """Write the OFX of a parser while it is still parsing.
+
+    The output is the same as ofxstatement.ofx.OfxWriter(statement).toxml()
+    (not pretty printed) but every transaction is serialised as soon as
+    the parser's iter_lines() yields it, so the statement lines are never
+    kept in memory.
+
+    The statement header (account, DTSTART/DTEND, balances) is only known
+    when all records have been parsed, hence the transactions are written
+    to a spool first: in memory up to spool_size characters, then in a
+    temporary file. When parsing is done the statement is validated and the
+    header, the spooled transactions and the trailer are written to the
+    output. So only memory is saved: nothing reaches the output before the
+    last record has been parsed.
+    """
+
+    spool_size: int = 1024 * 1024
+
+    def __init__(self,
+                 parser: StatementParser,
+                 encoding: str = "utf-8",
+                 spool_size: Optional[int] = None) -> None:
+        self.parser = parser
+        self.encoding = encoding
+        self.genTime = datetime.now()
+        self.default_float_precision = 2
+        if spool_size is not None:
+            self.spool_size = spool_size
+
+    def write(self, out: IO[str]) -> Statement:
+        """Parse the input, write the OFX to out and return the statement
+        (without lines).
+
+        May raise exceptions.ParseError or exceptions.ValidationError, in
+        which case nothing has been written.
+
+        The ids of a watermark of the parser are not recorded: call
+        watermark.commit_watermark(parser) once out is durable.
+        """
+        write_transaction = self.writeBankTransaction
+        write_statement = self.writeStatement
+        if self.parser.stats is not None:
+            write_transaction = self.parser.stats.wrap('write', write_transaction)
+            write_statement = self.parser.stats.wrap('write', write_statement)
+
+        spool: IO[str]
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_size,
+                                           mode="w+",
+                                           encoding="utf-8") as spool:
+            for stmt_line in self.parser.iter_lines():
+                write_transaction(spool, stmt_line)
+
+            statement: Statement = self.parser.statement
+            statement.assert_valid()
+
+            write_statement(out, statement, spool)
+
+        return statement
+
+    def writeStatement(self,
+                       out: IO[str],
+                       statement: Statement,
+                       spool: IO[str]) -> None:
+        out.write(self.header())
+        out.write("<OFX>")
+        self.writeSignon(out)
+        # like ofxstatement no bank transaction list without lines (the
+        # lines written, which are fewer than the lines parsed with a
+        # watermark)
+        if spool.tell():
+            self.writeBankTransactionListStart(out, statement)
+            spool.seek(0)
+            shutil.copyfileobj(spool, out)
+            self.writeBankTransactionListEnd(out, statement)
+        out.write("</OFX>")
+
+    def header(self) -> str:
+        codec = codecs.lookup(self.encoding)
+        if codec.name == "utf-8":
+            encoding_name = "UNICODE"
+            charset_name = "NONE"
+        elif codec.name.startswith("cp"):
+            encoding_name = "USASCII"
+            charset_name = codec.name[2:]
+        else:
+            encoding_name = "USASCII"
+            charset_name = codec.name.upper()
+
+        return ("OFXHEADER:100\r\n"
+                "DATA:OFXSGML\r\n"
+                "VERSION:102\r\n"
+                "SECURITY:NONE\r\n"
+                "ENCODING:{}\r\n"
+                "CHARSET:{}\r\n"
+                "COMPRESSION:NONE\r\n"
+                "OLDFILEUID:NONE\r\n"
+                "NEWFILEUID:NONE\r\n"
+                "\r\n").format(encoding_name, charset_name)
+
+    def writeSignon(self, out: IO[str]) -> None:
+        out.write("<SIGNONMSGSRSV1><SONRS><STATUS>")
+        self.writeText(out, "CODE", "0")
+        self.writeText(out, "SEVERITY", "INFO")
+        out.write("</STATUS>")
+        self.writeDateTime(out, "DTSERVER", self.genTime)
+        self.writeText(out, "LANGUAGE", "ENG")
+        out.write("</SONRS></SIGNONMSGSRSV1>")
+
+    def writeBankTransactionListStart(self,
+                                      out: IO[str],
+                                      statement: Statement) -> None:
+        out.write("<BANKMSGSRSV1><STMTTRNRS>")
+        self.writeText(out, "TRNUID", "0")
+        out.write("<STATUS>")
+        self.writeText(out, "CODE", "0")
+        self.writeText(out, "SEVERITY", "INFO")
+        out.write("</STATUS><STMTRS>")
+        self.writeText(out, "CURDEF", statement.currency)
+        out.write("<BANKACCTFROM>")
+        self.writeText(out, "BANKID", statement.bank_id, False)
+        self.writeText(out, "ACCTID", statement.account_id, False)
+        self.writeText(out, "ACCTTYPE", statement.account_type)
+        out.write("</BANKACCTFROM><BANKTRANLIST>")
+        self.writeDate(out, "DTSTART", statement.start_date, False)
+        self.writeDate(out, "DTEND", statement.end_date, False)
+
+    def writeBankTransactionListEnd(self,
+                                    out: IO[str],
+                                    statement: Statement) -> None:
+        out.write("</BANKTRANLIST><LEDGERBAL>")
+        self.writeAmount(out, "BALAMT", statement.end_balance, False)
+        self.writeDateTime(out, "DTASOF", statement.end_date, False)
+        out.write("</LEDGERBAL></STMTRS></STMTTRNRS></BANKMSGSRSV1>")
+
+    def writeBankTransaction(self, out: IO[str], line: StatementLine) -> None:
+        out.write("<STMTTRN>")
+        self.writeText(out, "TRNTYPE", line.trntype)
+        self.writeDate(out, "DTPOSTED", line.date)
+        self.writeDate(out, "DTUSER", line.date_user)
+        self.writeAmount(out, "TRNAMT", line.amount)
+        self.writeText(out, "FITID", line.id)
+        self.writeText(out, "CHECKNUM", line.check_no)
+        self.writeText(out, "REFNUM", line.refnum)
+        self.writeText(out, "NAME", line.payee)
+        if line.bank_account_to:
+            out.write("<BANKACCTTO>")
+            self.writeBankAccount(out, line.bank_account_to)
+            out.write("</BANKACCTTO>")
+        self.writeText(out, "MEMO", line.memo)
+        if line.currency is not None:
+            self.writeCurrency(out, "CURRENCY", line.currency)
+        if line.orig_currency is not None:
+            self.writeCurrency(out, "ORIG_CURRENCY", line.orig_currency)
+        out.write("</STMTTRN>")
+
+    def writeCurrency(self,
+                      out: IO[str],
+                      tag: str,
+                      currency: Currency) -> None:
+        out.write("<{}>".format(tag))
+        self.writeText(out, "CURSYM", currency.symbol)
+        self.writeAmount(out, "CURRATE", currency.rate)
+        out.write("</{}>".format(tag))
+
+    def writeBankAccount(self, out: IO[str], account: BankAccount) -> None:
+        self.writeText(out, "BANKID", account.bank_id)
+        self.writeText(out, "BRANCHID", account.branch_id)
+        self.writeText(out, "ACCTID", account.acct_id)
+        self.writeText(out, "ACCTTYPE", account.acct_type)
+        self.writeText(out, "ACCTKEY", account.acct_key)
+
+    def writeText(self,
+                  out: IO[str],
+                  tag: str,
+                  text: Any,
+                  skipEmpty: bool = True) -> None:
+        if not text and skipEmpty:
+            return
+        if text:
+            out.write("<{0}>{1}</{0}>".format(tag, escape(str(text))))
+        else:
+            # what ElementTree writes for an element without text
+            out.write("<{} />".format(tag))
+
+    def writeDate(self,
+                  out: IO[str],
+                  tag: str,
+                  dt: Optional[Union[date, datetime]],
+                  skipEmpty: bool = True) -> None:
+        if not dt and skipEmpty:
+            return
+        self.writeText(out,
+                       tag,
+                       "" if dt is None else dt.strftime("%Y%m%d"),
+                       skipEmpty)
+
+    def writeDateTime(self,
+                      out: IO[str],
+                      tag: str,
+                      dt: Optional[datetime],
+                      skipEmpty: bool = True) -> None:
+        if not dt and skipEmpty:
+            return
+        self.writeText(out,
+                       tag,
+                       "" if dt is None else dt.strftime("%Y%m%d%H%M%S"),
+                       skipEmpty)
+
+    def writeAmount(self,
+                    out: IO[str],
+                    tag: str,
+                    amount: Optional[Decimal],
+                    skipEmpty: bool = True) -> None:
+        if amount is None and skipEmpty:
+            return
+        self.writeText(out,
+                       tag,
+                       "" if amount is None else
+                       "{0:.{precision}f}".format(
+                           amount, precision=self.default_float_precision),
+                       skipEmpty)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union, \
+    TYPE_CHECKING
+
+from datetime import datetime
+from decimal import Decimal
+from operator import itemgetter
+
+from ofxstatement.parser import StatementParser as BaseStatementParser
+from ofxstatement.parser import CsvStatementParser as BaseCsvStatementParser
+from ofxstatement.statement import StatementLine as BaseStatementLine
+
+from ofxstatement.plugins.nl import amounts, dates
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.stats import Stats
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ofxstatement.plugins.nl.chunks import Chunks
+    from ofxstatement.plugins.nl.dateindex import DateRange
+    from ofxstatement.plugins.nl.watermark import Watermark
+
+
+class StatementParser(BaseStatementParser):  # type: ignore
+    """Statement parser that can stream its statement lines.
+
+    iter_lines() yields every statement line as soon as it is parsed and
+    sets the statement headers (dates and balances) by calling
+    finish_statement() when all records are parsed. The statement keeps
+    track of the bounds of the lines, not of the lines themselves.
+
+    parse() just collects the lines of iter_lines() in the statement.
+    """
+
+    statement: Statement
+    # set by stats.instrument()
+    stats: Optional[Stats] = None
+    # set by watermark.apply_watermark()
+    watermark: Optional['Watermark'] = None
+    # only the records of these dates (set by the plugin, see dateindex.py)
+    date_range: Optional['DateRange'] = None
+
+    def parse(self) -> Statement:
+        """Read and parse statement
+
+        Return Statement object
+
+        May raise exceptions.ParseException on malformed input.
+        """
+        for stmt_line in self.iter_lines():
+            self.statement.lines.append(stmt_line)
+        return self.statement
+
+    def iter_lines(self) -> Iterator[StatementLine]:
+        """Read and parse statement, yielding the statement lines.
+
+        The statement headers (self.statement) are complete when the
+        iteration is done.
+
+        May raise exceptions.ParseException on malformed input.
+        """
+        assert hasattr(self, "statement"), \
+            "StatementParser.__init__() not called"
+
+        for stmt_line in self.iter_records():
+            self.statement.update_bounds(stmt_line)
+            yield stmt_line
+
+        self.finish_statement()
+
+    def iter_records(self) -> Iterator[StatementLine]:
+        """Parse the records of split_records(), yielding the valid
+        statement lines, without updating the statement bounds.
+        """
+        in_date_range = None if self.date_range is None else self.in_date_range
+        for line in self.split_records():
+            self.cur_record += 1
+            if not line:
+                continue
+            if in_date_range is not None and not in_date_range(line):
+                continue
+            stmt_line = self.parse_record(line)
+            if stmt_line:
+                self.assert_valid(stmt_line)
+                yield stmt_line
+
+    def parse_record(self, line: Any) -> Optional[StatementLine]:
+        """Parse a record of split_records() and return its statement line
+        (None when the record is no statement line).
+        """
+        raise NotImplementedError
+
+    def in_date_range(self, line: Any) -> bool:
+        """Whether a record is not left out by the date range (checked
+        before it is parsed).
+        """
+        return True
+
+    def parse_datetime(self, value: str) -> datetime:
+        """Same as ofxstatement but faster (see dates.parse_datetime()).
+        """
+        return dates.parse_datetime(value, self.date_format)
+
+    def assert_valid(self, stmt_line: StatementLine) -> None:
+        """Validate a statement line.
+        """
+        stmt_line.assert_valid()
+
+    def finish_statement(self) -> None:
+        """Set the statement headers when all records have been parsed.
+        """
+        pass
+
+
+class CsvStatementParser(BaseCsvStatementParser, StatementParser):
+    """Generic csv statement parser"""
+
+    # the compiled mappings (set by the parser or on first use, see
+    # compile_mappings())
+    row_to_line: Callable[[List[str]], StatementLine]
+    # parse the file in chunks by parallel processes (set by the plugin)
+    chunks: Optional['Chunks'] = None
+
+    def iter_lines(self) -> Iterator[StatementLine]:
+        """Same as StatementParser.iter_lines() but in chunks by parallel
+        processes when the plugin set chunks (see chunks.py).
+        """
+        if self.chunks is None:
+            return super().iter_lines()
+        return self.chunks.iter_lines(self)
+
+    def in_date_range(self, line: List[str]) -> bool:
+        """Whether the raw value of the date column of a record is in the
+        date range (see dates.date_key()). A record without a date there,
+        like a header, is always in it.
+        """
+        assert self.date_range is not None
+        column = self.mappings.get('date')
+        if column is None or column >= len(line):
+            return True
+        key = dates.date_key(line[column])
+        return key is None or key in self.date_range
+
+    def chunk_state(self) -> Any:
+        """Return what the parser of the whole file needs to know about the
+        statement of a chunk besides its lines (see merge_chunk_state()).
+        """
+        return None
+
+    def merge_chunk_state(self, state: Any) -> None:
+        """Take over the chunk_state() of the parser of the next chunk.
+        """
+        pass
+
+    def parse_record(self, line: List[str]) -> Optional[StatementLine]:
+        """Parse given transaction line and return StatementLine object
+
+        Same as ofxstatement.parser.CsvStatementParser.parse_record() but it
+        creates the (compact) StatementLine of this package using the
+        mappings compiled on first use.
+        """
+        if not hasattr(self, 'row_to_line'):
+            self.row_to_line = self.compile_mappings(self.mappings)
+        return self.row_to_line(line)
+
+    def get_converter(self, field: str) -> Optional[Callable[[str], Any]]:
+        """Return the conversion of parse_value() for field (None when the
+        value is used as is).
+        """
+        tp = BaseStatementLine.__annotations__.get(field)
+        if tp in (datetime, Optional[datetime]):
+            return self.parse_datetime
+        elif tp in (Decimal, Optional[Decimal]):
+            return self.parse_decimal
+        else:
+            return None
+
+    def parse_amount(self, value: str) -> Union[int, Decimal]:
+        """Return the number of cents of an amount, or the Decimal of
+        parse_decimal() when it has no exact number of cents.
+        """
+        cents = amounts.parse_cents(value)
+        return self.parse_decimal(value) if cents is None else cents
+
+    def compile_mappings(self,
+                         mappings: Dict[str, int],
+                         **derived: Callable[[List[str]], str]) \
+            -> Callable[[List[str]], StatementLine]:
+        """Return a function creating the statement line of a row.
+
+        The function does what parse_record() of ofxstatement does with
+        mappings but the conversion of every field is determined here, once.
+        The value of a field in derived is the result of derived[field](row)
+        instead of row[mappings[field]], so the row itself is never changed.
+        The amount is set in cents (see parse_amount()).
+        """
+        columns: int = max(mappings.values()) + 1 if mappings else 0
+        fields = [(field,
+                   'cents' if field == 'amount' else field,
+                   derived.get(field) or itemgetter(col),
+                   self.parse_amount if field == 'amount'
+                   else self.get_converter(field))
+                  for field, col in mappings.items()]
+
+        def fail(line: List[str]) -> None:
+            # the error the parser raised when it changed the row and then
+            # called ofxstatement's parse_record()
+            values = {field: get(line) for field, get in derived.items()}
+            for field, _, get, convert in fields:
+                col = mappings[field]
+                if col >= len(line):
+                    raise ValueError("Cannot find column %s in line of %s items "
+                                     % (col, len(line)))
+                value = values[field] if field in values else line[col]
+                if convert is not None:
+                    convert(value)
+
+        def row_to_line(line: List[str]) -> StatementLine:
+            if len(line) < columns:
+                fail(line)
+            stmt_line = StatementLine()
+            for _, attr, get, convert in fields:
+                value = get(line)
+                setattr(stmt_line,
+                        attr,
+                        value if convert is None else convert(value))
+            return stmt_line
+
+        return row_to_line
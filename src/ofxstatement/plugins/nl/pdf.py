@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""The text of PDF files, converted by pdftotext (Poppler).
+
+PdfText runs pdftotext -layout and returns its output line by line while
+pdftotext is still running, so the parser overlaps with the conversion
+and the text is never kept in memory as a whole.
+
+With more than one worker the pages are converted in ranges by parallel
+pdftotext -f <first> -l <last> processes (the number of pages is found by
+pdfinfo) and the output of the ranges is returned in page order, exactly
+the text of a single pdftotext. Only pdftotext runs in parallel: the
+parser still reads the text of all pages in one thread.
+
+With a TextCache the text is stored on disk, by the SHA-256 of the PDF,
+the pdftotext version and its options, so converting the same PDF again
+does not run pdftotext.
+"""
+from typing import Any, IO, Iterator, List, Optional, Sequence, Tuple
+
+import io
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+from ofxstatement.plugins.nl.cache import FileCache, cache_home, file_sha256
+from ofxstatement.plugins.nl.detect import PDF_MAGIC, PDF_MAGIC_OFFSET
+
+# the default timeout in seconds of pdftotext
+TIMEOUT = 60.0
+
+
+def is_pdf(filename: str) -> bool:
+    """Is this a PDF file (according to its first bytes)?"""
+    with open(filename, 'rb') as f:
+        return PDF_MAGIC in f.read(PDF_MAGIC_OFFSET + len(PDF_MAGIC))
+
+
+class PdfText:
+    """The lines of text of a PDF file (iterable once).
+
+    Raises subprocess.TimeoutExpired when pdftotext takes more than timeout
+    seconds and subprocess.CalledProcessError when it fails, after the
+    lines it did return.
+    """
+
+    command: Sequence[str] = ('pdftotext', '-layout')
+    info_command: Sequence[str] = ('pdfinfo',)
+    # the number of pages per pdftotext when there are several workers
+    pages_per_chunk: int = 4
+
+    def __init__(self,
+                 filename: str,
+                 timeout: Optional[float] = TIMEOUT,
+                 command: Optional[Sequence[str]] = None,
+                 cache: Optional['TextCache'] = None,
+                 workers: int = 1) -> None:
+        self.filename = filename
+        self.timeout = timeout
+        if command is not None:
+            self.command = command
+        self.cache = cache
+        self.workers = workers
+
+    def args(self,
+             first: Optional[int] = None,
+             last: Optional[int] = None) -> List[str]:
+        pages = [] if first is None else ['-f', str(first), '-l', str(last)]
+        return [*self.command, *pages, self.filename, '-']
+
+    def __iter__(self) -> Iterator[str]:
+        if self.cache is None:
+            yield from self.convert()
+            return
+
+        key = self.cache.key(self.filename, self.command)
+        f = self.cache.open(key, 'r', encoding='utf-8', newline='\n')
+        if f is not None:
+            with f:
+                yield from f
+            return
+
+        with self.cache.writer(key) as out:
+            for line in self.convert():
+                out.write(line)
+                yield line
+
+    def convert(self) -> Iterator[str]:
+        """The lines of pdftotext."""
+        pages = self.page_count() if self.workers > 1 else None
+        if pages is None or pages <= self.pages_per_chunk:
+            yield from self.stream()
+        else:
+            yield from self.convert_pages(pages)
+
+    def page_count(self) -> Optional[int]:
+        """The number of pages according to pdfinfo (None when unknown)."""
+        try:
+            completed = subprocess.run([*self.info_command, self.filename],
+                                       stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL,
+                                       timeout=self.timeout,
+                                       check=True)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        for line in completed.stdout.decode(errors='replace').splitlines():
+            name, _, value = line.partition(':')
+            if name == 'Pages' and value.strip().isdigit():
+                return int(value)
+        return None
+
+    def convert_pages(self, pages: int) -> Iterator[str]:
+        """The lines of pdftotext, converting the pages in parallel."""
+        ranges = [(first, min(first + self.pages_per_chunk - 1, pages))
+                  for first in range(1, pages + 1, self.pages_per_chunk)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.run, first, last)
+                       for first, last in ranges]
+            try:
+                # a range ends with a form feed, not a new line, so its last
+                # line continues in the next range
+                rest = ''
+                for future in futures:
+                    text = rest + future.result().decode('utf-8')
+                    rest = ''
+                    for line in io.StringIO(text):
+                        if line.endswith('\n'):
+                            yield line
+                        else:
+                            rest = line
+                if rest:
+                    yield rest
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run(self, first: int, last: int) -> bytes:
+        """The output of pdftotext for the pages first to last."""
+        return subprocess.run(self.args(first, last),
+                              stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              timeout=self.timeout,
+                              check=True).stdout
+
+    def stream(self) -> Iterator[str]:
+        """The lines of a single pdftotext while it runs."""
+        args = self.args()
+        timed_out = threading.Event()
+        # stderr in a file: a pipe might fill up while stdout is read
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(args,
+                                       stdout=subprocess.PIPE,
+                                       stderr=stderr)
+
+            def kill() -> None:
+                timed_out.set()
+                process.kill()
+
+            timer: Optional[threading.Timer] = None
+            if self.timeout is not None:
+                timer = threading.Timer(self.timeout, kill)
+                timer.daemon = True
+                timer.start()
+            try:
+                assert process.stdout is not None
+                # the lines like io.StringIO(output.decode()) returns them
+                with io.TextIOWrapper(process.stdout,
+                                      encoding='utf-8',
+                                      newline='\n') as stdout:
+                    yield from stdout
+                returncode = process.wait()
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                if process.poll() is None:
+                    # stopped before the end
+                    process.kill()
+                    process.wait()
+
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(args,
+                                                self.timeout,  # type: ignore
+                                                stderr=_read(stderr))
+            if returncode:
+                raise subprocess.CalledProcessError(returncode,
+                                                    args,
+                                                    stderr=_read(stderr))
+
+
+def _read(f: IO[bytes]) -> bytes:
+    f.seek(0)
+    return f.read()
+
+
+@lru_cache(maxsize=None)
+def pdftotext_version(command: Tuple[str, ...]) -> str:
+    """The version (banner) of pdftotext, which writes it on stderr."""
+    completed = subprocess.run([command[0], '-v'],
+                               stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               timeout=TIMEOUT)
+    return completed.stdout.decode(errors='replace').strip()
+
+
+class TextCache(FileCache):
+    """Directory with the text of PDF files (see FileCache).
+
+    The file name is the SHA-256 of the contents of the PDF, the version of
+    pdftotext and its options.
+    """
+
+    suffix = '.txt'
+
+    def key(self, filename: str, command: Sequence[str]) -> str:
+        return file_sha256(filename, pdftotext_version(tuple(command)), *command[1:])
+
+    @contextmanager
+    def writer(self, key: str, mode: str = 'w', **kwargs: Any) -> Iterator[IO[str]]:
+        """A text file that is stored for key when the block finishes
+        without exception.
+        """
+        with super().writer(key, mode, encoding='utf-8', newline='\n') as out:
+            yield out
+
+
+def default_cache_directory() -> str:
+    return os.path.join(cache_home(), 'pdftotext')
+
+
+@lru_cache(maxsize=None)
+def get_cache(directory: str, max_size: int, max_age: float) -> TextCache:
+    """The cache of a directory (one per process, so the counters add up)."""
+    return TextCache(directory, max_size, max_age)
+
+
+def get_text_cache(settings: Optional[Any] = None) -> Optional[TextCache]:
+    """The text cache of the plugin settings:
+
+    - pdftotext_cache: 1 (or yes, true, on) for the default directory
+      ($XDG_CACHE_HOME/ofxstatement-dutch/pdftotext), a directory or
+      nothing (the default) for no cache;
+    - pdftotext_cache_size: the maximum size in MB (default 100);
+    - pdftotext_cache_days: the number of days a text is kept without
+      being used (default 30).
+
+    >>> get_text_cache({'pdftotext_cache': 'off'})
+    >>> get_text_cache({'pdftotext_cache': '/tmp/x', 'pdftotext_cache_size': '1'}).max_size
+    1048576
+    """
+    settings = settings or {}
+    value = str(settings.get('pdftotext_cache') or '').strip()
+    if value.lower() in ['', '0', 'no', 'false', 'off']:
+        return None
+    directory = default_cache_directory() \
+        if value.lower() in ['1', 'yes', 'true', 'on'] \
+        else os.path.expanduser(value)
+    max_size = float(settings.get('pdftotext_cache_size') or 100)
+    max_age = float(settings.get('pdftotext_cache_days') or 30)
+    return get_cache(directory,
+                     int(max_size * 1024 * 1024),
+                     max_age * 24 * 60 * 60)
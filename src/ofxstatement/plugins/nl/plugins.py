@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""The plugins of this package (the entry points in setup.py).
+
+Loading a plugin (ofxstatement list-plugins, every conversion) must be
+cheap, so this module only depends on ofxstatement.plugin. The parser
+modules and their dependencies are imported by get_parser().
+
+For backwards compatibility each parser module exports its plugin as
+Plugin, e.g. ofxstatement.plugins.nl.ing.Plugin.
+"""
+from typing import Any, Iterable, Optional, Tuple, TypeVar, TYPE_CHECKING
+
+from ofxstatement.plugin import Plugin as BasePlugin
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ofxstatement.plugins.nl import asn, degiro, icscards, ing, knab
+
+# a parser (changed in place by chunked() and date_ranged())
+P = TypeVar('P', bound=Any)
+
+
+def chunked(parser: P, plugin: BasePlugin, filename: Any) -> P:
+    """Let the parser parse the file in chunks by the number of processes
+    of the setting workers (see chunks.py).
+    """
+    from ofxstatement.plugins.nl.chunks import Chunks, get_workers
+
+    workers = get_workers(plugin.settings.get('workers')
+                          if plugin.settings else None)
+    if workers > 1 and isinstance(filename, str):
+        parser.chunks = Chunks(type(plugin), dict(plugin.settings), filename,
+                               workers)
+    return parser
+
+
+def date_ranged(parser: P, plugin: BasePlugin) -> P:
+    """Let the parser leave out the records outside the dates of the
+    settings since and until (see dateindex.py).
+    """
+    from ofxstatement.plugins.nl.dateindex import get_date_range
+
+    parser.date_range = get_date_range(plugin.settings)
+    return parser
+
+
+def open_indexed(plugin: BasePlugin, f: Any, encoding: str) -> Tuple[Any, bool]:
+    """The file f opened, just its header and the records of the date range
+    when it has a date index (see dateindex.py), and whether that is so.
+    """
+    from ofxstatement.plugins.nl.dateindex import open_range
+
+    fin = open_range(f, encoding, plugin.settings)
+    if fin is not None:
+        return fin, True
+    return (open(f, "r", encoding=encoding) if isinstance(f, str) else f), False
+
+
+class DegiroPlugin(BasePlugin):
+    """DEGIRO trader platform, The Netherlands, CSV (https://www.degiro.nl/)
+    """
+    def get_parser(self, f: str) -> 'degiro.Parser':
+        from ofxstatement.plugins.nl.degiro import Parser
+        from ofxstatement.plugins.nl.stats import instrument
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        try:
+            account_id = self.settings['account_id']
+        except Exception:
+            raise RuntimeError("""
+Please define an 'account_id' in the ofxstatement configuration.
+
+Run
+
+$ ofxstatement edit-config
+
+for more information.
+""")
+        fin, ranged = open_indexed(self, f, "ISO-8859-1")
+        parser = date_ranged(Parser(fin, account_id), self)
+        if not ranged:
+            parser = chunked(parser, self, f)
+        return apply_watermark(instrument(parser, self.settings), self.settings)
+
+
+class IcsCardsPlugin(BasePlugin):
+    """ICSCards, The Netherlands, PDF (https://icscards.nl/)
+    """
+
+    def get_file_object_parser(self, fh: Iterable[str]) -> 'icscards.Parser':
+        from ofxstatement.plugins.nl.icscards import Parser
+        from ofxstatement.plugins.nl.stats import instrument
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        return apply_watermark(
+            instrument(date_ranged(Parser(fh), self), self.settings),
+            self.settings)
+
+    def get_parser(self, filename: str) -> 'icscards.Parser':
+        from ofxstatement.plugins.nl.chunks import get_workers
+        from ofxstatement.plugins.nl.pdf import PdfText, TIMEOUT, is_pdf, \
+            get_text_cache
+
+        fh: Iterable[str]
+
+        # Is it a PDF or an already converted file?
+        if is_pdf(filename):
+            # the text is parsed while pdftotext converts the PDF
+            timeout = self.settings.get('pdftotext_timeout') \
+                if self.settings else None
+            workers = self.settings.get('pdftotext_workers') \
+                if self.settings else None
+            fh = PdfText(filename,
+                         TIMEOUT if timeout is None else float(timeout),
+                         cache=get_text_cache(self.settings),
+                         workers=get_workers(workers))
+        else:
+            fh = open(filename, "r")
+
+        return self.get_file_object_parser(fh)
+
+
+class IngPlugin(BasePlugin):
+    """ING Bank, The Netherlands, CSV (https://www.ing.nl/)
+    """
+    def get_parser(self, filename: str) -> 'ing.Parser':
+        import re
+        from ofxstatement.plugins.nl.ing import Parser
+        from ofxstatement.plugins.nl.stats import instrument
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        p = re.compile('(NL\\d+INGB\\d+)')
+        m = p.search(filename)
+        account_id: Optional[str] = None
+        if m:
+            account_id = m.group(0)
+        fin, ranged = open_indexed(self, filename, "ISO-8859-1")
+        parser = date_ranged(Parser(fin, account_id), self)
+        if not ranged:
+            parser = chunked(parser, self, filename)
+        return apply_watermark(instrument(parser, self.settings), self.settings)
+
+
+class KnabPlugin(BasePlugin):
+    """KNAB Online Bank, The Netherlands, CSV (https://www.knab.nl/)
+    """
+    def get_parser(self, f: str) -> 'knab.Parser':
+        from ofxstatement.plugins.nl.knab import Parser
+        from ofxstatement.plugins.nl.stats import instrument
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        fin = open(f, "r", encoding="ISO-8859-1") if isinstance(f, str) else f
+        return apply_watermark(
+            instrument(date_ranged(Parser(fin), self), self.settings),
+            self.settings)
+
+
+class AsnPlugin(BasePlugin):
+    """ASN Bank, The Netherlands, CSV (https://www.asnbank.nl/)
+    """
+    def get_parser(self, filename: str) -> 'asn.Parser':
+        import re
+        from ofxstatement.plugins.nl.asn import Parser
+        from ofxstatement.plugins.nl.stats import instrument
+        from ofxstatement.plugins.nl.watermark import apply_watermark
+
+        p = re.compile('transactie-historie_(NL\\d+ASNB\\d+)_\\d+\\.csv')
+        m = p.search(filename)
+        account_id: Optional[str] = None
+        if m:
+            account_id = m.group(1)
+        fin = open(filename, "r")  # , encoding="ISO-8859-1")
+        return apply_watermark(
+            instrument(date_ranged(Parser(fin, account_id), self), self.settings),
+            self.settings)
@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
-import re
-from typing import Set, Union
+from typing import Any, Dict, Optional, Tuple, Type, Union
+import sys
 
 from ofxstatement.statement import StatementLine as BaseStatementLine
 from ofxstatement.statement import Statement as BaseStatement
+from ofxstatement.statement import BankAccount
 from ofxstatement.exceptions import ValidationError
-from ofxstatement.statement import generate_unique_transaction_id
+from ofxstatement.statement import generate_transaction_id
 from datetime import datetime, date
+from decimal import Decimal
+from math import isclose
+from operator import attrgetter
+from pprint import pformat
 import logging
 
+from ofxstatement.plugins.nl.amounts import to_decimal
+
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -19,25 +26,118 @@ def _to_date(d_t: Union[date, datetime]) -> date:
 
 
 class Statement(BaseStatement):
+    """Statement that keeps track of the bounds of its lines.
+
+    Lines are added with add_line() which maintains the number of lines,
+    their total amount, their smallest and largest date and the first and
+    last line, so assert_valid() does not need to walk the lines again.
+
+    When the lines are streamed (see StatementParser.iter_lines()) only the
+    bounds are updated (update_bounds()) and the lines are not kept.
+    """
+
+    line_count: int
+    # the total amount of the lines is total_cents plus total_rest (the sum
+    # of the amounts without an exact number of cents)
+    total_cents: int
+    total_rest: Decimal
+    min_date: Optional[Union[date, datetime]]
+    max_date: Optional[Union[date, datetime]]
+    first_line: Optional[BaseStatementLine]
+    last_line: Optional[BaseStatementLine]
+
+    def __init__(self,
+                 bank_id: Optional[str] = None,
+                 account_id: Optional[str] = None,
+                 currency: Optional[str] = None,
+                 account_type: str = "CHECKING") -> None:
+        super().__init__(bank_id=bank_id,
+                         account_id=account_id,
+                         currency=currency,
+                         account_type=account_type)
+        self.clear_lines()
+
+    def clear_lines(self) -> None:
+        self.lines = []
+        self.line_count = 0
+        self.total_cents = 0
+        self.total_rest = Decimal(0)
+        self._has_cents = False
+        self.min_date = self.max_date = None
+        self.first_line = self.last_line = None
+
+    def add_line(self, stmt_line: BaseStatementLine) -> None:
+        self.update_bounds(stmt_line)
+        self.lines.append(stmt_line)
+
+    def update_bounds(self, stmt_line: BaseStatementLine) -> None:
+        if self.first_line is None:
+            self.first_line = stmt_line
+        self.last_line = stmt_line
+        self.line_count += 1
+        cents = stmt_line.cents if isinstance(stmt_line, StatementLine) else None
+        if cents is not None:
+            self.total_cents += cents
+            self._has_cents = True
+        elif stmt_line.amount is not None:
+            self.total_rest += stmt_line.amount
+        if stmt_line.date is not None:
+            if self.min_date is None or stmt_line.date < self.min_date:
+                self.min_date = stmt_line.date
+            if self.max_date is None or stmt_line.date > self.max_date:
+                self.max_date = stmt_line.date
+
+    def merge_bounds(self, other: 'Statement') -> None:
+        """Update the bounds with the lines of other, which follow the lines
+        of this statement.
+        """
+        if other.first_line is None:
+            return
+        if self.first_line is None:
+            self.first_line = other.first_line
+        self.last_line = other.last_line
+        self.line_count += other.line_count
+        self.total_cents += other.total_cents
+        self.total_rest += other.total_rest
+        self._has_cents = self._has_cents or other._has_cents
+        for d in [other.min_date, other.max_date]:
+            if d is not None:
+                if self.min_date is None or d < self.min_date:
+                    self.min_date = d
+                if self.max_date is None or d > self.max_date:
+                    self.max_date = d
+
+    @property
+    def total_amount(self) -> Decimal:
+        if self._has_cents:
+            return to_decimal(self.total_cents) + self.total_rest
+        return self.total_rest
+
     def assert_valid(self) -> None:
 
         logger.debug("self: type: %s; contents: %s", type(self), self)
         try:
-            super().assert_valid()
-            dates = [sl.date for sl in self.lines if sl.date is not None]
+            # BaseStatement.assert_valid() without summing the lines again
+            if not (self.start_balance is None or self.end_balance is None):
+                assert isclose(self.start_balance + self.total_amount,
+                               self.end_balance), \
+                    "Start balance ({0}) plus the total amount ({1}) \
+should be equal to the end balance ({2})".format(self.start_balance,
+                                                 self.total_amount,
+                                                 self.end_balance)
             # An ING CSV may be a balance file resulting in 0 lines
-            if len(dates) == 0:
+            if self.min_date is None or self.max_date is None:
                 return
             assert self.start_date, "The statement start date should be set"
             assert self.end_date, "The statement end date should be set"
             # check self.start_date
-            min_date = _to_date(min(dates))
+            min_date = _to_date(self.min_date)
             start_date = _to_date(self.start_date)
             assert start_date and min_date and start_date <= min_date, \
                 "The statement start date ({}) should at most be the smallest \
 statement line date ({})".format(start_date, min_date)
             # check self.end_date
-            max_date = _to_date(max(dates))
+            max_date = _to_date(self.max_date)
             end_date = _to_date(self.end_date)
             assert end_date and max_date and end_date > max_date, \
                 "The statement end date ({}) should be greater than the \
@@ -46,19 +146,231 @@ largest statement line date ({})".format(end_date, max_date)
             raise ValidationError(str(e), self)
 
 
+class TransactionIdRegistry:
+    """Registry of the generated transaction ids of one statement.
+
+    The ids are identical to the ones returned by
+    ofxstatement.statement.generate_unique_transaction_id(), i.e. the SHA1 of
+    date, memo and amount for the first occurrence and
+    <SHA1><counter>-<counter> for the next ones.
+
+    Instead of probing a growing set of ids, a counter is kept per SHA1 so a
+    duplicate costs one dictionary lookup and the counter is returned as
+    well.
+    """
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = {}
+
+    def register(self, stmt_line: BaseStatementLine) -> Tuple[str, int]:
+        """Return the unique id for this statement line and its counter
+        (0 for the first occurrence of date, memo and amount).
+        """
+        return self.count(generate_transaction_id(stmt_line))
+
+    def count(self, initial_id: str) -> Tuple[str, int]:
+        """Return the unique id for the initial id of a statement line and
+        its counter (see register()).
+        """
+        counter: int = self.counters.get(initial_id, 0)
+        self.counters[initial_id] = counter + 1
+        if counter == 0:
+            return initial_id, 0
+        return "{0}{1}-{1}".format(initial_id, counter), counter
+
+
+def _pack_date(value: Any) -> Any:
+    # Only a naive datetime at midnight can be restored from its ordinal
+    if type(value) is datetime and value.tzinfo is None and \
+       not (value.hour or value.minute or value.second or value.microsecond):
+        return value.toordinal()
+    return value
+
+
+def _unpack_date(value: Any) -> Any:
+    return datetime.fromordinal(value) if type(value) is int else value
+
+
+def _pack_amount(value: Any) -> Any:
+    # Only an amount with two decimals (and not -0.00) can be restored from
+    # its number of cents without changing its string representation (used
+    # in the transaction id)
+    if type(value) is Decimal and value.as_tuple().exponent == -2 and \
+       (value or not value.is_signed()):
+        return int(value.scaleb(2))
+    return value
+
+
+def _unpack_amount(value: Any) -> Any:
+    return to_decimal(value) if type(value) is int else value
+
+
 class StatementLine(BaseStatementLine):
     """Statement line data with an adjust method.
+
+    To keep statements with hundreds of thousands of lines small the line
+    has __slots__ instead of a __dict__, the dates are stored as ordinals,
+    the amount as an integer number of cents and the payee is interned.
+    The properties return the same values as
+    ofxstatement.statement.StatementLine does.
     """
-    def adjust(self, unique_id_set: Set[str]) -> None:
+
+    __slots__ = ('id',
+                 '_date',
+                 'memo',
+                 '_amount',
+                 '_payee',
+                 '_date_user',
+                 'check_no',
+                 'refnum',
+                 'trntype',
+                 'bank_account_to',
+                 'currency',
+                 'orig_currency',
+                 # ASN only
+                 'start_balance')
+
+    _fields = ('id',
+               'date',
+               'memo',
+               'amount',
+               'payee',
+               'date_user',
+               'check_no',
+               'refnum',
+               'trntype',
+               'bank_account_to',
+               'currency',
+               'orig_currency',
+               'start_balance')
+
+    def __init__(self,
+                 id: Optional[str] = None,
+                 date: Optional[datetime] = None,
+                 memo: Optional[str] = None,
+                 amount: Optional[Decimal] = None) -> None:
+        super().__init__(id, date, memo, amount)
+        # class attributes of the base class are hidden by the slots
+        self.trntype = "CHECK"
+        self.bank_account_to = None
+        self.currency = None
+        self.orig_currency = None
+        self.start_balance = None
+
+    def __reduce__(self) -> Any:
+        # The values of the slots: smaller and faster to pickle than the
+        # default (the lines of a chunk parsed by another process).
+        values = _slot_values(self)
+        account = self.bank_account_to
+        if type(account) is BankAccount:
+            # its attributes, which are much faster to unpickle
+            values = values[:9] + (account.__dict__,) + values[10:]
+        return (_restore_line,
+                (type(self),
+                 values,
+                 getattr(self, '__dict__', None) or None,
+                 type(account) is BankAccount))
+
+    def __repr__(self) -> str:  # pragma: no cover
+        values: Dict[str, Any] = {field: getattr(self, field)
+                                  for field in self._fields}
+        values.update(getattr(self, '__dict__', {}))
+        return "<" + type(self).__name__ + "> " + pformat(values, indent=4)
+
+    @property
+    def date(self) -> Optional[datetime]:
+        return _unpack_date(self._date)
+
+    @date.setter
+    def date(self, value: Optional[datetime]) -> None:
+        self._date = _pack_date(value)
+
+    @property
+    def date_user(self) -> Optional[datetime]:
+        return _unpack_date(self._date_user)
+
+    @date_user.setter
+    def date_user(self, value: Optional[datetime]) -> None:
+        self._date_user = _pack_date(value)
+
+    @property
+    def amount(self) -> Optional[Decimal]:
+        return _unpack_amount(self._amount)
+
+    @amount.setter
+    def amount(self, value: Optional[Decimal]) -> None:
+        self._amount = _pack_amount(value)
+
+    @property
+    def cents(self) -> Optional[int]:
+        """The amount as an integer number of cents (None when there is no
+        amount or it has no exact number of cents).
+        """
+        value = self._amount
+        return value if type(value) is int else None
+
+    @cents.setter
+    def cents(self, value: Union[int, Decimal]) -> None:
+        # a Decimal is an amount without exact number of cents
+        self._amount = value if type(value) is int else _pack_amount(value)
+
+    @property
+    def amount_sign(self) -> Optional[int]:
+        """The sign (-1, 0 or 1) of the amount (None without amount), without
+        creating a Decimal.
+        """
+        value = self._amount
+        if value is None:
+            return None
+        return int(value > 0) - int(value < 0)
+
+    @property
+    def payee(self) -> Optional[str]:
+        return self._payee
+
+    @payee.setter
+    def payee(self, value: Optional[str]) -> None:
+        self._payee = sys.intern(value) if type(value) is str else value
+
+    def adjust(self, unique_ids: TransactionIdRegistry) -> None:
         if self.id:
             return
 
-        self.id = \
-            generate_unique_transaction_id(self, unique_id_set)
-        m = re.match(r'([0-9a-f]+)(-\d+)?$', self.id)
-        assert m, "Id should match hexadecimal digits, \
-optionally followed by a minus and a counter: '{}'".format(self.id)
-        if m.group(2):
-            counter = int(m.group(2)[1:])
+        self.id, counter = unique_ids.register(self)
+        if counter:
             # include counter so the memo gets unique
             self.memo = self.memo + ' #' + str(counter + 1)  # type: ignore
+
+
+_slot_values = attrgetter(*StatementLine.__slots__)
+
+
+def _restore_line(cls: Type[StatementLine],
+                  values: Tuple[Any, ...],
+                  attributes: Optional[Dict[str, Any]],
+                  bank_account: bool = False) -> StatementLine:
+    stmt_line: StatementLine = cls.__new__(cls)
+    # in the order of __slots__ (much faster than setattr() per slot)
+    (stmt_line.id,
+     stmt_line._date,
+     stmt_line.memo,
+     stmt_line._amount,
+     stmt_line._payee,
+     stmt_line._date_user,
+     stmt_line.check_no,
+     stmt_line.refnum,
+     stmt_line.trntype,
+     stmt_line.bank_account_to,
+     stmt_line.currency,
+     stmt_line.orig_currency,
+     stmt_line.start_balance) = values
+    if bank_account:
+        account = BankAccount.__new__(BankAccount)
+        account.__dict__.update(values[9])
+        stmt_line.bank_account_to = account
+    if type(stmt_line._payee) is str:
+        # interned again in this process
+        stmt_line._payee = sys.intern(stmt_line._payee)
+    if attributes:
+        stmt_line.__dict__.update(attributes)
+    return stmt_line
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Opt-in timing of the phases of a conversion.
+
+Instrumentation is enabled by the plugin setting stats or else by the
+environment variable OFXSTATEMENT_DUTCH_STATS:
+
+- 1 (or yes, true, on): collect the statistics in parser.stats;
+- json: the same and print them as JSON on stderr when the program exits.
+
+When disabled, instrument() returns the parser untouched so there is no
+overhead at all.
+
+The phases are: read (reading the input file), sniff (ING dialect),
+split_records, parse_record, adjust (unique transaction ids),
+assert_valid, finish_statement and write (StreamingOfxWriter). The time of
+a phase excludes the time of the phases it calls, so the phase times add
+up to the total time.
+"""
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, \
+    Optional, TypeVar
+
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENV_VAR = 'OFXSTATEMENT_DUTCH_STATS'
+
+T = TypeVar('T')
+# a parser (instrumented in place)
+P = TypeVar('P', bound=Any)
+
+PHASES = ['read',
+          'sniff',
+          'split_records',
+          'parse_record',
+          'adjust',
+          'assert_valid',
+          'finish_statement',
+          'write']
+
+
+class PhaseStats:
+    """Cumulative wall time, CPU time and number of calls of a phase"""
+
+    wall: float
+    cpu: float
+    calls: int
+
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'wall': self.wall, 'cpu': self.cpu, 'calls': self.calls}
+
+
+class Stats:
+    """The statistics of all phases.
+
+    >>> stats = Stats()
+    >>> double = stats.wrap('parse_record', lambda x: 2 * x)
+    >>> double(21)
+    42
+    >>> stats.phases['parse_record'].calls
+    1
+    """
+
+    phases: Dict[str, PhaseStats]
+
+    def __init__(self) -> None:
+        self.phases = {phase: PhaseStats() for phase in PHASES}
+        # the active phases with the clocks at their (re)start
+        self._stack: List[List[Any]] = []
+
+    def _charge(self, wall: float, cpu: float) -> None:
+        top = self._stack[-1]
+        phase = self.phases[top[0]]
+        phase.wall += wall - top[1]
+        phase.cpu += cpu - top[2]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._stack:
+            self._charge(wall, cpu)
+        self.phases[name].calls += 1
+        self._stack.append([name, wall, cpu])
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter(), time.process_time()
+            self._charge(wall, cpu)
+            self._stack.pop()
+            if self._stack:
+                # resume the calling phase
+                self._stack[-1][1:] = [wall, cpu]
+
+    def wrap(self, name: str, func: Callable[..., T]) -> Callable[..., T]:
+        """Return func timed as phase name."""
+        def timed(*args: Any, **kwargs: Any) -> T:
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def wrap_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Return an iterator over iterable with every next() timed as phase
+        name."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: phase.as_dict()
+                for name, phase in self.phases.items() if phase.calls}
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def dump(self) -> None:
+        print(self.to_json(), file=sys.stderr)
+
+
+class TimedFile:
+    """File object proxy timing the reads as phase read"""
+
+    _iterator: Iterator[str]
+
+    def __init__(self, fin: IO[str], stats: Stats) -> None:
+        self._fin = fin
+        self._stats = stats
+
+    def read(self, *args: Any) -> str:
+        with self._stats.phase('read'):
+            return self._fin.read(*args)
+
+    def readline(self, *args: Any) -> str:
+        with self._stats.phase('read'):
+            return self._fin.readline(*args)
+
+    def __iter__(self) -> 'TimedFile':
+        self._iterator = iter(self._fin)
+        return self
+
+    def __next__(self) -> str:
+        with self._stats.phase('read'):
+            return next(self._iterator)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fin, name)
+
+
+def get_mode(settings: Optional[Any] = None) -> Optional[str]:
+    """Return None (disabled), 'on' or 'json'.
+
+    >>> get_mode({'stats': 'json'})
+    'json'
+    >>> get_mode({'stats': 'no'})
+    """
+    value = settings.get('stats') if settings else None
+    if value is None:
+        value = os.environ.get(ENV_VAR)
+    value = str(value or '').strip().lower()
+    if value in ['', '0', 'no', 'false', 'off']:
+        return None
+    return 'json' if value == 'json' else 'on'
+
+
+def instrument(parser: P, settings: Optional[Any] = None) -> P:
+    """Instrument the parser when the statistics are enabled and return it.
+
+    The statistics are available as parser.stats.
+    """
+    mode = get_mode(settings)
+    if mode is None:
+        return parser
+
+    stats = Stats()
+    parser.stats = stats
+    split_records = parser.split_records
+
+    parser.fin = TimedFile(parser.fin, stats)
+    parser.split_records = \
+        lambda: stats.wrap_iter('split_records',
+                                stats.wrap('split_records', split_records)())
+    for name in ['parse_record', 'assert_valid', 'finish_statement']:
+        setattr(parser, name, stats.wrap(name, getattr(parser, name)))
+    if hasattr(parser, 'sniff'):
+        parser.sniff = stats.wrap('sniff', parser.sniff)
+    if hasattr(parser, 'unique_ids'):
+        parser.unique_ids.register = \
+            stats.wrap('adjust', parser.unique_ids.register)
+    parser.statement.assert_valid = \
+        stats.wrap('assert_valid', parser.statement.assert_valid)
+
+    if mode == 'json':
+        atexit.register(stats.dump)
+    return parser
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Incremental conversion: leave out the transactions already converted.
+
+Banks export the last months every time, so consecutive exports of an
+account overlap. With the plugin setting watermark the ids of the
+transactions converted are recorded per account (Statement.account_id) in
+an SQLite database and a transaction whose id was recorded before is left
+out of the next conversions:
+
+- 1 (or yes, true, on): the database
+  $XDG_STATE_HOME/ofxstatement-dutch/watermark.sqlite;
+- a file name: that database.
+
+Every account has a Bloom filter of its ids (stored in the database as
+well), so the id of a new transaction is nearly always known to be new
+without querying the table of ids.
+
+The statement itself (dates, balances, validation) still covers all the
+transactions of the file. The ids are only recorded by commit_watermark()
+once the output of the conversion is durable (the OFX file in place, the
+ledger transaction committed), so a conversion that fails while writing
+leaves out nothing the next time.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, \
+    TypeVar
+
+import hashlib
+import math
+import os
+import sqlite3
+
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emitted (
+    account_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (account_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bloom (
+    account_id TEXT PRIMARY KEY,
+    capacity INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    bits BLOB NOT NULL
+);
+"""
+
+# a parser (changed in place, see apply_watermark())
+P = TypeVar('P', bound=Any)
+
+# the smallest capacity of a Bloom filter (a filter is rebuilt with twice
+# the capacity when it is full)
+MIN_CAPACITY = 1024
+
+
+def state_home() -> str:
+    """The state directory of this package ($XDG_STATE_HOME or
+    ~/.local/state)."""
+    home = os.environ.get('XDG_STATE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.local', 'state')
+    return os.path.join(home, 'ofxstatement-dutch')
+
+
+def get_database(settings: Optional[Any] = None) -> Optional[str]:
+    """The database of the setting watermark (None when disabled).
+
+    >>> get_database({'watermark': 'no'})
+    >>> get_database({'watermark': '/tmp/watermark.sqlite'})
+    '/tmp/watermark.sqlite'
+    """
+    value = str((settings.get('watermark') if settings else None) or '').strip()
+    if value.lower() in ['', '0', 'no', 'false', 'off']:
+        return None
+    if value.lower() in ['1', 'yes', 'true', 'on']:
+        return os.path.join(state_home(), 'watermark.sqlite')
+    return os.path.expanduser(value)
+
+
+class BloomFilter:
+    """Set of strings that may answer that a string it does not contain is
+    in it (with a probability of error_rate up to capacity strings), but
+    never the reverse.
+
+    >>> bloom = BloomFilter(100)
+    >>> bloom.add('20200101.1')
+    >>> '20200101.1' in bloom, '20200101.2' in bloom
+    (True, False)
+    """
+
+    def __init__(self,
+                 capacity: int,
+                 error_rate: float = 0.01,
+                 bits: Optional[bytes] = None) -> None:
+        self.capacity = capacity
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.bits = bytearray(bits) if bits is not None \
+            else bytearray((size + 7) // 8)
+        self.size = 8 * len(self.bits)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+
+    def positions(self, key: str) -> Iterator[int]:
+        # double hashing: h1 + i * h2 for the i-th hash function
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        bits = self.bits
+        for position in self.positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for position in self.positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class Watermark:
+    """The ids of the transactions converted per account, in an SQLite
+    database.
+
+    filter() leaves out the statement lines whose id was recorded and
+    keeps the ids of the others, which commit() records. The counters new
+    and known tell how many lines were kept and left out.
+    """
+
+    def __init__(self, filename: str, timeout: float = 30.0) -> None:
+        self.filename = filename
+        self.timeout = timeout
+        self.connection: Optional[sqlite3.Connection] = None
+        self.blooms: Dict[str, BloomFilter] = {}
+        self.pending: List[Tuple[str, str]] = []
+        self.new = 0
+        self.known = 0
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            # the transactions are private
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # transactions are started explicitly (see commit())
+            self.connection = sqlite3.connect(self.filename,
+                                              timeout=self.timeout,
+                                              isolation_level=None)
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.blooms.clear()
+
+    def load_bloom(self, account_id: str) -> Tuple[BloomFilter, int]:
+        """The Bloom filter of an account and the number of its ids."""
+        connection = self.connect()
+        row = connection.execute('SELECT capacity, count, bits FROM bloom '
+                                 'WHERE account_id = ?', (account_id,)).fetchone()
+        if row is not None:
+            capacity, count, bits = row
+            return BloomFilter(capacity, bits=bits), count
+        return self.build_bloom(account_id)
+
+    def build_bloom(self, account_id: str, capacity: int = MIN_CAPACITY) \
+            -> Tuple[BloomFilter, int]:
+        """A Bloom filter of the ids of an account in the table (of at
+        least twice their number) and the number of ids."""
+        ids = [id for id, in self.connect().execute(
+            'SELECT id FROM emitted WHERE account_id = ?', (account_id,))]
+        bloom = BloomFilter(max(capacity, MIN_CAPACITY, 2 * len(ids)))
+        for id in ids:
+            bloom.add(id)
+        return bloom, len(ids)
+
+    def is_new(self, account_id: str, id: str) -> bool:
+        """Whether the id of an account was not recorded."""
+        bloom = self.blooms.get(account_id)
+        if bloom is None:
+            bloom = self.blooms[account_id] = self.load_bloom(account_id)[0]
+        if id not in bloom:
+            return True
+        # known or a false positive
+        return self.connect().execute(
+            'SELECT 1 FROM emitted WHERE account_id = ? AND id = ?',
+            (account_id, id)).fetchone() is None
+
+    def filter(self,
+               statement: Statement,
+               lines: Iterable[StatementLine]) -> Iterator[StatementLine]:
+        """The new lines of a statement (a line without id is new)."""
+        for stmt_line in lines:
+            account_id = statement.account_id or ''
+            if stmt_line.id is None:
+                self.new += 1
+                yield stmt_line
+            elif self.is_new(account_id, stmt_line.id):
+                self.pending.append((account_id, stmt_line.id))
+                self.new += 1
+                yield stmt_line
+            else:
+                self.known += 1
+
+    def commit(self) -> None:
+        """Record the ids of the new lines and update the Bloom filters
+        (in one transaction, since other processes may use the database).
+        """
+        if not self.pending:
+            self.close()
+            return
+        connection = self.connect()
+        per_account: Dict[str, List[str]] = {}
+        for account_id, id in self.pending:
+            per_account.setdefault(account_id, []).append(id)
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for account_id, ids in per_account.items():
+                # the filter as stored by the last (maybe another) process
+                bloom, count = self.load_bloom(account_id)
+                changes = connection.total_changes
+                connection.executemany('INSERT OR IGNORE INTO emitted VALUES (?, ?)',
+                                       [(account_id, id) for id in ids])
+                count += connection.total_changes - changes
+                if count > bloom.capacity:
+                    bloom, count = self.build_bloom(account_id, 2 * bloom.capacity)
+                else:
+                    for id in ids:
+                        bloom.add(id)
+                connection.execute('INSERT OR REPLACE INTO bloom VALUES (?, ?, ?, ?)',
+                                   (account_id, bloom.capacity, count, bytes(bloom.bits)))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self.pending.clear()
+        # the conversion is done
+        self.close()
+
+
+def apply_watermark(parser: P, settings: Optional[Any] = None) -> P:
+    """Let the parser leave out the lines already converted when the
+    setting watermark is enabled and return it.
+
+    The Watermark is available as parser.watermark. The lines are filtered
+    in parser.iter_lines() (and so in parse()); the ids are recorded by
+    commit_watermark().
+    """
+    filename = get_database(settings)
+    if filename is None:
+        return parser
+
+    watermark = Watermark(filename)
+    parser.watermark = watermark
+    iter_lines = parser.iter_lines
+    parser.iter_lines = lambda: watermark.filter(parser.statement, iter_lines())
+    return parser
+
+
+def commit_watermark(parser: Any) -> None:
+    """Record the ids of the lines the watermark of the parser (if any) let
+    through, once their output is durable."""
+    watermark = getattr(parser, 'watermark', None)
+    if watermark is not None:
+        watermark.commit()
@@ -0,0 +1,67 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from ofxstatement.plugins.nl.amounts import parse_cents, parse_dutch_cents, \
+    to_decimal
+from ofxstatement.plugins.nl.icscards import Parser
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+
+
+class ParseCentsTest(TestCase):
+
+    def test_same_as_decimal(self):
+        # what ofxstatement's parse_decimal() does
+        values = ['0,00', '0.00', '-0,01', '12,34', '-1234,56', ' 1 234,56 ',
+                  '1.5', '1,500', '100', '-0,00', '', '-', ',12', '+1,00',
+                  '1_000,00', '１,00']
+        for value in values:
+            cents = parse_cents(value)
+            if cents is None:
+                continue
+            expected = Decimal(value.replace(",", ".").replace(" ", ""))
+            self.assertEqual(str(to_decimal(cents)), str(expected), value)
+
+    def test_not_cents(self):
+        for value in ['1.5', '1,500', '100', '-0,00', '', '1.234,56', '1_000,00']:
+            self.assertIsNone(parse_cents(value), value)
+
+    def test_dutch(self):
+        for value in ['1.827,97', '€ 1.827,97', '€1.827,97', '1,827.97', '1827,97']:
+            self.assertEqual(parse_dutch_cents(value), 182797, value)
+        for value in ['1.827.97', '1,827,97', 'EU R1,00', '12,5', '€']:
+            self.assertIsNone(parse_dutch_cents(value), value)
+
+
+class IcsAmountTest(TestCase):
+
+    def test_get_amount(self):
+        self.assertEqual(str(Parser.get_amount('€ 1.827,97', 'Af')), '-1827.97')
+        self.assertEqual(str(Parser.get_amount('0,00', 'Af')), '-0.00')
+        self.assertEqual(str(Parser.get_amount('1,827.97', 'Bij')), '1827.97')
+
+    def test_get_cents(self):
+        self.assertEqual(Parser.get_cents('€1.827,97', 'Af'), -182797)
+        self.assertEqual(Parser.get_cents('0,99', '  '), 99)
+
+
+class StatementCentsTest(TestCase):
+
+    def test_cents(self):
+        stmt_line = StatementLine()
+        self.assertIsNone(stmt_line.cents)
+        self.assertIsNone(stmt_line.amount_sign)
+        stmt_line.cents = -5
+        self.assertEqual(stmt_line.amount, Decimal('-0.05'))
+        self.assertEqual(stmt_line.amount_sign, -1)
+        stmt_line.cents = Decimal('1.5')
+        self.assertIsNone(stmt_line.cents)
+        self.assertEqual(str(stmt_line.amount), '1.5')
+        self.assertEqual(stmt_line.amount_sign, 1)
+
+    def test_total_amount(self):
+        statement = Statement()
+        self.assertEqual(str(statement.total_amount), '0')
+        for amount in ['1.25', '-0.5', '2.00']:
+            statement.add_line(StatementLine(amount=Decimal(amount)))
+        self.assertEqual(statement.total_cents, 325)
+        self.assertEqual(str(statement.total_amount), '2.75')
@@ -59,6 +59,19 @@ class ParserTest(TestCase):
                          datetime.strptime("28-06-2022",
                                            parser.date_format))
 
+    def test_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'transactie-historie_NL00ASNB9999999999_20220717204133.csv')
+        parser = Plugin(None, None).get_parser(text_filename)
+
+        ids = [sl.id for sl in parser.iter_lines()]
+
+        self.assertEqual(len(ids), 11)
+        self.assertEqual(ids[0], '20220617.51392971')
+        self.assertEqual(len(parser.statement.lines), 0)
+        self.assertEqual(parser.statement.start_balance, Decimal('130.44'))
+        self.assertEqual(parser.statement.end_balance, Decimal('644.24') + Decimal('-560.00'))
+
     @pytest.mark.xfail(raises=ParseError)
     def test_fail(self):
         here = os.path.dirname(__file__)
@@ -0,0 +1,295 @@
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase, mock, skipUnless
+
+from ofxstatement.plugins.nl import batch, icscards, ing, knab
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+HERE = os.path.dirname(__file__)
+
+ING_FILENAME = 'NL99INGB9999999999_25-11-2019_30-05-2020.csv'
+
+
+def samples(name):
+    return os.path.join(HERE, 'samples', name)
+
+
+def without_server_time(ofx):
+    return re.sub('<DTSERVER>[0-9]+</DTSERVER>', '', ofx)
+
+
+class ExitPlugin:
+    """A plugin that kills its process."""
+
+    def __init__(self, ui, settings):
+        pass
+
+    def get_parser(self, filename):
+        os._exit(1)
+
+
+class BatchTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.input_dir = os.path.join(self.directory, 'in')
+        os.mkdir(self.input_dir)
+        for name, target in [(ING_FILENAME, ING_FILENAME),
+                             ('Knab_transactieoverzicht_ok.csv',
+                              'Knab_transactieoverzicht_ok.csv'),
+                             # an ING file that fails
+                             ('ing_fail.csv', 'NL99INGB9999999999_fail.csv'),
+                             # detected by its contents
+                             ('icscards.txt', 'icscards.txt'),
+                             # no plugin
+                             ('empty.csv', 'notes.csv')]:
+            shutil.copy(samples(name), os.path.join(self.input_dir, target))
+
+    def main(self, *args):
+        with self.assertLogs(batch.logger) as cm:
+            status = batch.main(['-c', os.path.join(self.directory, 'none.ini'),
+                                 *args])
+        return status, [record.getMessage() for record in cm.records]
+
+    def expected(self, plugin, name):
+        out = io.StringIO()
+        StreamingOfxWriter(plugin.get_parser(samples(name))).write(out)
+        return without_server_time(out.getvalue())
+
+    def output(self, name):
+        with open(os.path.join(self.directory, 'out', name), newline='') as f:
+            return without_server_time(f.read())
+
+    def check(self, workers):
+        status, messages = self.main('-w', workers,
+                                     '-o', os.path.join(self.directory, 'out'),
+                                     self.input_dir)
+        self.assertEqual(status, 2)
+        summary = messages[-2:]
+        self.assertRegex(summary[0], r'^Converted 3 of 4 files \(\d+ lines\) .*; 1 skipped$')
+        self.assertRegex(summary[1], r'^FAILED .*NL99INGB9999999999_fail.csv: Parse error on line')
+
+        # one OFX per converted input, none for the failure
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, 'out'))),
+                         ['Knab_transactieoverzicht_ok.ofx',
+                          'NL99INGB9999999999_25-11-2019_30-05-2020.ofx',
+                          'icscards.ofx'])
+        self.assertEqual(self.output('NL99INGB9999999999_25-11-2019_30-05-2020.ofx'),
+                         self.expected(ing.Plugin(None, {}), ING_FILENAME))
+        self.assertEqual(self.output('Knab_transactieoverzicht_ok.ofx'),
+                         self.expected(knab.Plugin(None, {}),
+                                       'Knab_transactieoverzicht_ok.csv'))
+        self.assertEqual(self.output('icscards.ofx'),
+                         self.expected(icscards.Plugin(None, {}), 'icscards.txt'))
+
+    def test_serial(self):
+        self.check('1')
+
+    def test_pool(self):
+        self.check('2')
+
+    @skipUnless(multiprocessing.get_start_method() == 'fork',
+                'the workers need the plugin of the test')
+    def test_worker_exits(self):
+        # the other files are still converted
+        output_dir = os.path.join(self.directory, 'out')
+        jobs = [batch.Job(os.path.join(self.input_dir, name),
+                          os.path.join(output_dir, name + '.ofx'), plugin, {})
+                for name, plugin in [(ING_FILENAME, 'nl-ing'),
+                                     ('notes.csv', 'exit'),
+                                     ('Knab_transactieoverzicht_ok.csv', 'nl-knab')]]
+        with mock.patch.dict(batch.PLUGINS, {'exit': ExitPlugin}), \
+                self.assertLogs(batch.logger, 'WARNING'):
+            results = {os.path.basename(result.input): result
+                       for result in batch.run(jobs, 2)}
+        self.assertRegex(results['notes.csv'].error, '^BrokenProcessPool: ')
+        self.assertIsNone(results[ING_FILENAME].error)
+        self.assertEqual(results['Knab_transactieoverzicht_ok.csv'].lines, 28)
+        self.assertEqual(sorted(os.listdir(output_dir)),
+                         ['Knab_transactieoverzicht_ok.csv.ofx', ING_FILENAME + '.ofx'])
+
+    @skipUnless(multiprocessing.get_start_method() == 'fork',
+                'the workers need the patch of the test')
+    def test_worker_exits_after_output(self):
+        # the OFX file is in place, but the worker dies before it returns
+        # the result: the file is not converted (and overwritten) again
+        output_dir = os.path.join(self.directory, 'out')
+        jobs = [batch.Job(os.path.join(self.input_dir, name),
+                          os.path.join(output_dir, name + '.ofx'), plugin,
+                          {'watermark': os.path.join(self.directory, 'watermark.sqlite')})
+                for name, plugin in [(ING_FILENAME, 'nl-ing'),
+                                     ('Knab_transactieoverzicht_ok.csv', 'nl-knab')]]
+
+        def commit_watermark(parser):
+            if os.path.basename(parser.fin.name) == ING_FILENAME:
+                os._exit(1)
+
+        with mock.patch.object(batch, 'commit_watermark', commit_watermark), \
+                mock.patch.object(batch, 'convert_alone',
+                                  wraps=batch.convert_alone) as convert_alone, \
+                self.assertLogs(batch.logger, 'WARNING'):
+            results = {os.path.basename(result.input): result
+                       for result in batch.run(jobs, 2)}
+        # the Knab file is only converted again when its worker was stopped
+        self.assertNotIn(mock.call(jobs[0]), convert_alone.call_args_list)
+        self.assertEqual([result.error for result in results.values()], [None, None])
+        self.assertEqual(results[ING_FILENAME].lines, 0)
+        self.assertEqual(results['Knab_transactieoverzicht_ok.csv'].lines, 28)
+        with open(jobs[0].output, newline='') as f:
+            self.assertEqual(without_server_time(f.read()),
+                             self.expected(ing.Plugin(None, {}), ING_FILENAME))
+
+    def test_types(self):
+        config = os.path.join(self.directory, 'config.ini')
+        with open(config, 'w') as f:
+            f.write('[ics]\nplugin = nl-icscards\n')
+        jobs, skipped = batch.make_jobs(
+            [os.path.join(self.input_dir, '*.csv'),
+             os.path.join(self.input_dir, 'icscards.txt')],
+            batch.configuration.read(config),
+            batch.parse_types(['icscards*=ics']))
+        self.assertEqual(skipped, [os.path.join(self.input_dir, 'notes.csv')])
+        self.assertEqual([(os.path.basename(job.input), job.plugin, job.settings)
+                          for job in jobs],
+                         [('Knab_transactieoverzicht_ok.csv', 'nl-knab', {}),
+                          (ING_FILENAME, 'nl-ing', {}),
+                          ('NL99INGB9999999999_fail.csv', 'nl-ing', {}),
+                          ('icscards.txt', 'nl-icscards', {'plugin': 'nl-icscards'})])
+        self.assertEqual(jobs[1].output,
+                         os.path.join(self.input_dir,
+                                      'NL99INGB9999999999_25-11-2019_30-05-2020.ofx'))
+
+    def test_same_output(self):
+        # the same name in two directories and one output directory
+        other_dir = os.path.join(self.directory, 'other')
+        os.mkdir(other_dir)
+        shutil.copy(samples('Knab_transactieoverzicht_ok.csv'), other_dir)
+        inputs = [os.path.join(self.input_dir, 'Knab*.csv'), os.path.join(other_dir, 'Knab*.csv')]
+        with self.assertRaisesRegex(ValueError, 'would both be converted to'):
+            batch.make_jobs(inputs, None, output_dir=os.path.join(self.directory, 'out'))
+        with self.assertRaises(SystemExit):
+            self.main('-o', os.path.join(self.directory, 'out'), *inputs)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'out')))
+        # next to the inputs or into a ledger
+        self.assertEqual(len(batch.make_jobs(inputs, None)[0]), 2)
+        self.assertEqual(len(batch.make_jobs(inputs, None, ledger='ledger.sqlite')[0]), 2)
+
+        # a.csv and a.pdf
+        shutil.copy(samples('blank.pdf'), os.path.join(other_dir, 'Knab_transactieoverzicht_ok.pdf'))
+        with self.assertRaisesRegex(ValueError, 'would both be converted to'):
+            batch.make_jobs([other_dir], None)
+
+    def test_output_mode(self):
+        path = os.path.join(self.directory, 'out', 'mode.ofx')
+        with batch.output_file(path) as out:
+            out.write(b'new')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~batch.UMASK)
+        os.chmod(path, 0o640)
+        with batch.output_file(path) as out:
+            out.write(b'replaced')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+    def test_missing_settings(self):
+        # DEGIRO needs an account id: the file fails, the batch goes on
+        shutil.copy(samples('Account_20190101_20200317.csv'), self.input_dir)
+        status, messages = self.main('-w', '1', '-o', os.path.join(self.directory, 'out'),
+                                     os.path.join(self.input_dir, 'A*.csv'),
+                                     os.path.join(self.input_dir, 'K*.csv'))
+        self.assertEqual(status, 2)
+        self.assertTrue(messages[-2].startswith('Converted 1 of 2 files'))
+        self.assertIn("RuntimeError: Please define an 'account_id'", messages[-1])
+
+    def test_cache(self):
+        output_dir = os.path.join(self.directory, 'out')
+        args = ['-w', '1', '-o', output_dir,
+                '--cache', os.path.join(self.directory, 'cache'),
+                os.path.join(self.input_dir, '*.csv')]
+        status, messages = self.main(*args)
+        self.assertNotIn('from the cache', messages[-2])
+        expected = self.output('Knab_transactieoverzicht_ok.ofx')
+
+        # the OFX files are copied, the failure is converted again
+        os.remove(os.path.join(output_dir, 'Knab_transactieoverzicht_ok.ofx'))
+        with mock.patch.object(batch, 'write_ofx', wraps=batch.write_ofx) as write_ofx:
+            status, messages = self.main(*args)
+        self.assertEqual(write_ofx.call_count, 1)
+        self.assertRegex(messages[-2], r'^Converted 2 of 3 files \(28 lines\) .*; 2 from the cache$')
+        self.assertEqual(self.output('Knab_transactieoverzicht_ok.ofx'), expected)
+
+        # a changed file is converted again
+        with open(os.path.join(self.input_dir, ING_FILENAME), 'a') as f:
+            f.write('"2020-05-31","13,20","13,20"\n')
+        status, messages = self.main(*args)
+        self.assertRegex(messages[-2], r'; 1 from the cache$')
+
+    def test_watermark(self):
+        config = os.path.join(self.directory, 'config.ini')
+        with open(config, 'w') as f:
+            f.write('[knab]\nplugin = nl-knab\nwatermark = {}\n'.format(
+                os.path.join(self.directory, 'watermark.sqlite')))
+        args = ['-c', config, '-w', '1', '-o', os.path.join(self.directory, 'out'),
+                '--cache', os.path.join(self.directory, 'cache'),
+                os.path.join(self.input_dir, 'K*.csv')]
+        with self.assertLogs(batch.logger) as cm:
+            batch.main(args)
+        self.assertRegex(cm.records[-1].getMessage(), r'^Converted 1 of 1 files \(28 lines\)')
+
+        # converted again (not copied from the cache), without the lines
+        with self.assertLogs(batch.logger) as cm:
+            status = batch.main(args)
+        self.assertEqual(status, 0)
+        self.assertRegex(cm.records[-1].getMessage(),
+                         r'^Converted 1 of 1 files \(0 lines\) .*; 28 known lines left out$')
+        self.assertNotIn('<STMTTRN>', self.output('Knab_transactieoverzicht_ok.ofx'))
+
+    def test_merge(self):
+        # two overlapping Knab exports (21-06 to 31-05 and 06-06 to 07-01)
+        with open(samples('Knab_transactieoverzicht_ok.csv'), encoding='ISO-8859-1') as f:
+            lines = f.readlines()
+        for name, records in [('Knab_transactieoverzicht_new.csv', lines[2:16]),
+                              ('Knab_transactieoverzicht_old.csv', lines[12:])]:
+            with open(os.path.join(self.input_dir, name), 'w', encoding='ISO-8859-1',
+                      newline='') as out:
+                out.writelines(lines[:2] + records)
+        output_dir = os.path.join(self.directory, 'out')
+        status, messages = self.main('-w', '1', '--merge', '-o', output_dir,
+                                     os.path.join(self.input_dir, 'Knab*_[no]*.csv'))
+        self.assertEqual(status, 0)
+        self.assertRegex(messages[-1], r'^Converted 1 of 1 files \(28 lines\)')
+        self.assertEqual(os.listdir(output_dir), ['NL99KNAB9999999999.ofx'])
+        self.assertEqual(self.output('NL99KNAB9999999999.ofx').count('<STMTTRN>'), 28)
+
+    def test_date_range(self):
+        output_dir = os.path.join(self.directory, 'out')
+        status, messages = self.main('-w', '1', '-o', output_dir, '--since', '2019-06-11',
+                                     '--until', '2019-06-30', '--date-index',
+                                     os.path.join(self.input_dir, 'Knab*.csv'))
+        self.assertEqual(status, 0)
+        self.assertRegex(messages[-1], r'^Converted 1 of 1 files \(6 lines\)')
+        self.assertEqual(self.output('Knab_transactieoverzicht_ok.ofx').count('<STMTTRN>'), 6)
+        # a date index of ING and DEGIRO files only
+        self.assertFalse([name for name in os.listdir(self.input_dir)
+                          if name.endswith('.dates.json')])
+
+        with self.assertRaises(SystemExit):
+            self.main('--since', '31-31-2019', self.input_dir)
+
+    def test_ledger(self):
+        ledger = os.path.join(self.directory, 'ledger.sqlite')
+        status, messages = self.main('-w', '2', '--ledger', ledger,
+                                     os.path.join(self.input_dir, 'Knab*.csv'),
+                                     os.path.join(self.input_dir, 'NL*_fail.csv'))
+        self.assertEqual(status, 2)
+        self.assertRegex(messages[-2], r'^Converted 1 of 2 files \(28 lines\)')
+        self.assertFalse(os.path.exists(os.path.join(self.input_dir,
+                                                     'Knab_transactieoverzicht_ok.ofx')))
+        with sqlite3.connect(ledger) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM transactions').fetchone(),
+                             (28,))
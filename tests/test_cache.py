@@ -0,0 +1,102 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, mock
+
+from ofxstatement.plugins.nl import cache
+from ofxstatement.plugins.nl.cache import ConversionCache, FileCache
+
+HERE = os.path.dirname(__file__)
+ING_FILENAME = os.path.join(HERE, 'samples', 'ing_ok.csv')
+
+
+def write_and_read(directory, i):
+    """Store and read the same key (in another process)."""
+    file_cache = FileCache(directory, max_size=10 * 1024 * 1024)
+    data = bytes([ord('A') + i]) * 100000
+    with file_cache.writer('key', 'wb') as out:
+        out.write(data[:50000])
+        out.write(data[50000:])
+    f = file_cache.open('key')
+    with f:
+        data = f.read()
+    # always a complete file of one of the writers
+    return len(data) == 100000 and data == data[:1] * 100000
+
+
+class FileCacheTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_open(self):
+        file_cache = FileCache(self.directory)
+        self.assertIsNone(file_cache.open('key'))
+        with file_cache.writer('key', 'wb') as out:
+            out.write(b'data')
+        with file_cache.open('key') as f:
+            self.assertEqual(f.read(), b'data')
+        self.assertEqual((file_cache.hits, file_cache.misses), (1, 1))
+
+    def test_error(self):
+        file_cache = FileCache(self.directory)
+        with self.assertRaises(ZeroDivisionError):
+            with file_cache.writer('key') as out:
+                out.write('partial')
+                1 / 0
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_processes(self):
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(write_and_read, [self.directory] * 12, range(12)))
+        self.assertEqual(results, [True] * 12)
+        self.assertEqual(os.listdir(self.directory), ['key' + FileCache.suffix])
+
+
+class ConversionCacheTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.cache = ConversionCache(self.directory)
+
+    def test_key(self):
+        key = self.cache.key(ING_FILENAME, 'nl-ing', {})
+        self.assertEqual(key, self.cache.key(ING_FILENAME, 'nl-ing',
+                                             {'workers': '4', 'stats': 'on'}))
+        self.assertNotEqual(key, self.cache.key(ING_FILENAME, 'nl-knab', {}))
+        self.assertNotEqual(key, self.cache.key(ING_FILENAME, 'nl-ing',
+                                                {'account_id': 'account1'}))
+        with mock.patch.object(cache, 'package_version', return_value='2.0.0'):
+            self.assertNotEqual(key, self.cache.key(ING_FILENAME, 'nl-ing', {}))
+
+        copy = os.path.join(self.directory, 'copy.csv')
+        with open(ING_FILENAME, 'rb') as src, open(copy, 'wb') as dst:
+            dst.write(src.read())
+        # by content, not by name
+        self.assertEqual(key, self.cache.key(copy, 'nl-ing', {}))
+        with open(copy, 'ab') as f:
+            f.write(b'\n')
+        self.assertNotEqual(key, self.cache.key(copy, 'nl-ing', {}))
+
+    def test_package_version(self):
+        version = cache.package_version()
+        self.assertEqual(len(version.split()), 2)
+
+        # a change of a module (e.g. in an editable install) changes it
+        module = os.path.join(self.directory, 'module.py')
+        with open(module, 'w') as f:
+            f.write('VERSION = 1\n')
+        versions = []
+        with mock.patch.object(cache, '__file__', module):
+            for _ in range(2):
+                cache.package_version.cache_clear()
+                versions.append(cache.package_version())
+                with open(module, 'a') as f:
+                    f.write('VERSION = 2\n')
+        cache.package_version.cache_clear()
+        self.assertNotEqual(versions[0], versions[1])
+        self.assertNotEqual(versions[0], version)
@@ -0,0 +1,171 @@
+import io
+import os
+import pickle
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from unittest import TestCase
+
+from ofxstatement.exceptions import ParseError
+
+from ofxstatement.plugins.nl import degiro, ing
+from ofxstatement.plugins.nl.chunks import record_starts
+from ofxstatement.plugins.nl.statement import StatementLine
+
+ING_HEADER = '"Datum","Naam / Omschrijving","Rekening","Tegenrekening","Code",' \
+    '"Af Bij","Bedrag (EUR)","MutatieSoort","Mededelingen"\n'
+
+DEGIRO_HEADER = 'Datum,Tijd,Valutadatum,Product,ISIN,Omschrijving,FX,Mutatie,,' \
+    'Saldo,,Order Id\n'
+
+
+def ing_rows(rows, account='NL99INGB9999999999'):
+    for i in range(rows):
+        day = '202001{:02d}'.format(28 - i * 27 // rows)
+        if i % 7 == 3:
+            # the same transaction again (#2, #3, ...), in another chunk too
+            memo = 'Maandelijkse bijdrage'
+            name, counter, af_bij, amount = 'Club', 'NL11RABO0123456789', 'Af', '10,00'
+            day = '20200105'
+        else:
+            memo = 'Omschrijving {} "met ""quotes""'.format(i)
+            if i % 5 == 0:
+                # a memo of several lines
+                memo += '\nValutadatum: {}'.format(day)
+            name = 'Winkel {}'.format(i % 11)
+            counter = 'NL22INGB000{:07d}'.format(i) if i % 3 else ''
+            af_bij = 'Bij' if i % 4 == 0 else 'Af'
+            amount = '{},{:02d}'.format(i % 97, i % 100)
+        yield '"{}","{}","{}","{}","GT","{}","{}","Online bankieren","{}"\n'.format(
+            day, name, account, counter, af_bij, amount, memo.replace('"', '""'))
+
+
+def degiro_rows(rows):
+    for i in range(rows):
+        day = '{:02d}-01-2020'.format(28 - i * 27 // rows)
+        if i % 3 == 0:
+            yield '{0},09:00,{0},,,iDEAL storting,,EUR,"100,00",EUR,"{1},00",\n'.format(
+                '06-01-2020', i)
+        elif i % 3 == 1:
+            yield '{0},10:{1:02d},{0},VANECK AEX,NL0009272749,"Koop {1} @ 60,10 EUR",' \
+                ',EUR,"-{1},10",EUR,"13,88",\n'.format(day, i % 60)
+        else:
+            yield '{0},11:00,{0},,,Terugstorting,,EUR,"-{1},00",EUR,"13,88",\n'.format(
+                day, i % 50 + 1)
+
+
+class RecordStartsTest(TestCase):
+
+    def test_quotes(self):
+        data = ''.join([ING_HEADER] + list(ing_rows(200))).encode()
+        # the records start after a new line with an even number of quotes
+        expected = [0] + [i + 1 for i in range(len(data))
+                          if data[i:i + 1] == b'\n' and data.count(b'"', 0, i) % 2 == 0]
+        offsets = list(range(0, len(data) + 1, 37))
+        for block_size in [7, 100, 1024 * 1024]:
+            starts = record_starts(io.BytesIO(data), offsets, block_size)
+            self.assertEqual(starts,
+                             [min([s for s in expected if s >= offset] + [len(data)])
+                              for offset in offsets])
+
+
+class PickleTest(TestCase):
+
+    def test_statement_line(self):
+        stmt_line = StatementLine('id', datetime(2020, 1, 5), 'memo', Decimal('-1.50'))
+        stmt_line.payee = 'payee'
+        stmt_line.extra = 'not a slot'
+        copy = pickle.loads(pickle.dumps(stmt_line))
+        self.assertEqual(repr(copy), repr(stmt_line))
+        self.assertEqual(copy.cents, -150)
+        self.assertEqual(copy.extra, 'not a slot')
+
+
+class ChunksTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, lines, encoding='ISO-8859-1'):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w', encoding=encoding, newline='') as f:
+            f.writelines(lines)
+        return filename
+
+    def parse(self, plugin, filename, workers, chunk_size=2000):
+        settings = dict(plugin.settings, workers=str(workers))
+        parser = type(plugin)(None, settings).get_parser(filename)
+        if workers > 1:
+            parser.chunks.chunk_size = chunk_size
+            self.assertGreater(len(parser.chunks.ranges()[1]), 5)
+        else:
+            self.assertIsNone(parser.chunks)
+        statement = parser.parse()
+        lines = [(line.id, line.date, line.amount, line.memo, line.payee,
+                  line.trntype,
+                  line.bank_account_to and line.bank_account_to.acct_id)
+                 for line in statement.lines]
+        return lines, parser.cur_record, \
+            [statement.account_id, statement.start_date, statement.end_date,
+             statement.start_balance, statement.end_balance]
+
+    def assertSameAsSerial(self, plugin, filename, chunk_size=2000):
+        expected = self.parse(plugin, filename, 1)
+        self.assertEqual(self.parse(plugin, filename, 3, chunk_size), expected)
+        return expected
+
+    def test_ing(self):
+        filename = self.write('NL99INGB9999999999.csv',
+                              [ING_HEADER] + list(ing_rows(300)))
+        lines, records, _ = self.assertSameAsSerial(ing.Plugin(None, {}), filename)
+        self.assertEqual(records, 301)
+        memos = [line[3] for line in lines]
+        self.assertIn('Maandelijkse bijdrage #43', memos)
+        self.assertTrue(any('\n' in memo for memo in memos))
+
+    def test_ing_balances(self):
+        rows = ['"2020-{:02d}-{:02d}","{},00","1,00"\n'.format(12 - i // 28, 28 - i % 28, i)
+                for i in range(300)]
+        filename = self.write('NL99INGB9999999999.csv',
+                              ['"Datum","Boeksaldo","Valutair saldo"\n'] + rows)
+        _, _, statement = self.assertSameAsSerial(ing.Plugin(None, {}), filename, 1000)
+        self.assertEqual(str(statement[-1]), '1.00')
+
+    def test_degiro(self):
+        filename = self.write('Account.csv', [DEGIRO_HEADER] + list(degiro_rows(300)))
+        lines, _, _ = self.assertSameAsSerial(
+            degiro.Plugin(None, {'account_id': 'account1'}), filename)
+        self.assertIn('iDEAL storting #100', [line[3] for line in lines])
+
+    def test_error(self):
+        rows = list(ing_rows(300))
+        rows[250] = rows[250].replace('"Af"', '"Of"')
+        filename = self.write('NL99INGB9999999999.csv', [ING_HEADER] + rows)
+        plugin = ing.Plugin(None, {})
+        with self.assertRaises(ParseError) as serial:
+            self.parse(plugin, filename, 1)
+        with self.assertRaises(ParseError) as parallel:
+            self.parse(plugin, filename, 3)
+        self.assertEqual(parallel.exception.lineno, 252)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+
+    def test_other_account(self):
+        rows = list(ing_rows(150)) + \
+            list(ing_rows(150, account='NL88INGB8888888888'))
+        filename = self.write('transactions.csv', [ING_HEADER] + rows)
+        plugin = ing.Plugin(None, {})
+        with self.assertRaises(ParseError) as serial:
+            self.parse(plugin, filename, 1)
+        with self.assertRaises(ParseError) as parallel:
+            self.parse(plugin, filename, 3)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+
+    def test_small(self):
+        filename = self.write('NL99INGB9999999999.csv',
+                              [ING_HEADER] + list(ing_rows(10)))
+        parser = ing.Plugin(None, {'workers': '4'}).get_parser(filename)
+        self.assertIsNone(parser.chunks.ranges())
+        # the first transaction has no amount
+        self.assertEqual(len(parser.parse().lines), 9)
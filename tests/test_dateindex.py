@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase, mock
+
+from ofxstatement.plugins.nl import dateindex, degiro, icscards, ing, knab
+
+HERE = os.path.dirname(__file__)
+
+ING_HEADER = '"Datum","Naam / Omschrijving","Rekening","Tegenrekening","Code",' \
+    '"Af Bij","Bedrag (EUR)","MutatieSoort","Mededelingen"\r\n'
+
+
+def ing_rows(days, per_day=3):
+    """Records of the days (newest first), the same transaction twice a
+    day and a memo of several lines."""
+    for day in days:
+        for i in range(per_day):
+            memo = 'Omschrijving "{}"\nValutadatum: {}'.format(i % 2, day)
+            yield '"{}","Winkel","NL99INGB9999999999","","GT","Af","{},00",' \
+                '"Online bankieren","{}"\r\n'.format(day, i % 2 + 1, memo.replace('"', '""'))
+
+
+class DateRangeTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, lines):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w', encoding='ISO-8859-1', newline='') as f:
+            f.writelines(lines)
+        return filename
+
+    def parse(self, plugin, filename, **settings):
+        parser = plugin(None, settings).get_parser(filename)
+        statement = parser.parse()
+        parser.fin.close()
+        statement.assert_valid()
+        return parser, statement
+
+    def check(self, plugin, filename, since, until, **settings):
+        """The lines of a date range are those of the whole file."""
+        _, full = self.parse(plugin, filename, **settings)
+        parser, statement = self.parse(plugin, filename, since=since, until=until,
+                                       **settings)
+        key = dateindex.get_date_range({'since': since, 'until': until})
+        self.assertEqual([line.id for line in statement.lines],
+                         [line.id for line in full.lines
+                          if line.date.strftime('%Y%m%d') in key])
+        self.assertTrue(statement.lines)
+        return parser, statement
+
+    def test_ing(self):
+        days = ['202001{:02d}'.format(day) for day in range(28, 0, -1)]
+        filename = self.write('NL99INGB9999999999.csv', [ING_HEADER] + list(ing_rows(days)))
+        parser, statement = self.check(ing.Plugin, filename, '2020-01-05', '2020-01-10')
+        self.assertEqual(parser.cur_record, 1 + 3 * 28)
+        self.assertEqual(len(statement.lines), 3 * 6)
+        self.assertFalse(os.path.exists(dateindex.index_filename(filename)))
+
+        # by the date index: just the header and the records of the range
+        for _ in range(2):
+            parser, statement = self.check(ing.Plugin, filename, '2020-01-05',
+                                           '2020-01-10', date_index='on')
+            self.assertEqual(parser.cur_record, 1 + 3 * 6)
+            self.assertIsNone(parser.chunks)
+        self.assertTrue(os.path.exists(dateindex.index_filename(filename)))
+
+        # open ranges and ranges outside the file
+        for since, until, lines in [('2020-01-27', None, 6), (None, '2020-01-01', 3),
+                                    ('2020-02-01', None, 0), (None, '2019-12-31', 0)]:
+            parser, statement = self.parse(ing.Plugin, filename, since=since, until=until,
+                                           date_index='on')
+            self.assertEqual(len(statement.lines), lines)
+
+    def test_stale(self):
+        days = ['202001{:02d}'.format(day) for day in range(1, 11)]
+        filename = self.write('NL99INGB9999999999.csv', [ING_HEADER] + list(ing_rows(days)))
+        self.check(ing.Plugin, filename, '2020-01-03', '2020-01-04', date_index='on')
+
+        # the index is used as long as the file does not change
+        with mock.patch.object(dateindex, 'build_index') as build_index:
+            self.check(ing.Plugin, filename, '2020-01-03', '2020-01-04', date_index='on')
+        build_index.assert_not_called()
+
+        self.write('NL99INGB9999999999.csv', [ING_HEADER] + list(ing_rows(days[2:])))
+        os.utime(filename, ns=(0, os.stat(dateindex.index_filename(filename)).st_mtime_ns + 1))
+        parser, statement = self.check(ing.Plugin, filename, '2020-01-03', '2020-01-04',
+                                       date_index='on')
+        self.assertEqual(parser.cur_record, 1 + 3 * 2)
+
+    def test_not_sorted(self):
+        days = ['20200103', '20200101', '20200102']
+        filename = self.write('NL99INGB9999999999.csv', [ING_HEADER] + list(ing_rows(days)))
+        parser, _ = self.check(ing.Plugin, filename, '2020-01-02', '2020-01-02',
+                               date_index='on')
+        # the whole file
+        self.assertEqual(parser.cur_record, 1 + 3 * 3)
+        with open(filename, 'rb') as f:
+            self.assertIsNone(dateindex.build_index(f)['dates'])
+
+    def test_degiro(self):
+        filename = os.path.join(self.directory, 'Account.csv')
+        shutil.copy(os.path.join(HERE, 'samples', 'Account_20190101_20200317.csv'), filename)
+        for settings in [{}, {'date_index': 'on'}]:
+            parser, statement = self.check(degiro.Plugin, filename, '19-06-2019', '22-06-2019',
+                                           account_id='NL99DEGIRO', **settings)
+            self.assertEqual(len(statement.lines), 3)
+        self.assertEqual(parser.cur_record, 8)
+
+    def test_knab(self):
+        # no date index: the date is not the first column
+        filename = os.path.join(HERE, 'samples', 'Knab_transactieoverzicht_ok.csv')
+        _, statement = self.check(knab.Plugin, filename, '2019-06-11', '2019-06-30',
+                                  date_index='on')
+        self.assertEqual(len(statement.lines), 6)
+        self.assertFalse(os.path.exists(dateindex.index_filename(filename)))
+
+    def test_icscards(self):
+        # the dates have no year: the records are checked after parsing
+        filename = os.path.join(HERE, 'samples', 'icscards.txt')
+        _, full = self.parse(icscards.Plugin, filename)
+        _, statement = self.check(icscards.Plugin, filename, '2019-09-03', '2019-09-05')
+        self.assertEqual(len(statement.lines), 9)
+        self.assertEqual((statement.start_date, statement.end_date),
+                         (datetime(2019, 9, 3), datetime(2019, 9, 6)))
+        # the balances of the range
+        before = sum(line.amount for line in full.lines if line.date < datetime(2019, 9, 3))
+        after = sum(line.amount for line in full.lines if line.date > datetime(2019, 9, 5))
+        self.assertEqual(statement.start_balance, full.start_balance + before)
+        self.assertEqual(statement.end_balance, full.end_balance - after)
+        self.assertEqual(statement.start_balance + statement.total_amount,
+                         statement.end_balance)
+
+    def test_empty_range(self):
+        # no records in the range: an empty statement
+        for plugin, name in [(ing.Plugin, 'NL99INGB9999999999_25-11-2019_30-05-2020.csv'),
+                             (knab.Plugin, 'Knab_transactieoverzicht_ok.csv'),
+                             (icscards.Plugin, 'icscards.txt')]:
+            with self.subTest(name):
+                filename = os.path.join(HERE, 'samples', name)
+                parser, statement = self.parse(plugin, filename, since='2030-01-01')
+                self.assertEqual(statement.lines, [])
+                self.assertGreater(parser.cur_record, 1)
+                self.assertEqual((statement.start_date, statement.end_date,
+                                  statement.start_balance, statement.end_balance),
+                                 (None, None, None, None))
+
+    def test_invalid(self):
+        for settings in [{'since': 'yesterday'}, {'until': '2019-02-30'}]:
+            with self.assertRaisesRegex(ValueError, 'Invalid date'):
+                dateindex.get_date_range(settings)
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+from unittest import TestCase
+
+from ofxstatement.plugins.nl.dates import DUTCH_MONTHS, \
+    DUTCH_MONTH_ABBREVIATIONS, PARSERS, parse_datetime, parse_dutch_date
+
+
+class ParseDatetimeTest(TestCase):
+
+    def assertSameAsStrptime(self, value, date_format):
+        try:
+            expected = datetime.strptime(value, date_format)
+        except ValueError as e:
+            with self.assertRaises(ValueError) as cm:
+                parse_datetime(value, date_format)
+            self.assertEqual(str(cm.exception), str(e))
+        else:
+            self.assertEqual(parse_datetime(value, date_format), expected)
+
+    def test_dates(self):
+        day = date(2019, 12, 25)
+        for _ in range(800):
+            for date_format in PARSERS:
+                self.assertSameAsStrptime(day.strftime(date_format), date_format)
+            day += timedelta(days=1)
+
+    def test_odd_values(self):
+        values = ['', ' ', '0', '1-5-2020', '01-5-2020', '1-05-2020',
+                  '2020-5-1', '202051', '29-02-2019', '29-02-2020',
+                  '31-04-2020', '00-01-2020', '01-00-2020', '01-13-2020',
+                  '01-01-0000', '20201301', '20200132', '00000101',
+                  '01-01-2020 ', ' 01-01-2020', '01/01/2020', '+1-01-2020',
+                  '2020-01-1a', '１２-01-2020', '²2-01-2020', '2020-01-01x']
+        for value in values:
+            for date_format in PARSERS:
+                self.assertSameAsStrptime(value, date_format)
+
+    def test_other_formats(self):
+        self.assertSameAsStrptime('30/05/2020', '%d/%m/%Y')
+        self.assertSameAsStrptime('30 May 2020', '%d %b %Y')
+
+
+class ParseDutchDateTest(TestCase):
+
+    def test_months(self):
+        for number, (name, abbreviation) in \
+                enumerate(zip(DUTCH_MONTHS, DUTCH_MONTH_ABBREVIATIONS), 1):
+            expected = datetime(2025, number, 5)
+            for month in [name, abbreviation, abbreviation + '.', name.upper()]:
+                self.assertEqual(parse_dutch_date('05 {} 2025'.format(month)), expected)
+
+    def test_errors(self):
+        for value in ['', '05 mei', '05 may 2025', '005 mei 2025', '05 mei 25',
+                      '30 feb 2025', '05 mei 2025 x']:
+            with self.assertRaises(ValueError):
+                parse_dutch_date(value)
@@ -164,6 +164,26 @@ Koop 0,001337 @ 9.986,9062 EUR MORGAN STANLEY EUR LIQUIDITY FUND \
                              Decimal(lines[idx].amount.replace(",", ".").
                                      replace(" ", "")))
 
+    def test_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here,
+                                     'samples',
+                                     'Account_20190101_20200317.csv')
+        parser = Plugin(None, {'account_id': 'ABC'}).get_parser(text_filename)
+
+        memos = [sl.memo for sl in parser.iter_lines()]
+
+        self.assertEqual(memos, ['Terugstorting',
+                                 'Terugstorting #2',
+                                 'iDEAL storting'])
+        self.assertEqual(len(parser.statement.lines), 0)
+        self.assertEqual(parser.statement.start_date,
+                         datetime.strptime("19-06-2019",
+                                           parser.date_format))
+        self.assertEqual(parser.statement.end_date,
+                         datetime.strptime("22-06-2019",
+                                           parser.date_format))
+
     @pytest.mark.xfail(raises=RuntimeError)
     def test_no_config(self):
         """No attribute
@@ -0,0 +1,59 @@
+import os
+from unittest import TestCase
+
+from ofxstatement.plugins.nl import degiro, ing
+from ofxstatement.plugins.nl.detect import DEGIRO, HEAD_SIZE, ING_BALANCES, \
+    ING_TRANSACTIONS, Detection, detect, detect_head
+
+HERE = os.path.dirname(__file__)
+
+
+def samples(name):
+    return os.path.join(HERE, 'samples', name)
+
+
+class DetectTest(TestCase):
+
+    def test_samples(self):
+        for name, expected in [
+                ('Account_20190101_20200317.csv', ('nl-degiro', 'degiro', None)),
+                ('Knab_transactieoverzicht_ok.csv', ('nl-knab', 'knab', 'NL99KNAB9999999999')),
+                ('NL99INGB9999999999_25-11-2019_30-05-2020.csv',
+                 ('nl-ing', 'ing-balances-comma', None)),
+                ('ing_ok.csv', ('nl-ing', 'ing-comma', 'NL99INGB9999999999')),
+                ('ing_ok_Mutatiesoort_Extra_Unquoted.csv',
+                 ('nl-ing', 'ing-semicolon', 'NL99INGB9999999999')),
+                ('transactie-historie_NL00ASNB9999999999_20220717204133.csv',
+                 ('nl-asn', 'asn', 'NL00ASNB9999999999')),
+                ('blank.pdf', ('nl-icscards', 'ics-pdf', None)),
+                ('icscards.txt', ('nl-icscards', 'ics', None)),
+                ('empty.csv', None)]:
+            with self.subTest(name):
+                self.assertEqual(detect(samples(name)),
+                                 None if expected is None else Detection(*expected))
+
+    def test_headers(self):
+        # the parsers check the same headers
+        self.assertIs(ing.Parser.header[0], ING_TRANSACTIONS)
+        self.assertIs(ing.Parser.header[2], ING_BALANCES)
+        self.assertIs(degiro.Parser(None, 'account').header[0], DEGIRO)
+        self.assertEqual([signature.start for signature in ing.Parser.signatures[:2]],
+                         [','.join('"%s"' % column for column in ING_TRANSACTIONS),
+                          ','.join(ING_TRANSACTIONS)])
+
+    def test_head(self):
+        with open(samples('ing_ok.csv'), 'rb') as f:
+            head = f.read(HEAD_SIZE)
+        # a byte order mark and a first record cut short
+        self.assertEqual(detect_head(b'\xef\xbb\xbf' + head[:300]),
+                         Detection('nl-ing', 'ing-comma', 'NL99INGB9999999999'))
+        self.assertEqual(detect_head(head[:150]), Detection('nl-ing', 'ing-comma'))
+
+    def test_asn(self):
+        with open(samples('transactie-historie_NL00ASNB9999999999_20220717204133.csv'),
+                  'rb') as f:
+            record = f.readline()
+        self.assertEqual(detect_head(record).plugin, 'nl-asn')
+        # 18 or 20 columns
+        self.assertIsNone(detect_head(record.rstrip(b'\r\n').rsplit(b',', 1)[0]))
+        self.assertIsNone(detect_head(record.rstrip(b'\r\n') + b',1\n'))
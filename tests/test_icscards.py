@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
+import io
 import os
 from unittest import TestCase
 from decimal import Decimal
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from ofxstatement.plugins.nl.icscards import Plugin
@@ -46,6 +48,40 @@ class ParserTest(TestCase):
         self.assertEqual(statement.lines[14].memo, "PARIS 8 (FR)")
         self.assertEqual(statement.lines[24].amount, Decimal('-6.15'))
 
+    def test_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'icscards.txt')
+        parser = Plugin(None, None).get_parser(text_filename)
+
+        lines = list(parser.iter_lines())
+
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(lines[13].payee, "NEWREST WAGONS LITS FRANC")
+        self.assertEqual(len(parser.statement.lines), 0)
+        self.assertEqual(parser.statement.start_date,
+                         datetime.strptime("2019-08-21",
+                                           parser.date_format))
+        self.assertEqual(parser.statement.end_balance, Decimal('-1320.55'))
+
+    def test_columns(self):
+        """The payee, place and country are sliced by position
+        """
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'icscards.txt')
+        with open(text_filename, 'r') as fh:
+            # two spaces in a place of the same width
+            text = fh.read().replace('SNCF                     PARIS 8 ',
+                                     'SNCF                     PARIS  8')
+        parser = Plugin(None, None).get_file_object_parser(io.StringIO(text))
+
+        lines = list(parser.iter_lines())
+
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(lines[13].payee, "NEWREST WAGONS LITS FRANC")
+        self.assertEqual(lines[13].memo, "PARIS (FR)")
+        self.assertEqual(lines[14].payee, "SNCF")
+        self.assertEqual(lines[14].memo, "PARIS 8 (FR)")
+
     def test_big(self):
         # Create and configure parser:
         here = os.path.dirname(__file__)
@@ -88,6 +124,17 @@ class ParserTest(TestCase):
         self.assertEqual(statement.lines[16].payee, "TOTAL 4375462")
         self.assertEqual(statement.lines[16].memo, "33PESSAC (FR)")
 
+    def test_other_page_header(self):
+        # the last page of a statement of another account
+        here = os.path.dirname(__file__)
+        with open(os.path.join(here, 'samples', 'icscards_big.txt')) as f:
+            text = f.read()
+        first, _, last = text.rpartition('99999999999')
+        text = first + '88888888888' + last
+        parser = Plugin(None, None).get_file_object_parser(io.StringIO(text))
+        with self.assertRaisesRegex(AssertionError, 'differs from the first page'):
+            parser.parse()
+
     def test_equal_transactions(self):
         # Create and configure parser:
         here = os.path.dirname(__file__)
@@ -175,6 +222,23 @@ class ParserTest(TestCase):
         self.assertEqual(statement.lines[0].amount, Decimal('13.08'))
         self.assertEqual(statement.lines[0].memo, 'IDEAL BETALING, DANK U')
 
+    def test_threads(self):
+        """Statements can be parsed concurrently (no locale changes)
+        """
+        here = os.path.dirname(__file__)
+
+        def parse(name):
+            with open(os.path.join(here, 'samples', name), 'r') as fh:
+                parser = Plugin(None, None).get_file_object_parser(fh)
+                return [(line.id, line.date, line.amount)
+                        for line in parser.iter_lines()]
+
+        names = ['icscards.txt', 'icscards_big.txt', 'icscards-2025-04.txt'] * 4
+        expected = [parse(name) for name in names]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(executor.map(parse, names)), expected)
+        self.assertEqual(expected[2][0][1], datetime(2025, 3, 22))
+
     @pytest.mark.xfail(raises=AttributeError)
     def test_fail(self):
         """'Parser' object has no attribute 'bank_id'
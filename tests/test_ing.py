@@ -1,3 +1,4 @@
+import io
 import os
 from unittest import TestCase
 from decimal import Decimal
@@ -6,7 +7,17 @@ from datetime import datetime
 
 from ofxstatement.exceptions import ParseError
 
-from ofxstatement.plugins.nl.ing import Plugin
+from ofxstatement.plugins.nl.ing import Parser, Plugin
+
+
+class NotSeekable(io.StringIO):
+    """Like a pipe or stdin"""
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation('seek')
 
 
 class ParserTest(TestCase):
@@ -88,6 +99,43 @@ Kosten rekening IBAN: NL99ASNB9999999999 Valutadatum: 13-12-2019")
         text_filename = os.path.join(here, 'samples', 'ing_ok_Mutatiesoort_Extra_Unquoted.csv')
         self.check(Plugin(None, None).get_parser(text_filename))
 
+    def test_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'ing_ok.csv')
+        statement = Plugin(None, None).get_parser(text_filename).parse()
+        parser = Plugin(None, None).get_parser(text_filename)
+
+        lines = list(parser.iter_lines())
+
+        self.assertEqual([sl.id for sl in lines],
+                         [sl.id for sl in statement.lines])
+        self.assertEqual([sl.memo for sl in lines],
+                         [sl.memo for sl in statement.lines])
+        # the lines are not kept but the headers are set
+        self.assertEqual(len(parser.statement.lines), 0)
+        self.assertEqual(parser.statement.line_count, 5)
+        self.assertEqual(parser.statement.start_date, statement.start_date)
+        self.assertEqual(parser.statement.end_date, statement.end_date)
+        parser.statement.assert_valid()
+
+    def test_not_seekable(self):
+        here = os.path.dirname(__file__)
+        for sample in ['ing_ok.csv', 'ing_ok_Mutatiesoort_Extra_Unquoted.csv']:
+            text_filename = os.path.join(here, 'samples', sample)
+            with open(text_filename, 'r', encoding='ISO-8859-1') as f:
+                parser = Parser(NotSeekable(f.read()), 'NL99INGB9999999999')
+            self.check(parser)
+
+    def test_sniff(self):
+        parser = Parser(io.StringIO(''))
+        self.assertEqual(parser.sniff('"Datum","Naam / Omschrijving","Rekening","Tegenrekening","Code","Af Bij","Bedrag (EUR)","MutatieSoort","Mededelingen"\n'), ',')
+        self.assertEqual(parser.sniff('"Datum";"Naam / Omschrijving";"Rekening";"Tegenrekening";"Code";"Af Bij";"Bedrag (EUR)";"Mutatiesoort";"Mededelingen";"Saldo na mutatie";"Tag"\n'), ';')
+        self.assertEqual(parser.sniff('Datum;Naam / Omschrijving;Rekening;Tegenrekening;Code;Af Bij;Bedrag (EUR);Mutatiesoort;Mededelingen;Extra\n'), ';')
+        self.assertEqual(parser.sniff('"Datum";"Boeksaldo";"Valutair saldo"\n'), ';')
+        # unknown header
+        self.assertEqual(parser.sniff('a;b,c;d\n'), ';')
+        self.assertEqual(parser.sniff(''), ',')
+
     @pytest.mark.xfail(raises=ParseError)
     def test_fail(self):
         here = os.path.dirname(__file__)
@@ -130,3 +178,14 @@ Kosten rekening IBAN: NL99ASNB9999999999 Valutadatum: 13-12-2019")
                                            parser.date_format))
 
         self.assertEqual(len(statement.lines), 0)
+
+    def test_balance_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'NL99INGB9999999999_25-11-2019_30-05-2020.csv')
+        parser = Plugin(None, None).get_parser(text_filename)
+
+        self.assertEqual(list(parser.iter_lines()), [])
+        self.assertEqual(parser.statement.end_balance, Decimal('13.20'))
+        self.assertEqual(parser.statement.end_date,
+                         datetime.strptime("2020-05-31",  # plus 1 day
+                                           parser.date_format))
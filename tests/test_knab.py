@@ -79,6 +79,20 @@ Rekeningnummer;Transactiedatum;Valutacode;CreditDebet;Bedrag;Tegenrekeningnummer
 
         self.assertEqual(sum(sl.amount for sl in statement.lines), Decimal('7.01'))
 
+    def test_iter_lines(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'Knab_transactieoverzicht_ok.csv')
+        parser = Plugin(None, None).get_parser(text_filename)
+
+        total = sum(sl.amount for sl in parser.iter_lines())
+
+        self.assertEqual(total, Decimal('7.01'))
+        self.assertEqual(len(parser.statement.lines), 0)
+        self.assertEqual(parser.statement.line_count, 28)
+        self.assertEqual(parser.statement.total_amount, Decimal('7.01'))
+        self.assertEqual(parser.statement.start_date, datetime.strptime("07-01-2019", parser.date_format))
+        self.assertEqual(parser.statement.end_date, datetime.strptime("22-06-2019", parser.date_format))
+
     @pytest.mark.xfail(raises=ParseError)
     def test_no_header1(self):
         here = os.path.dirname(__file__)
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from unittest import TestCase
+
+from ofxstatement.exceptions import ParseError
+
+from ofxstatement.plugins.nl import asn, ing, knab
+from ofxstatement.plugins.nl.ledger import Ledger
+
+HERE = os.path.dirname(__file__)
+KNAB_FILENAME = os.path.join(HERE, 'samples', 'Knab_transactieoverzicht_ok.csv')
+ASN_FILENAME = os.path.join(HERE, 'samples',
+                            'transactie-historie_NL00ASNB9999999999_20220717204133.csv')
+
+
+class LedgerTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.database = os.path.join(self.directory, 'ledger', 'ledger.sqlite')
+
+    def load(self, plugin, filename, batch_size=10000):
+        parser = plugin(None, {}).get_parser(filename)
+        with Ledger(self.database, batch_size) as ledger:
+            try:
+                statement = ledger.load(parser)
+            finally:
+                parser.fin.close()
+        return ledger, statement
+
+    def query(self, sql):
+        with sqlite3.connect(self.database) as connection:
+            return connection.execute(sql).fetchall()
+
+    def test_knab(self):
+        ledger, statement = self.load(knab.Plugin, KNAB_FILENAME, 5)
+        self.assertEqual(ledger.rows, 28)
+        self.assertGreater(ledger.rows_per_s, 0)
+
+        full = knab.Plugin(None, {}).get_parser(KNAB_FILENAME)
+        lines = full.parse().lines
+        full.fin.close()
+        rows = self.query('SELECT id, date, amount, cents, trntype, payee, memo, '
+                          'bank_account_to FROM transactions ORDER BY id')
+        self.assertEqual(rows, sorted(
+            (line.id, line.date.strftime('%Y-%m-%d'), str(line.amount), line.cents,
+             line.trntype, line.payee, line.memo,
+             line.bank_account_to.acct_id if line.bank_account_to else None)
+            for line in lines))
+        self.assertEqual(self.query('SELECT DISTINCT account_id FROM transactions'),
+                         [('NL99KNAB9999999999',)])
+        self.assertEqual(self.query('SELECT account_id, source, start_date, end_date, lines '
+                                    'FROM statements'),
+                         [('NL99KNAB9999999999', KNAB_FILENAME,
+                           statement.start_date.strftime('%Y-%m-%d'),
+                           statement.end_date.strftime('%Y-%m-%d'), 28)])
+
+    def test_idempotent(self):
+        for _ in range(2):
+            self.load(asn.Plugin, ASN_FILENAME)
+            self.load(knab.Plugin, KNAB_FILENAME)
+        self.assertEqual(self.query('SELECT account_id, COUNT(*) FROM transactions '
+                                    'GROUP BY account_id'),
+                         [('NL00ASNB9999999999', 11), ('NL99KNAB9999999999', 28)])
+        self.assertEqual(self.query('SELECT start_balance, end_balance FROM statements '
+                                    "WHERE account_id = 'NL00ASNB9999999999'"),
+                         [('130.44', '84.24')])
+
+    def test_failure(self):
+        # nothing is stored of a file that fails
+        self.load(knab.Plugin, KNAB_FILENAME)
+        with self.assertRaises(ParseError):
+            self.load(ing.Plugin, os.path.join(HERE, 'samples', 'ing_fail.csv'), 1)
+        self.assertEqual(self.query('SELECT COUNT(*) FROM transactions'), [(28,)])
+        self.assertEqual(self.query('SELECT COUNT(*) FROM statements'), [(1,)])
+
+    def test_lock(self):
+        # the database is only locked after parsing
+        parser = knab.Plugin(None, {}).get_parser(KNAB_FILENAME)
+        iter_lines = parser.iter_lines
+
+        def lines_while_writing():
+            for stmt_line in iter_lines():
+                with closing(sqlite3.connect(self.database, timeout=0,
+                                             isolation_level=None)) as other:
+                    other.execute('BEGIN IMMEDIATE')
+                    other.execute('ROLLBACK')
+                yield stmt_line
+
+        parser.iter_lines = lines_while_writing
+        with Ledger(self.database, 5) as ledger:
+            ledger.load(parser)
+        parser.fin.close()
+        self.assertEqual(self.query('SELECT COUNT(*) FROM transactions'), [(28,)])
@@ -0,0 +1,102 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from ofxstatement.exceptions import ValidationError
+
+from ofxstatement.plugins.nl import asn, knab
+from ofxstatement.plugins.nl.merge import MergeParser
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+
+HERE = os.path.dirname(__file__)
+KNAB_FILENAME = os.path.join(HERE, 'samples', 'Knab_transactieoverzicht_ok.csv')
+ASN_FILENAME = os.path.join(HERE, 'samples',
+                            'transactie-historie_NL00ASNB9999999999_20220717204133.csv')
+
+
+def parse(plugin, filename):
+    parser = plugin(None, {}).get_parser(filename)
+    statement = parser.parse()
+    parser.fin.close()
+    return statement
+
+
+class MergeTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def export(self, filename, header, start, end, name=None, replace=None):
+        """A file with the header lines and the records start to end of
+        filename (an export of some whole days)."""
+        with open(filename, encoding='ISO-8859-1') as f:
+            lines = f.readlines()
+        path = os.path.join(self.directory, name or '{}_{}_{}'.format(
+            start, end, os.path.basename(filename)))
+        with open(path, 'w', encoding='ISO-8859-1', newline='') as out:
+            for line in lines[:header] + lines[header + start:header + end]:
+                out.write(line.replace(*replace) if replace else line)
+        return path
+
+    def merge(self, plugin, filenames, run_size=1000):
+        parser = MergeParser(plugin(None, {}).get_parser, filenames, run_size)
+        statement = parser.parse()
+        statement.assert_valid()
+        return parser, statement
+
+    def check(self, statement, expected):
+        self.assertEqual(sorted(line.id for line in statement.lines),
+                         sorted(line.id for line in expected.lines))
+        self.assertEqual([line.date for line in statement.lines],
+                         sorted(line.date for line in expected.lines))
+        for name in ['account_id', 'bank_id', 'currency', 'start_date', 'end_date',
+                     'start_balance', 'end_balance']:
+            self.assertEqual(getattr(statement, name), getattr(expected, name), name)
+
+    def test_knab(self):
+        expected = parse(knab.Plugin, KNAB_FILENAME)
+        # 21-06 to 31-05 and 06-06 to 07-01
+        filenames = [self.export(KNAB_FILENAME, 2, 0, 14),
+                     self.export(KNAB_FILENAME, 2, 10, 28)]
+        for run_size in [1000, 5]:
+            with self.subTest(run_size=run_size):
+                parser, statement = self.merge(knab.Plugin, filenames, run_size)
+                self.check(statement, expected)
+                self.assertEqual(parser.duplicates, 4)
+                self.assertEqual(parser.cur_record, 2 * 2 + 14 + 18)
+
+    def test_asn(self):
+        # the balances of the first and the last export
+        expected = parse(asn.Plugin, ASN_FILENAME)
+        filenames = [self.export(ASN_FILENAME, 0, 3, 11),
+                     self.export(ASN_FILENAME, 0, 0, 7),
+                     self.export(ASN_FILENAME, 0, 0, 11)]
+        parser, statement = self.merge(asn.Plugin, filenames, 3)
+        self.check(statement, expected)
+        self.assertEqual(parser.duplicates, 8 + 7 + 11 - 11)
+
+    def test_gap(self):
+        # the balances do not add up without 25-06 to 05-07
+        filenames = [self.export(ASN_FILENAME, 0, 0, 2),
+                     self.export(ASN_FILENAME, 0, 7, 11)]
+        with self.assertRaises(ValidationError):
+            self.merge(asn.Plugin, filenames)
+
+    def test_accounts(self):
+        filenames = [self.export(KNAB_FILENAME, 2, 0, 14),
+                     self.export(KNAB_FILENAME, 2, 10, 28, 'other.csv',
+                                 ('NL99KNAB9999999999', 'NL98KNAB9999999999'))]
+        with self.assertRaisesRegex(ValidationError, 'Only one account'):
+            self.merge(knab.Plugin, filenames)
+
+    def test_streaming(self):
+        filenames = [self.export(KNAB_FILENAME, 2, 0, 14),
+                     self.export(KNAB_FILENAME, 2, 10, 28)]
+        out = io.StringIO()
+        statement = StreamingOfxWriter(MergeParser(knab.Plugin(None, {}).get_parser,
+                                                   filenames, 5)).write(out)
+        self.assertEqual(statement.line_count, 28)
+        self.assertEqual(out.getvalue().count('<STMTTRN>'), 28)
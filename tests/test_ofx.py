@@ -0,0 +1,75 @@
+import io
+import os
+from unittest import TestCase
+from datetime import datetime
+import pytest
+
+from ofxstatement.exceptions import ParseError
+from ofxstatement.ofx import OfxWriter
+
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+from ofxstatement.plugins.nl import asn, degiro, ing, knab
+
+
+class StreamingOfxWriterTest(TestCase):
+
+    gen_time = datetime(2020, 6, 1, 12, 30, 15)
+
+    def expected(self, get_parser):
+        writer = OfxWriter(get_parser().parse())
+        writer.genTime = self.gen_time
+        return writer.toxml()
+
+    def actual(self, get_parser, **kwargs):
+        writer = StreamingOfxWriter(get_parser(), **kwargs)
+        writer.genTime = self.gen_time
+        out = io.StringIO()
+        statement = writer.write(out)
+        self.assertEqual(statement.lines, [])
+        return out.getvalue()
+
+    def check(self, plugin, sample):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', sample)
+
+        def get_parser():
+            return plugin.get_parser(text_filename)
+
+        expected = self.expected(get_parser)
+        self.assertEqual(self.actual(get_parser), expected)
+        # force the spool to disk
+        self.assertEqual(self.actual(get_parser, spool_size=10), expected)
+
+    def test_ing(self):
+        self.check(ing.Plugin(None, None), 'ing_ok.csv')
+
+    def test_ing_balance(self):
+        self.check(ing.Plugin(None, None), 'NL99INGB9999999999_25-11-2019_30-05-2020.csv')
+
+    def test_knab(self):
+        self.check(knab.Plugin(None, None), 'Knab_transactieoverzicht_ok.csv')
+
+    def test_asn(self):
+        self.check(asn.Plugin(None, None), 'transactie-historie_NL00ASNB9999999999_20220717204133.csv')
+
+    def test_degiro(self):
+        self.check(degiro.Plugin(None, {'account_id': 'ABC'}), 'Account_20190101_20200317.csv')
+
+    def test_encoding(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'ing_ok.csv')
+        writer = StreamingOfxWriter(ing.Plugin(None, None).get_parser(text_filename),
+                                    encoding='cp1252')
+        self.assertIn('ENCODING:USASCII\r\nCHARSET:1252\r\n', writer.header())
+
+    @pytest.mark.xfail(raises=ParseError)
+    def test_fail(self):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'ing_fail.csv')
+        parser = ing.Plugin(None, None).get_parser(text_filename)
+        out = io.StringIO()
+        try:
+            StreamingOfxWriter(parser).write(out)
+        finally:
+            # nothing written
+            self.assertEqual(out.getvalue(), '')
@@ -0,0 +1,286 @@
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from ofxstatement.plugins.nl.chunks import get_workers
+from ofxstatement.plugins.nl.icscards import Plugin
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+from ofxstatement.plugins.nl.pdf import PdfText, TextCache, get_text_cache, \
+    is_pdf
+
+HERE = os.path.dirname(__file__)
+TEXT_FILENAME = os.path.join(HERE, 'samples', 'icscards.txt')
+
+# a pdftotext that writes the text file next to the "PDF" (file.pdf.txt)
+FAKE_PDFTOTEXT = (sys.executable, '-c', '''
+import shutil, sys
+with open(sys.argv[1] + '.txt', 'rb') as f:
+    shutil.copyfileobj(f, sys.stdout.buffer)
+''')
+
+
+# the same with pages (separated by form feeds) and options -f and -l
+FAKE_PDFTOTEXT_PAGES = (sys.executable, '-c', '''
+import sys
+args = sys.argv[1:]
+with open(args[-2] + '.txt', 'rb') as f:
+    pages = f.read().split(b'\\f')
+first, last = 1, len(pages)
+if args[0] == '-f':
+    first, last = int(args[1]), int(args[3])
+text = b'\\f'.join(pages[first - 1:last])
+sys.stdout.buffer.write(text + (b'\\f' if last < len(pages) else b''))
+''')
+
+FAKE_PDFINFO = (sys.executable, '-c', '''
+import sys
+with open(sys.argv[1] + '.txt', 'rb') as f:
+    print('Title:  ICS\\nPages:          {}'.format(f.read().count(b'\\f') + 1))
+''')
+
+
+def python(script):
+    return (sys.executable, '-c', script)
+
+
+class PdfTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.pdf_filename = os.path.join(directory.name, 'icscards.pdf')
+        with open(self.pdf_filename, 'wb') as f:
+            f.write(b'%PDF-1.4\n')
+        with open(TEXT_FILENAME, 'rb') as src, \
+                open(self.pdf_filename + '.txt', 'wb') as dst:
+            dst.write(src.read())
+
+    def test_is_pdf(self):
+        self.assertTrue(is_pdf(os.path.join(HERE, 'samples', 'blank.pdf')))
+        self.assertTrue(is_pdf(self.pdf_filename))
+        self.assertFalse(is_pdf(TEXT_FILENAME))
+
+    def test_lines(self):
+        with open(TEXT_FILENAME, 'rb') as f:
+            expected = list(io.StringIO(f.read().decode()))
+        lines = list(PdfText(self.pdf_filename, command=FAKE_PDFTOTEXT))
+        self.assertEqual(lines, expected)
+
+    def test_plugin(self):
+        with open(TEXT_FILENAME, 'r') as fh:
+            expected = Plugin(None, None).get_file_object_parser(fh).parse()
+        with mock.patch.object(PdfText, 'command', FAKE_PDFTOTEXT):
+            parser = Plugin(None, None).get_parser(self.pdf_filename)
+            self.assertIsInstance(parser.fin, PdfText)
+            statement = parser.parse()
+        self.assertEqual([line.id for line in statement.lines],
+                         [line.id for line in expected.lines])
+        self.assertEqual(statement.end_balance, expected.end_balance)
+
+    def test_streaming(self):
+        # the first line is returned while the command is still running
+        text = PdfText(self.pdf_filename, command=python(
+            'import sys, time; print("first", flush=True); time.sleep(2); print("last")'))
+        started = time.perf_counter()
+        lines = iter(text)
+        self.assertEqual(next(lines), 'first\n')
+        self.assertLess(time.perf_counter() - started, 1.5)
+        lines.close()
+
+    def test_timeout(self):
+        with mock.patch.object(PdfText, 'command', python('import time; time.sleep(10)')):
+            parser = Plugin(None, {'pdftotext_timeout': '0.2'}).get_parser(self.pdf_filename)
+            started = time.perf_counter()
+            with self.assertRaises(subprocess.TimeoutExpired):
+                list(parser.fin)
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_error(self):
+        text = PdfText(self.pdf_filename, command=python(
+            'import sys; print("line"); sys.exit("Syntax Error")'))
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            list(text)
+        self.assertEqual(cm.exception.returncode, 1)
+        self.assertIn(b'Syntax Error', cm.exception.stderr)
+
+
+class TextCacheTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.pdf_filename = os.path.join(self.directory, 'icscards.pdf')
+        with open(self.pdf_filename, 'wb') as f:
+            f.write(b'%PDF-1.4\n')
+        with open(TEXT_FILENAME, 'rb') as src, \
+                open(self.pdf_filename + '.txt', 'wb') as dst:
+            dst.write(src.read())
+        self.cache = TextCache(os.path.join(self.directory, 'cache'))
+
+    def lines(self, command=FAKE_PDFTOTEXT):
+        return list(PdfText(self.pdf_filename, command=command, cache=self.cache))
+
+    def test_hit(self):
+        expected = self.lines()
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        # pdftotext is not run again
+        failing = python('import sys; sys.exit(1)')
+        with mock.patch.object(TextCache, 'key', return_value=self.cache.key(
+                self.pdf_filename, FAKE_PDFTOTEXT)):
+            self.assertEqual(self.lines(failing), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(os.listdir(self.cache.directory),
+                         [os.path.basename(self.cache.path(self.cache.key(
+                             self.pdf_filename, FAKE_PDFTOTEXT)))])
+
+    def test_key(self):
+        key = self.cache.key(self.pdf_filename, FAKE_PDFTOTEXT)
+        self.assertEqual(key, self.cache.key(self.pdf_filename, FAKE_PDFTOTEXT))
+        self.assertNotEqual(key, self.cache.key(self.pdf_filename,
+                                                FAKE_PDFTOTEXT + ('-raw',)))
+        with open(self.pdf_filename, 'ab') as f:
+            f.write(b'%%EOF\n')
+        self.assertNotEqual(key, self.cache.key(self.pdf_filename, FAKE_PDFTOTEXT))
+
+    def test_error(self):
+        failing = python('import sys; print("line"); sys.exit(1)')
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.lines(failing)
+        self.assertEqual(os.listdir(self.cache.directory), [])
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_evict(self):
+        self.lines()
+        path = self.cache.path(self.cache.key(self.pdf_filename, FAKE_PDFTOTEXT))
+        old = time.time() - self.cache.max_age - 1
+        os.utime(path, (old, old))
+        self.cache.evict()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.cache.evictions, 1)
+
+        self.cache.max_size = os.path.getsize(TEXT_FILENAME) // 2
+        self.lines()
+        self.assertEqual(os.listdir(self.cache.directory), [])
+        self.assertEqual(self.cache.evictions, 2)
+
+    def test_settings(self):
+        self.assertIsNone(get_text_cache(None))
+        self.assertIsNone(get_text_cache({'pdftotext_cache': 'no'}))
+        cache = get_text_cache({'pdftotext_cache': self.directory,
+                                'pdftotext_cache_days': '1'})
+        self.assertEqual(cache.directory, self.directory)
+        self.assertEqual(cache.max_age, 24 * 60 * 60)
+        self.assertIs(cache, get_text_cache({'pdftotext_cache': self.directory,
+                                             'pdftotext_cache_days': '1'}))
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.directory}):
+            cache = get_text_cache({'pdftotext_cache': 'yes'})
+        self.assertEqual(cache.directory,
+                         os.path.join(self.directory, 'ofxstatement-dutch', 'pdftotext'))
+
+    def test_plugin(self):
+        settings = {'pdftotext_cache': os.path.join(self.directory, 'plugin')}
+        with mock.patch.object(PdfText, 'command', FAKE_PDFTOTEXT):
+            for _ in range(2):
+                parser = Plugin(None, settings).get_parser(self.pdf_filename)
+                statement = parser.parse()
+        self.assertEqual(len(statement.lines), 25)
+        cache = parser.fin.cache
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class PagesTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.pdf_filename = os.path.join(directory.name, 'icscards.pdf')
+        with open(self.pdf_filename, 'wb') as f:
+            f.write(b'%PDF-1.4\n')
+        # 3 statements of 2 or 3 pages, some pages without trailing new line
+        text = b''
+        for name in ['icscards_equal_transactions.txt', 'icscards_error.txt',
+                     'icscards-2025-04.txt']:
+            with open(os.path.join(HERE, 'samples', name), 'rb') as f:
+                text += f.read().rstrip(b'\n') + b'\f'
+        with open(self.pdf_filename + '.txt', 'wb') as f:
+            f.write(text + b'end')
+        self.pages = text.count(b'\f') + 1
+
+    def text(self, **kwargs):
+        text = PdfText(self.pdf_filename, command=FAKE_PDFTOTEXT_PAGES, **kwargs)
+        text.info_command = FAKE_PDFINFO
+        return text
+
+    def test_page_count(self):
+        self.assertEqual(self.text().page_count(), self.pages)
+        text = self.text()
+        text.info_command = python('import sys; sys.exit(1)')
+        self.assertIsNone(text.page_count())
+
+    def test_same_as_serial(self):
+        expected = list(self.text())
+        self.assertGreater(len(expected), 100)
+        for pages_per_chunk in [1, 2, 3]:
+            text = self.text(workers=3)
+            text.pages_per_chunk = pages_per_chunk
+            with mock.patch.object(text, 'run', wraps=text.run) as run:
+                self.assertEqual(list(text), expected)
+            self.assertEqual(run.call_count, -(-self.pages // pages_per_chunk))
+
+    def test_error(self):
+        text = self.text(workers=2)
+        text.pages_per_chunk = 1
+        text.command = python('import sys; sys.exit(2)')
+        with self.assertRaises(subprocess.CalledProcessError):
+            list(text)
+
+    def test_plugin(self):
+        # a statement of 3 pages
+        with open(os.path.join(HERE, 'samples', 'icscards_equal_transactions.txt'), 'rb') as src, \
+                open(self.pdf_filename + '.txt', 'wb') as dst:
+            dst.write(src.read())
+
+        def parse(workers):
+            settings = {'pdftotext_workers': workers}
+            parser = Plugin(None, settings).get_parser(self.pdf_filename)
+            self.assertEqual(parser.fin.workers, int(workers))
+            statement = parser.parse()
+            return [statement.end_date, statement.end_balance] + \
+                [(line.id, line.amount) for line in statement.lines]
+
+        with mock.patch.multiple(PdfText,
+                                 command=FAKE_PDFTOTEXT_PAGES,
+                                 info_command=FAKE_PDFINFO,
+                                 pages_per_chunk=1):
+            self.assertEqual(parse('3'), parse('1'))
+
+    def test_same_ofx(self):
+        # the OFX of a statement of 3 pages, one pdftotext per page
+        with open(os.path.join(HERE, 'samples', 'icscards_equal_transactions.txt'), 'rb') as src, \
+                open(self.pdf_filename + '.txt', 'wb') as dst:
+            dst.write(src.read())
+
+        def convert(workers):
+            parser = Plugin(None, {'pdftotext_workers': workers}).get_parser(self.pdf_filename)
+            out = io.StringIO()
+            StreamingOfxWriter(parser).write(out)
+            return re.sub('<DTSERVER>[0-9]+</DTSERVER>', '', out.getvalue())
+
+        with mock.patch.multiple(PdfText,
+                                 command=FAKE_PDFTOTEXT_PAGES,
+                                 info_command=FAKE_PDFINFO,
+                                 pages_per_chunk=1):
+            expected = convert('1')
+            self.assertEqual(expected.count('<STMTTRN>'), 25)
+            self.assertEqual(convert('3'), expected)
+
+    def test_workers(self):
+        self.assertEqual(get_workers(''), 1)
+        self.assertEqual(get_workers('0'), 1)
+        self.assertEqual(get_workers('auto'), os.cpu_count())
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from textwrap import dedent
+from unittest import TestCase
+
+from ofxstatement.plugins.nl import asn, degiro, icscards, ing, knab
+from ofxstatement.plugins.nl.plugins import AsnPlugin, DegiroPlugin, \
+    IcsCardsPlugin, IngPlugin, KnabPlugin
+
+# microseconds for importing the plugins after ofxstatement.plugin
+IMPORT_TIME_BUDGET = 20000
+
+
+class PluginsTest(TestCase):
+
+    def test_backwards_compatibility(self):
+        self.assertIs(asn.Plugin, AsnPlugin)
+        self.assertIs(degiro.Plugin, DegiroPlugin)
+        self.assertIs(icscards.Plugin, IcsCardsPlugin)
+        self.assertIs(ing.Plugin, IngPlugin)
+        self.assertIs(knab.Plugin, KnabPlugin)
+
+    def test_import_time(self):
+        code = dedent('''
+            import sys
+            import ofxstatement.plugin
+            before = set(sys.modules)
+            import ofxstatement.plugins.nl.plugins
+            print(" ".join(sorted(set(sys.modules) - before)))
+            ''')
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True,
+                                check=True)
+
+        # no parser modules nor their dependencies
+        self.assertLessEqual(set(result.stdout.split()),
+                             {'ofxstatement.plugins',
+                              'ofxstatement.plugins.nl',
+                              'ofxstatement.plugins.nl.plugins'})
+
+        # import time: self [us] | cumulative | imported package
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            columns = line.split('|')
+            if len(columns) == 3 and columns[1].strip().isdigit():
+                cumulative[columns[2].strip()] = int(columns[1])
+        self.assertLess(cumulative['ofxstatement.plugins.nl.plugins'],
+                        IMPORT_TIME_BUDGET)
+
+    def test_get_parser_imports_parser(self):
+        code = dedent('''
+            import sys
+            from ofxstatement.plugins.nl.plugins import KnabPlugin
+            assert 'ofxstatement.plugins.nl.knab' not in sys.modules
+            KnabPlugin(None, {}).get_parser(open(sys.argv[1]))
+            assert 'ofxstatement.plugins.nl.knab' in sys.modules
+            ''')
+        subprocess.run([sys.executable, '-c', code, __file__], check=True)
@@ -0,0 +1,171 @@
+from unittest import TestCase
+from decimal import Decimal
+from datetime import datetime
+import pytest
+
+from ofxstatement.exceptions import ValidationError
+from ofxstatement.ofx import OfxWriter
+from ofxstatement.statement import generate_unique_transaction_id
+from ofxstatement.statement import StatementLine as BaseStatementLine
+
+from ofxstatement.plugins.nl.statement import Statement, StatementLine, \
+    TransactionIdRegistry
+
+
+class StatementTest(TestCase):
+
+    @staticmethod
+    def statement():
+        statement = Statement(bank_id='INGBNL2A',
+                              account_id='NL99INGB9999999999',
+                              currency='EUR')
+        for day, amount in [(3, '-1.25'), (1, '20.00'), (2, '-0.31')]:
+            statement.add_line(StatementLine(date=datetime(2020, 1, day),
+                                             memo='memo',
+                                             amount=Decimal(amount)))
+        return statement
+
+    def test_add_line(self):
+        statement = self.statement()
+        self.assertEqual(statement.line_count, 3)
+        self.assertEqual(len(statement.lines), 3)
+        self.assertEqual(statement.total_amount, Decimal('18.44'))
+        self.assertEqual(statement.min_date, datetime(2020, 1, 1))
+        self.assertEqual(statement.max_date, datetime(2020, 1, 3))
+
+    def test_clear_lines(self):
+        statement = self.statement()
+        statement.clear_lines()
+        self.assertEqual(statement.line_count, 0)
+        self.assertEqual(statement.lines, [])
+        self.assertEqual(statement.total_amount, Decimal(0))
+        self.assertIsNone(statement.min_date)
+        self.assertIsNone(statement.max_date)
+        # no lines: nothing to check
+        statement.assert_valid()
+
+    def test_valid(self):
+        statement = self.statement()
+        statement.start_date = datetime(2020, 1, 1)
+        statement.end_date = datetime(2020, 1, 4)
+        statement.start_balance = Decimal('1.56')
+        statement.end_balance = Decimal('20.00')
+        statement.assert_valid()
+
+    @pytest.mark.xfail(raises=ValidationError)
+    def test_start_date_too_large(self):
+        statement = self.statement()
+        statement.start_date = datetime(2020, 1, 2)
+        statement.end_date = datetime(2020, 1, 4)
+        statement.assert_valid()
+
+    @pytest.mark.xfail(raises=ValidationError)
+    def test_end_date_too_small(self):
+        statement = self.statement()
+        statement.start_date = datetime(2020, 1, 1)
+        statement.end_date = datetime(2020, 1, 3)
+        statement.assert_valid()
+
+    @pytest.mark.xfail(raises=ValidationError)
+    def test_wrong_balance(self):
+        statement = self.statement()
+        statement.start_date = datetime(2020, 1, 1)
+        statement.end_date = datetime(2020, 1, 4)
+        statement.start_balance = Decimal('1.56')
+        statement.end_balance = Decimal('20.01')
+        statement.assert_valid()
+
+
+class StatementLineTest(TestCase):
+
+    def test_compact(self):
+        stmt_line = StatementLine(date=datetime(2020, 2, 13),
+                                  memo='memo',
+                                  amount=Decimal('-1.25'))
+        stmt_line.payee = 'JANSSEN G'
+        self.assertIsInstance(stmt_line, BaseStatementLine)
+        self.assertEqual(stmt_line.__slots__[1], '_date')
+        self.assertEqual(stmt_line._date, datetime(2020, 2, 13).toordinal())
+        self.assertEqual(stmt_line._amount, -125)
+        self.assertEqual(stmt_line.date, datetime(2020, 2, 13))
+        self.assertEqual(str(stmt_line.amount), '-1.25')
+        self.assertEqual(stmt_line.trntype, 'CHECK')
+        self.assertIsNone(stmt_line.bank_account_to)
+        self.assertFalse(hasattr(stmt_line, '__dict__') and stmt_line.__dict__)
+
+    def test_round_trip(self):
+        for value in [datetime(2020, 2, 13, 15, 58), datetime(2020, 2, 13), None]:
+            self.assertEqual(StatementLine(date=value).date, value)
+        # the string representation is part of the transaction id
+        for value in ['2500', '-0.00', '0.00', '-1.25', '1.250', '13.87']:
+            self.assertEqual(str(StatementLine(amount=Decimal(value)).amount),
+                             value)
+
+    def test_ofx(self):
+        def statement(stmt_line):
+            statement = Statement(bank_id='KNABNL2H',
+                                  account_id='NL99KNAB9999999999',
+                                  currency='EUR')
+            stmt_line.id = '1'
+            stmt_line.payee = 'JANSSEN G'
+            stmt_line.date_user = datetime(2020, 3, 26)
+            statement.lines.append(stmt_line)
+            writer = OfxWriter(statement)
+            writer.genTime = datetime(2020, 4, 1)
+            return writer.toxml()
+
+        args = dict(date=datetime(2020, 3, 28),
+                    memo='Omschrijving 1',
+                    amount=Decimal('-7.02'))
+        self.assertEqual(statement(StatementLine(**args)),
+                         statement(BaseStatementLine(**args)))
+
+
+class TransactionIdRegistryTest(TestCase):
+
+    @staticmethod
+    def lines():
+        for i in range(20):
+            yield StatementLine(date=datetime(2020, 1, 1 + i % 3),
+                                memo='Betaalautomaat',
+                                amount=Decimal('-1.25') if i % 2 else Decimal('1.25'))
+
+    def test_same_ids_as_ofxstatement(self):
+        unique_id_set = set()
+        unique_ids = TransactionIdRegistry()
+        for stmt_line in self.lines():
+            expected = generate_unique_transaction_id(stmt_line, unique_id_set)
+            self.assertEqual(unique_ids.register(stmt_line)[0], expected)
+
+    def test_counter(self):
+        unique_ids = TransactionIdRegistry()
+        stmt_line = StatementLine(date=datetime(2020, 1, 1),
+                                  memo='Betaalautomaat',
+                                  amount=Decimal('-1.25'))
+        id0, counter0 = unique_ids.register(stmt_line)
+        id1, counter1 = unique_ids.register(stmt_line)
+        id2, counter2 = unique_ids.register(stmt_line)
+        self.assertEqual((counter0, counter1, counter2), (0, 1, 2))
+        self.assertEqual(id1, id0 + '1-1')
+        self.assertEqual(id2, id0 + '2-2')
+
+    def test_adjust(self):
+        unique_ids = TransactionIdRegistry()
+        memos = []
+        for _ in range(3):
+            stmt_line = StatementLine(date=datetime(2020, 1, 1),
+                                      memo='Betaalautomaat',
+                                      amount=Decimal('-1.25'))
+            stmt_line.adjust(unique_ids)
+            memos.append(stmt_line.memo)
+        self.assertEqual(memos, ['Betaalautomaat',
+                                 'Betaalautomaat #2',
+                                 'Betaalautomaat #3'])
+
+    def test_adjust_keeps_id(self):
+        stmt_line = StatementLine(id='1',
+                                  date=datetime(2020, 1, 1),
+                                  memo='Saldo',
+                                  amount=Decimal('13.20'))
+        stmt_line.adjust(TransactionIdRegistry())
+        self.assertEqual(stmt_line.id, '1')
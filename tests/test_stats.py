@@ -0,0 +1,75 @@
+import io
+import os
+from unittest import TestCase, mock
+
+from ofxstatement.plugins.nl.ing import Plugin
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+from ofxstatement.plugins.nl.stats import ENV_VAR, Stats
+
+
+class StatsTest(TestCase):
+
+    @staticmethod
+    def get_parser(settings):
+        here = os.path.dirname(__file__)
+        text_filename = os.path.join(here, 'samples', 'ing_ok.csv')
+        return Plugin(None, settings).get_parser(text_filename)
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {ENV_VAR: ''}):
+            parser = self.get_parser({})
+        self.assertIsNone(parser.stats)
+        self.assertNotIn('parse_record', vars(parser))
+
+    def test_setting(self):
+        parser = self.get_parser({'stats': '1'})
+        statement = parser.parse()
+        stats = parser.stats
+        self.assertIsInstance(stats, Stats)
+        phases = stats.as_dict()
+        self.assertEqual(phases['sniff']['calls'], 1)
+        self.assertEqual(phases['parse_record']['calls'], parser.cur_record)
+        self.assertEqual(phases['adjust']['calls'], len(statement.lines))
+        self.assertEqual(phases['assert_valid']['calls'], len(statement.lines))
+        self.assertEqual(phases['finish_statement']['calls'], 1)
+        self.assertGreater(phases['read']['calls'], 0)
+        self.assertNotIn('write', phases)
+        for phase in phases.values():
+            self.assertGreaterEqual(phase['wall'], 0)
+            self.assertGreaterEqual(phase['cpu'], 0)
+
+    def test_same_statement(self):
+        expected = self.get_parser({}).parse()
+        actual = self.get_parser({'stats': 'on'}).parse()
+        self.assertEqual([(line.id, line.date, line.amount, line.memo) for line in actual.lines],
+                         [(line.id, line.date, line.amount, line.memo) for line in expected.lines])
+        self.assertEqual(actual.end_date, expected.end_date)
+
+    def test_environment(self):
+        with mock.patch.dict(os.environ, {ENV_VAR: 'json'}), \
+             mock.patch('atexit.register') as register:
+            parser = self.get_parser(None)
+        self.assertIsInstance(parser.stats, Stats)
+        register.assert_called_once_with(parser.stats.dump)
+
+    def test_write(self):
+        parser = self.get_parser({'stats': 'yes'})
+        StreamingOfxWriter(parser).write(io.StringIO())
+        phases = parser.stats.as_dict()
+        # every transaction and the statement
+        self.assertEqual(phases['write']['calls'], parser.statement.line_count + 1)
+        # the lines and the statement
+        self.assertEqual(phases['assert_valid']['calls'], parser.statement.line_count + 1)
+
+    def test_nested_phases(self):
+        stats = Stats()
+        inner = stats.wrap('adjust', lambda: None)
+
+        def outer():
+            inner()
+            inner()
+        stats.wrap('parse_record', outer)()
+        phases = stats.as_dict()
+        self.assertEqual(phases['parse_record']['calls'], 1)
+        self.assertEqual(phases['adjust']['calls'], 2)
+        self.assertEqual(set(phases), {'parse_record', 'adjust'})
@@ -0,0 +1,162 @@
+import io
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from ofxstatement.ofx import OfxWriter
+
+from ofxstatement.plugins.nl import asn, batch, ing, knab
+from ofxstatement.plugins.nl.ofx import StreamingOfxWriter
+from ofxstatement.plugins.nl.statement import Statement, StatementLine
+from ofxstatement.plugins.nl.watermark import MIN_CAPACITY, BloomFilter, \
+    Watermark, commit_watermark
+
+HERE = os.path.dirname(__file__)
+KNAB_FILENAME = os.path.join(HERE, 'samples', 'Knab_transactieoverzicht_ok.csv')
+ASN_FILENAME = os.path.join(HERE, 'samples',
+                            'transactie-historie_NL00ASNB9999999999_20220717204133.csv')
+
+
+class BloomFilterTest(TestCase):
+
+    def test_error_rate(self):
+        bloom = BloomFilter(10000)
+        for i in range(10000):
+            bloom.add('known.%d' % i)
+        self.assertTrue(all('known.%d' % i in bloom for i in range(10000)))
+        false_positives = sum('new.%d' % i in bloom for i in range(10000))
+        self.assertLess(false_positives, 200)
+
+    def test_bits(self):
+        bloom = BloomFilter(100)
+        bloom.add('20200101.1')
+        copy = BloomFilter(100, bits=bytes(bloom.bits))
+        self.assertIn('20200101.1', copy)
+
+
+class WatermarkTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.database = os.path.join(self.directory, 'state', 'watermark.sqlite')
+        self.settings = {'watermark': self.database}
+
+    def knab_file(self, records):
+        # the preamble, the header and the first records
+        with open(KNAB_FILENAME, encoding='ISO-8859-1') as f:
+            lines = f.readlines()
+        filename = os.path.join(self.directory, 'knab_%d.csv' % records)
+        with open(filename, 'w', encoding='ISO-8859-1', newline='') as out:
+            out.writelines(lines[:2 + records])
+        return filename
+
+    def convert(self, filename, plugin=knab.Plugin):
+        parser = plugin(None, self.settings).get_parser(filename)
+        statement = parser.parse()
+        statement.assert_valid()
+        parser.fin.close()
+        commit_watermark(parser)
+        return parser, statement
+
+    def test_disabled(self):
+        parser = knab.Plugin(None, {}).get_parser(KNAB_FILENAME)
+        parser.fin.close()
+        self.assertIsNone(parser.watermark)
+        self.assertNotIn('iter_lines', vars(parser))
+
+    def test_incremental(self):
+        _, statement = self.convert(self.knab_file(10))
+        self.assertEqual(len(statement.lines), 10)
+
+        # a cumulative export: only the transactions after the first 10
+        parser, statement = self.convert(KNAB_FILENAME)
+        self.assertEqual((parser.watermark.new, parser.watermark.known), (18, 10))
+        full = knab.Plugin(None, {}).get_parser(KNAB_FILENAME)
+        full_statement = full.parse()
+        full.fin.close()
+        self.assertEqual([line.id for line in statement.lines],
+                         [line.id for line in full_statement.lines[10:]])
+        # the statement still covers the whole file
+        self.assertEqual((statement.start_date, statement.end_date),
+                         (full_statement.start_date, full_statement.end_date))
+
+        # nothing new the third time
+        _, statement = self.convert(KNAB_FILENAME)
+        self.assertEqual(statement.lines, [])
+
+    def test_streaming(self):
+        self.convert(KNAB_FILENAME)
+        parser = knab.Plugin(None, self.settings).get_parser(KNAB_FILENAME)
+        out = io.StringIO()
+        statement = StreamingOfxWriter(parser).write(out)
+        parser.fin.close()
+        commit_watermark(parser)
+        self.assertEqual(parser.watermark.known, statement.line_count)
+        self.assertNotIn('<STMTTRN>', out.getvalue())
+        # like ofxstatement: no transaction list without lines
+        _, statement = self.convert(KNAB_FILENAME)
+        self.assertNotIn('<BANKTRANLIST>', out.getvalue())
+        self.assertNotIn('<BANKTRANLIST>', OfxWriter(statement).toxml())
+
+    def test_not_valid(self):
+        # the ids are only recorded when the statement is valid
+        parser = knab.Plugin(None, self.settings).get_parser(KNAB_FILENAME)
+        self.assertEqual(len(list(parser.iter_lines())), 28)
+        parser.fin.close()
+        _, statement = self.convert(KNAB_FILENAME)
+        self.assertEqual(len(statement.lines), 28)
+
+    def test_failed_write(self):
+        # the ids are only recorded when the output is durable
+        filename = os.path.join(HERE, 'samples', 'ing_ok.csv')
+
+        class FailingOutput(io.StringIO):
+            def write(self, s):
+                raise OSError(28, 'No space left on device')
+
+        parser = ing.Plugin(None, self.settings).get_parser(filename)
+        with self.assertRaises(OSError):
+            StreamingOfxWriter(parser).write(FailingOutput())
+        parser.fin.close()
+        _, statement = self.convert(filename, ing.Plugin)
+        self.assertEqual(len(statement.lines), 5)
+
+        # the OFX file of the batch command cannot replace a directory
+        output = os.path.join(self.directory, 'asn.ofx')
+        os.mkdir(output)
+        job = batch.Job(ASN_FILENAME, output, 'nl-asn', self.settings)
+        self.assertIsNotNone(batch.convert(job).error)
+        os.rmdir(output)
+        result = batch.convert(job)
+        self.assertEqual((result.error, result.lines, result.known), (None, 11, 0))
+        self.assertEqual(batch.convert(job).known, 11)
+
+    def test_asn(self):
+        _, statement = self.convert(ASN_FILENAME, asn.Plugin)
+        with sqlite3.connect(self.database) as connection:
+            rows = connection.execute('SELECT account_id, id FROM emitted').fetchall()
+        self.assertEqual(sorted(rows),
+                         sorted((statement.account_id, line.id) for line in statement.lines))
+        self.assertRegex(rows[0][1], r'^\d{8}\.\d+$')
+
+    def test_growth(self):
+        statement = Statement(account_id='NL99KNAB9999999999')
+        lines = [StatementLine(id=str(i)) for i in range(3 * MIN_CAPACITY)]
+        for end, new in [(10, 10), (3 * MIN_CAPACITY, 3 * MIN_CAPACITY - 10)]:
+            watermark = Watermark(self.database)
+            self.assertEqual(len(list(watermark.filter(statement, lines[:end]))), new)
+            watermark.commit()
+
+        watermark = Watermark(self.database)
+        bloom, count = watermark.load_bloom('NL99KNAB9999999999')
+        self.assertEqual(count, 3 * MIN_CAPACITY)
+        self.assertGreaterEqual(bloom.capacity, count)
+        self.assertEqual(list(watermark.filter(statement, lines)), [])
+        self.assertEqual(watermark.known, 3 * MIN_CAPACITY)
+        # another account
+        other = Statement(account_id='NL98KNAB9999999999')
+        self.assertEqual(len(list(watermark.filter(other, lines[:5]))), 5)
+        watermark.close()